@@ -86,8 +86,8 @@
     'auto_install': False,
     'sequence': 1,
     'external_dependencies': {
-        'python': ['PyPDF2', 'pytesseract', 'openai', 'requests', 'beautifulsoup4'],
-        'bin': ['tesseract'],
+        'python': ['PyPDF2', 'pytesseract', 'pdf2image', 'numpy', 'openai', 'requests', 'beautifulsoup4'],
+        'bin': ['tesseract', 'pdftoppm'],
     },
     'post_init_hook': 'post_init_hook',
     'uninstall_hook': 'uninstall_hook',
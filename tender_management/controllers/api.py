@@ -1,7 +1,8 @@
 # controllers/api.py
+import base64
 import logging
 import json
-from odoo import http, _
+from odoo import fields, http, _
 from odoo.http import request
 from odoo.exceptions import AccessError, ValidationError
 
@@ -300,7 +301,7 @@ class TenderAPIController(http.Controller):
                 'tender_id': tender.id,
                 'name': document_name,
                 'document_type': document_type,
-                'file': file.read(),
+                'file': base64.b64encode(file.read()),
                 'file_name': file.filename,
                 'date': fields.Date.today(),
                 'user_id': user_id,
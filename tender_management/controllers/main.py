@@ -62,7 +62,7 @@ class TenderController(http.Controller):
                 'state': 'draft'
             })
             
-            # Process OCR
+            # Queue OCR, the client polls its progress
             ocr_result.action_process()
             
             # Update document
@@ -80,6 +80,36 @@ class TenderController(http.Controller):
             _logger.exception("Error in OCR processing: %s", str(e))
             return {'error': _("An error occurred during OCR processing")}
     
+    @http.route('/tender/ocr/status/<int:ocr_id>', type='json', auth='user')
+    def ocr_status(self, ocr_id, **kw):
+        """Get the progress of an OCR job"""
+        ocr_result = request.env['tender.ocr'].browse(ocr_id)
+        if not ocr_result.exists():
+            return {'error': _("OCR result not found")}
+        
+        return {
+            'ocr_id': ocr_result.id,
+            'state': ocr_result.state,
+            'progress': ocr_result.progress,
+            'message': ocr_result.progress_message or '',
+            'error': ocr_result.error_message if ocr_result.state == 'failed' else False,
+            'confidence_score': ocr_result.confidence_score if ocr_result.state == 'done' else False,
+        }
+    
+    @http.route('/tender/ocr/content/<int:ocr_id>/<int:page>', type='json', auth='user')
+    def ocr_content_page(self, ocr_id, page, **kw):
+        """Get a rendered page of the OCR content"""
+        ocr_result = request.env['tender.ocr'].browse(ocr_id)
+        if not ocr_result.exists():
+            return {'error': _("OCR result not found")}
+        
+        return dict(ocr_result._get_content_html_page(page), ocr_id=ocr_result.id)
+    
+    @http.route('/tender/ocr/cache/stats', type='json', auth='user')
+    def ocr_cache_stats(self, **kw):
+        """Get the hit ratio of the OCR cache"""
+        return request.env['tender.ocr.cache']._get_statistics()
+    
     @http.route('/tender/tag/create', type='json', auth='user')
     def create_tag(self, name, color=0, **kw):
         """Create a new tag"""
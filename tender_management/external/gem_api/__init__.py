@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 
 from . import gem_client
-from . import gem_mappings
+from . import gem_session
+from .gem_api import gem_mappings
@@ -5,13 +5,128 @@ from datetime import datetime
 
 _logger = logging.getLogger(__name__)
 
-def map_gem_tender_to_odoo(gem_tender, detailed=False):
+# GeM document types and their tender.document counterpart
+GEM_DOCUMENT_TYPES = {
+    'TENDER_NOTICE': 'tender_notice',
+    'TECHNICAL_SPECIFICATION': 'technical_specification',
+    'FINANCIAL_SPECIFICATION': 'financial_specification',
+    'CORRIGENDUM': 'corrigendum',
+    'PRE_BID_QUERY': 'pre_bid_query',
+    'BID_DOCUMENT': 'bid_document',
+    'SUBMISSION': 'submission',
+    'OTHER': 'other',
+}
+
+DEFAULT_CURRENCY_CODE = 'INR'
+
+
+def _normalize(value):
+    """Case and whitespace insensitive lookup key of a name"""
+    return ' '.join(value.split()).casefold() if isinstance(value, str) else ''
+
+
+class GemReferenceData:
+    """
+    In-memory indexes of the reference data used to map GeM payloads.
+    
+    Currencies, document types and departments are read once and every
+    lookup is a dict access, so mapping a tender issues no query. Instances
+    are cached by ``gem.portal._get_gem_reference_data`` per version of the
+    reference data, bumped by every change of departments and currencies.
+    """
+    
+    def __init__(self, currencies=None, document_types=None, departments=None):
+        """
+        Initialize the indexes.
+        
+        Args:
+            currencies: List of ``(id, code)`` pairs
+            document_types: Values of the tender.document type selection
+            departments: List of ``(id, name, code)`` tuples
+        """
+        self.currency_ids = {}
+        self.currency_codes = {}
+        for currency_id, code in currencies or []:
+            self.currency_ids.setdefault(code.upper(), currency_id)
+            self.currency_codes[currency_id] = code
+        
+        document_types = set(document_types or GEM_DOCUMENT_TYPES.values())
+        self.document_types = {
+            gem_type: odoo_type for gem_type, odoo_type in GEM_DOCUMENT_TYPES.items()
+            if odoo_type in document_types
+        }
+        self.gem_document_types = {odoo_type: gem_type for gem_type, odoo_type in self.document_types.items()}
+        
+        self.department_ids = {}
+        for department_id, name, code in departments or []:
+            for key in (_normalize(code), _normalize(name)):
+                if key:
+                    self.department_ids.setdefault(key, department_id)
+    
+    @classmethod
+    def load(cls, env):
+        """
+        Read the reference data of a database.
+        
+        Args:
+            env: Odoo environment
+            
+        Returns:
+            GemReferenceData: Loaded indexes
+        """
+        currencies = env['res.currency'].sudo().with_context(active_test=False).search_read(
+            [], ['name', 'active'], order='active desc, id'
+        )
+        departments = env['tender.department'].sudo().search_read([], ['name', 'code'], order='id')
+        document_types = env['tender.document']._fields['document_type'].get_values(env)
+        _logger.debug(
+            "Loaded GeM reference data: %s currencies, %s departments",
+            len(currencies), len(departments)
+        )
+        return cls(
+            currencies=[(currency['id'], currency['name']) for currency in currencies],
+            document_types=document_types,
+            departments=[(department['id'], department['name'], department['code']) for department in departments],
+        )
+    
+    def currency_id(self, currency_code):
+        """
+        Odoo currency ID of an ISO currency code, False when unknown.
+        """
+        return self.currency_ids.get((currency_code or DEFAULT_CURRENCY_CODE).upper(), False)
+    
+    def currency_code(self, currency_id):
+        """
+        ISO currency code of an Odoo currency ID.
+        """
+        return self.currency_codes.get(currency_id, DEFAULT_CURRENCY_CODE)
+    
+    def document_type(self, gem_type):
+        """
+        tender.document type of a GeM document type.
+        """
+        return self.document_types.get(gem_type, 'other')
+    
+    def gem_document_type(self, odoo_type):
+        """
+        GeM document type of a tender.document type.
+        """
+        return self.gem_document_types.get(odoo_type, 'OTHER')
+    
+    def department_id(self, authority):
+        """
+        Department matching an issuing authority by code or name, False when none does.
+        """
+        return self.department_ids.get(_normalize(authority), False)
+
+def map_gem_tender_to_odoo(gem_tender, detailed=False, reference_data=None):
     """
     Map GeM tender data to Odoo tender.bid fields.
     
     Args:
         gem_tender: Dictionary with GeM tender data
         detailed: Whether this is a detailed tender view
+        reference_data: GemReferenceData used to resolve codes
         
     Returns:
         dict: Mapped values for Odoo tender.bid
@@ -24,7 +139,7 @@ def map_gem_tender_to_odoo(gem_tender, detailed=False):
         'submission_date': datetime.strptime(gem_tender.get('start_date', ''), '%Y-%m-%d') if gem_tender.get('start_date') else False,
         'closing_date': datetime.strptime(gem_tender.get('end_date', ''), '%Y-%m-%d') if gem_tender.get('end_date') else False,
         'estimated_value': float(gem_tender.get('estimated_value', 0.0)),
-        'currency_id': map_currency_code(gem_tender.get('currency', 'INR')),
+        'currency_id': map_currency_code(gem_tender.get('currency', DEFAULT_CURRENCY_CODE), reference_data),
         'organization_name': gem_tender.get('buyer_name', ''),
         'gem_last_updated': datetime.strptime(gem_tender.get('updated_at', ''), '%Y-%m-%dT%H:%M:%SZ') if gem_tender.get('updated_at') else datetime.now(),
         'is_active': gem_tender.get('status') == 'ACTIVE',
@@ -62,7 +177,7 @@ def map_gem_tender_to_odoo(gem_tender, detailed=False):
             for doc in gem_tender['documents']:
                 documents.append({
                     'name': doc.get('name', ''),
-                    'type': doc.get('type', ''),
+                    'type': reference_data.document_type(doc.get('type')) if reference_data else doc.get('type', ''),
                     'external_id': doc.get('id', ''),
                     'size': doc.get('size', 0),
                     'mimetype': doc.get('mime_type', 'application/pdf'),
@@ -71,12 +186,13 @@ def map_gem_tender_to_odoo(gem_tender, detailed=False):
     
     return mapped_data
 
-def map_odoo_application_to_gem(tender_application):
+def map_odoo_application_to_gem(tender_application, reference_data=None):
     """
     Map Odoo tender.application data to GeM bid submission format.
     
     Args:
         tender_application: tender.application record
+        reference_data: GemReferenceData used to resolve codes
         
     Returns:
         dict: Mapped values for GeM API
@@ -89,7 +205,7 @@ def map_odoo_application_to_gem(tender_application):
         'application_ref': tender_application.name,
         'price_details': {
             'base_price': tender_application.amount,
-            'currency': get_currency_code(tender_application.currency_id),
+            'currency': get_currency_code(tender_application.currency_id, reference_data),
             'tax_amount': tender_application.tax_amount,
             'total_amount': tender_application.total_amount,
         },
@@ -132,32 +248,32 @@ def map_odoo_application_to_gem(tender_application):
     
     return mapped_data
 
-def map_currency_code(currency_code):
+def map_currency_code(currency_code, reference_data=None):
     """
     Map currency code to Odoo currency ID.
     
     Args:
         currency_code: ISO currency code
+        reference_data: GemReferenceData used to resolve the code
         
     Returns:
-        int: Odoo currency ID
+        int: Odoo currency ID, False when the currency is unknown
     """
-    # This would typically query the Odoo database to find the currency ID
-    # For now, we'll return a placeholder value
-    # In a real implementation, this would be:
-    # return self.env['res.currency'].search([('name', '=', currency_code)], limit=1).id
-    return 1  # Placeholder - would be replaced with actual implementation
+    if reference_data is None:
+        return False
+    return reference_data.currency_id(currency_code)
 
-def get_currency_code(currency_id):
+def get_currency_code(currency_id, reference_data=None):
     """
     Get currency code from Odoo currency ID.
     
     Args:
         currency_id: Odoo currency record
+        reference_data: GemReferenceData used to resolve the currency
         
     Returns:
         str: ISO currency code
     """
-    # In a real implementation, this would return currency_id.name
-    # For this example, default to INR
-    return 'INR'
+    if reference_data is not None:
+        return reference_data.currency_code(currency_id.id)
+    return currency_id.name or DEFAULT_CURRENCY_CODE
@@ -3,32 +3,49 @@
 import json
 import logging
 import requests
+import threading
+import time
 from datetime import datetime
 from odoo import models, api, fields, _
 from odoo.exceptions import UserError, ValidationError
-from . import gem_mappings
+from . import gem_session
+from . import gem_status_poller
+from . import gem_upload
+from .gem_api import gem_mappings
 
 _logger = logging.getLogger(__name__)
 
+# Seconds before expiry at which a token is refreshed
+TOKEN_REFRESH_MARGIN = 300
+
+# Tokens of clients not bound to a portal, shared by the threads of a worker
+_token_cache = {}
+_token_lock = threading.Lock()
+
 class GemAPIClient:
     """
     Client for interacting with the Government e-Marketplace (GeM) API.
     This class handles all API communications with the GeM portal.
     """
     
-    def __init__(self, env, config=None):
+    def __init__(self, env, config=None, portal=None):
         """
         Initialize the GeM API client.
         
         Args:
             env: Odoo environment
             config: Configuration dictionary with API credentials
+            portal: gem.portal record whose shared token cache should be used
         """
         self.env = env
         self.config = config or {}
+        self.portal = portal
         self.token = None
         self.token_expiry = None
         
+        if portal and not self.config:
+            self.config = {'gem_api_url': portal.api_endpoint}
+        
         # Load configuration if not provided
         if not self.config:
             ICP = self.env['ir.config_parameter'].sudo()
@@ -45,17 +62,72 @@ class GemAPIClient:
                          self.config['gem_client_id'], self.config['gem_client_secret']]):
                 _logger.warning("GeM API credentials not fully configured")
 
+    def _token_cache_key(self):
+        """
+        Key of this client's credentials in the worker token cache.
+        
+        Returns:
+            tuple: Cache key
+        """
+        return (self.env.cr.dbname, self.config.get('gem_api_url'), self.config.get('gem_client_id'),
+                self.config.get('gem_username'))
+
+    def _token_is_fresh(self):
+        """
+        Check if the current token is valid beyond the refresh margin.
+        
+        Returns:
+            bool: True if the token can still be used
+        """
+        return bool(self.token and self.token_expiry and
+                    time.time() < self.token_expiry - TOKEN_REFRESH_MARGIN)
+
     def _check_auth(self):
         """
         Check if authentication token is valid, refresh if needed.
         
+        Clients bound to a portal use the token shared through the portal
+        record. Other clients share tokens per worker, and concurrent
+        threads wait for a single authentication instead of each sending
+        their own.
+        
         Returns:
             bool: True if authenticated successfully
         """
-        if not self.token or not self.token_expiry or datetime.now() >= self.token_expiry:
-            return self.authenticate()
-        return True
+        if self.portal:
+            token = self.portal._get_token()
+            if not token:
+                return False
+            self.token = token['access_token']
+            self.token_expiry = token['expires_at']
+            return True
+        
+        if self._token_is_fresh():
+            return True
+        
+        key = self._token_cache_key()
+        with _token_lock:
+            cached = _token_cache.get(key)
+            if cached:
+                self.token, self.token_expiry = cached
+                if self._token_is_fresh():
+                    return True
+            if not self.authenticate():
+                return False
+            _token_cache[key] = (self.token, self.token_expiry)
+            return True
             
+    def _get_breaker(self):
+        """
+        Get the circuit breaker guarding the GeM API.
+        
+        Returns:
+            CircuitBreaker: Breaker of the portal when the client has one
+        """
+        if self.portal:
+            return self.portal._get_circuit_breaker()
+        return gem_session.get_breaker((self.env.cr.dbname, self.config['gem_api_url']))
+    
     def authenticate(self):
         """
         Authenticate with the GeM API and get access token.
@@ -73,13 +145,16 @@ class GemAPIClient:
                 'password': self.config['gem_password'],
             }
             
-            response = requests.post(auth_url, data=payload, timeout=30)
+            response = gem_session.request(
+                gem_session.session_for(self.env, auth_url), 'POST', auth_url, breaker=self._get_breaker(),
+                data=payload, timeout=30, **gem_session.retry_settings(self.env)
+            )
             if response.status_code == 200:
                 data = response.json()
                 self.token = data.get('access_token')
                 # Set token expiry (usually 1 hour)
                 expires_in = data.get('expires_in', 3600)
-                self.token_expiry = datetime.now().timestamp() + expires_in
+                self.token_expiry = time.time() + expires_in
                 _logger.info("Successfully authenticated with GeM API")
                 return True
             else:
@@ -89,7 +164,7 @@ class GemAPIClient:
             _logger.exception(f"Exception during GeM API authentication: {e}")
             return False
     
-    def _make_request(self, method, endpoint, data=None, params=None, files=None):
+    def _make_request(self, method, endpoint, data=None, params=None, files=None, validators=None):
         """
         Make an API request to GeM.
         
@@ -99,9 +174,11 @@ class GemAPIClient:
             data: Request data (for POST/PUT)
             params: Query parameters
             files: Files to upload
+            validators: Cache validators (``etag``, ``last_modified``) of a
+                conditional GET, updated in place from the response
             
         Returns:
-            dict: Response data
+            dict: Response data, or None when the resource is not modified
         """
         if not self._check_auth():
             raise UserError(_("Failed to authenticate with GeM API. Please check your credentials."))
@@ -115,26 +192,38 @@ class GemAPIClient:
         if not files and data and method in ['POST', 'PUT']:
             headers['Content-Type'] = 'application/json'
             data = json.dumps(data)
+        if validators is not None:
+            headers.update(gem_session.conditional_headers(validators.get('etag'), validators.get('last_modified')))
         
         try:
-            response = requests.request(
+            response = gem_session.request(
+                gem_session.session_for(self.env, url),
                 method, 
                 url, 
+                breaker=self._get_breaker(),
                 headers=headers,
                 params=params,
                 data=data,
                 files=files,
-                timeout=60
+                timeout=60,
+                **gem_session.retry_settings(self.env)
             )
             
             # Handle response
+            if validators is not None and response.status_code == 304:
+                return None
             if response.status_code in [200, 201]:
+                if validators is not None:
+                    validators.update(gem_session.response_validators(response))
                 return response.json()
             else:
                 error_msg = f"GeM API error: {response.status_code} - {response.text}"
                 _logger.error(error_msg)
                 raise UserError(_(error_msg))
                 
+        except gem_session.CircuitOpenError as e:
+            _logger.warning(f"GeM API call skipped: {e}")
+            raise UserError(_("GeM API temporarily unavailable: %s") % str(e))
         except requests.exceptions.RequestException as e:
             _logger.exception(f"Request exception: {e}")
             raise UserError(_("Network error while connecting to GeM API: %s") % str(e))
@@ -144,8 +233,50 @@ class GemAPIClient:
         except Exception as e:
             _logger.exception(f"Unexpected error: {e}")
             raise UserError(_("Unexpected error: %s") % str(e))
+        finally:
+            if self.portal:
+                self.portal._flush_api_health()
     
     # Public API methods
+    def iter_tenders(self, filters=None, page_size=100):
+        """
+        Iterate over the tenders matching a search, page by page.
+        
+        Pages are only requested as the iteration reaches them and each
+        tender is mapped when it is yielded, so memory does not grow with
+        the number of results.
+        
+        Args:
+            filters: Dictionary of search filters
+            page_size: Number of tenders requested per page
+            
+        Yields:
+            dict: Mapped tender
+        """
+        params = dict(filters or {})
+        params['page_size'] = params.get('page_size') or page_size
+        endpoint = "/bids/search"
+        reference_data = self._get_reference_data()
+        while True:
+            result = self._make_request('GET', endpoint, params=params) or {}
+            bids = result.get('bids') or []
+            for tender in bids:
+                yield gem_mappings.map_gem_tender_to_odoo(tender, reference_data=reference_data)
+            
+            page_token = result.get('next_page_token') or result.get('nextPageToken')
+            if not bids or not page_token:
+                return
+            params['page_token'] = page_token
+    
+    def _get_reference_data(self):
+        """
+        Get the cached reference data used to map GeM payloads.
+        
+        Returns:
+            GemReferenceData: Reference data indexes of the database
+        """
+        return self.env['gem.portal']._get_gem_reference_data()
+    
     def search_tenders(self, filters=None):
         """
         Search for tenders on GeM.
@@ -154,36 +285,30 @@ class GemAPIClient:
             filters: Dictionary of search filters
             
         Returns:
-            list: List of tender dictionaries
+            list: List of tender dictionaries, from every result page
         """
-        endpoint = "/bids/search"
-        params = filters or {}
-        result = self._make_request('GET', endpoint, params=params)
-        
-        # Map the GeM tender fields to Odoo fields
-        mapped_tenders = []
-        if result and 'bids' in result:
-            for tender in result['bids']:
-                mapped_tender = gem_mappings.map_gem_tender_to_odoo(tender)
-                mapped_tenders.append(mapped_tender)
-                
-        return mapped_tenders
+        return list(self.iter_tenders(filters))
     
-    def get_tender_details(self, gem_bid_id):
+    def get_tender_details(self, gem_bid_id, validators=None):
         """
         Get detailed information about a specific tender.
         
         Args:
             gem_bid_id: GeM bid ID
+            validators: Cache validators of the known tender, see ``_make_request``
             
         Returns:
-            dict: Tender details
+            dict: Tender details, or None when the tender is not modified
         """
         endpoint = f"/bids/{gem_bid_id}"
-        result = self._make_request('GET', endpoint)
+        result = self._make_request('GET', endpoint, validators=validators)
+        if result is None:
+            return None
         
         if result and 'bid' in result:
-            return gem_mappings.map_gem_tender_to_odoo(result['bid'], detailed=True)
+            return gem_mappings.map_gem_tender_to_odoo(
+                result['bid'], detailed=True, reference_data=self._get_reference_data()
+            )
         return {}
     
     def submit_bid(self, tender_application):
@@ -202,7 +327,9 @@ class GemAPIClient:
         tender_bid = tender_application.bid_id
         
         # Map Odoo data to GeM expected format
-        gem_data = gem_mappings.map_odoo_application_to_gem(tender_application)
+        gem_data = gem_mappings.map_odoo_application_to_gem(
+            tender_application, reference_data=self._get_reference_data()
+        )
         
         # Submit the bid
         result = self._make_request('POST', endpoint, data=gem_data)
@@ -211,22 +338,26 @@ class GemAPIClient:
     
     def get_bid_status(self, gem_bid_id, application_ref=None):
         """
-        Check the status of a submitted bid.
+        Check the status of submitted bids.
         
         Args:
-            gem_bid_id: GeM bid ID
+            gem_bid_id: GeM bid ID, or a list of bid IDs for portals
+                offering the bulk status endpoint
             application_ref: Application reference ID
             
         Returns:
-            dict: Status information
+            dict: Status information, indexed by bid ID for a list of bids
         """
-        params = {'bid_id': gem_bid_id}
+        bulk = isinstance(gem_bid_id, (list, tuple))
+        params = {'bid_ids': ','.join(gem_bid_id)} if bulk else {'bid_id': gem_bid_id}
         if application_ref:
             params['application_ref'] = application_ref
             
         endpoint = "/bids/status"
         result = self._make_request('GET', endpoint, params=params)
         
+        if bulk:
+            return gem_status_poller.parse_bulk_statuses(result)
         return result
     
     def download_tender_document(self, document_id):
@@ -248,27 +379,50 @@ class GemAPIClient:
         """
         Upload a document to GeM.
         
+        The file is streamed from the filestore, in chunks through a
+        resumable upload session when the portal supports them, so it is
+        never loaded in memory.
+        
         Args:
             tender_document: tender.document record
             
         Returns:
             dict: Upload response
         """
-        endpoint = "/documents/upload"
+        if not self._check_auth():
+            raise UserError(_("Failed to authenticate with GeM API. Please check your credentials."))
         
-        # Prepare file for upload
-        document_datas = tender_document.file_content
-        files = {
-            'file': (tender_document.name, document_datas, tender_document.mimetype)
-        }
+        uploader = gem_upload.GemDocumentUploader(
+            lambda url: gem_session.session_for(self.env, url),
+            self.config['gem_api_url'],
+            headers={'Authorization': f"Bearer {self.token}", 'Accept': 'application/json'},
+            breaker=self._get_breaker(),
+            retry=gem_session.retry_settings(self.env),
+        )
         
         # Prepare metadata
         data = {
-            'bid_id': tender_document.bid_id.gem_bid_id,
-            'document_type': tender_document.type,
+            'bid_id': tender_document.gem_bid_id.bid_id or '',
+            'document_type': self._get_reference_data().gem_document_type(tender_document.document_type),
             'description': tender_document.description or '',
         }
+        filename = tender_document.file_name or tender_document.name
+        mimetype = tender_document._get_file_attachment().mimetype
         
-        result = self._make_request('POST', endpoint, data=data, files=files)
-        
-        return result
+        try:
+            with tender_document._file_path() as path:
+                if self.portal and self.portal.chunked_upload_supported:
+                    return uploader.upload_resumable(path, filename, mimetype, data)
+                return uploader.upload(path, filename, mimetype, data)
+        except gem_session.CircuitOpenError as e:
+            _logger.warning(f"GeM API call skipped: {e}")
+            raise UserError(_("GeM API temporarily unavailable: %s") % str(e))
+        except gem_upload.UploadError as e:
+            _logger.error(f"GeM API error: {e}")
+            raise UserError(_("GeM API error: %s") % str(e))
+        except requests.exceptions.RequestException as e:
+            _logger.exception(f"Request exception: {e}")
+            raise UserError(_("Network error while connecting to GeM API: %s") % str(e))
+        finally:
+            if self.portal:
+                self.portal._flush_api_health()
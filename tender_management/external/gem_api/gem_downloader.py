@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from . import gem_session
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_TIMEOUT = 120
+CONNECT_TIMEOUT = 10
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadTimeout(Exception):
+    """Raised when a file takes longer than its timeout to download."""
+
+
+class GemDocumentDownloader:
+    """
+    Download GeM documents concurrently into temporary files.
+
+    Worker threads only perform HTTP transfers and never touch the ORM:
+    callers create the records from the returned files on their own thread.
+    """
+
+    def __init__(self, get_session, headers=None, max_workers=DEFAULT_MAX_WORKERS,
+                 per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT, breaker=None, retry=None):
+        """
+        Initialize the downloader.
+
+        Args:
+            get_session: Callable returning the requests session of a URL
+            headers: Headers sent with every request
+            max_workers: Maximum number of concurrent downloads
+            per_host: Maximum number of concurrent downloads per host
+            timeout: Maximum duration of a single download in seconds
+            breaker: CircuitBreaker of the portal
+            retry: Retry policy, see ``gem_session.request``
+        """
+        self.get_session = get_session
+        self.headers = headers or {}
+        self.max_workers = max(max_workers, 1)
+        self.per_host = max(per_host, 1)
+        self.timeout = timeout
+        self.breaker = breaker
+        self.retry = retry or {}
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
+
+    def _host_slot(self, url):
+        """
+        Get the semaphore limiting concurrent downloads from a URL's host.
+
+        Args:
+            url: Document URL
+
+        Returns:
+            threading.BoundedSemaphore: Host semaphore
+        """
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_slots[host]
+
+    def download(self, url, headers=None):
+        """
+        Stream a single document to a temporary file.
+
+        Args:
+            url: Document URL
+            headers: Additional headers, e.g. conditional request headers
+
+        Returns:
+            dict: ``url``, ``path``, ``size`` and cache validators of the
+            file, ``not_modified`` for a 304 response, or ``error``
+        """
+        path = None
+        try:
+            with self._host_slot(url):
+                deadline = time.monotonic() + self.timeout
+                with gem_session.request(self.get_session(url), 'GET', url, breaker=self.breaker,
+                                         headers=dict(self.headers, **(headers or {})), stream=True,
+                                         timeout=(CONNECT_TIMEOUT, self.timeout), **self.retry) as response:
+                    if response.status_code == 304:
+                        return {'url': url, 'not_modified': True}
+                    if response.status_code != 200:
+                        return {'url': url, 'error': f"HTTP {response.status_code}"}
+
+                    size = 0
+                    fd, path = tempfile.mkstemp(prefix='gem_document_')
+                    with os.fdopen(fd, 'wb') as temp_file:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            if time.monotonic() > deadline:
+                                raise DownloadTimeout(f"Download exceeded {self.timeout}s")
+                            temp_file.write(chunk)
+                            size += len(chunk)
+            return dict(gem_session.response_validators(response), url=url, path=path, size=size)
+        except Exception as e:
+            if path:
+                self._remove(path)
+            return {'url': url, 'error': str(e)}
+
+    def download_all(self, urls):
+        """
+        Download documents concurrently.
+
+        Args:
+            urls: List of document URLs or ``(url, headers)`` pairs
+
+        Returns:
+            list: Download results, in the order of ``urls``
+        """
+        if not urls:
+            return []
+        start = time.perf_counter()
+        downloads = [(url, None) if isinstance(url, str) else url for url in urls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(downloads)),
+                                thread_name_prefix='gem_download') as executor:
+            results = list(executor.map(lambda download: self.download(*download), downloads))
+
+        failed = [result for result in results if result.get('error')]
+        for result in failed:
+            _logger.error("Failed to download document from GeM Portal %s: %s", result['url'], result['error'])
+        not_modified = [result for result in results if result.get('not_modified')]
+        _logger.info(
+            "Downloaded %s GeM documents (%s not modified, %s failed, %s bytes) in %.3fs",
+            len(results) - len(failed) - len(not_modified), len(not_modified), len(failed),
+            sum(result.get('size', 0) for result in results), time.perf_counter() - start
+        )
+        return results
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    @classmethod
+    def cleanup(cls, results):
+        """
+        Remove the temporary files of download results.
+
+        Args:
+            results: Results returned by ``download_all``
+        """
+        for result in results:
+            if result.get('path'):
+                cls._remove(result['path'])
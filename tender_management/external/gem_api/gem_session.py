@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_CAP = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 120.0
+
+# Responses worth retrying: the server is throttling or temporarily failing
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+# Sessions are kept per process: Odoo workers are forked and must never
+# share sockets opened by their parent.
+_sessions = {}
+_sessions_lock = threading.Lock()
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while a circuit breaker is open."""
+
+    def __init__(self, open_until):
+        self.open_until = open_until
+        super().__init__(f"GeM API unavailable, retrying in {max(open_until - time.time(), 0):.0f}s")
+
+
+class CircuitBreaker:
+    """
+    Fail fast for a cooldown after repeated errors of a remote API.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. Once
+    the cooldown is over the next request is let through: a success closes
+    the breaker, a failure opens it again immediately. The breaker also
+    counts requests and errors until they are drained by ``drain_stats``.
+    """
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures opening the breaker
+            cooldown: Seconds during which requests fail fast once open
+        """
+        self.failure_threshold = max(failure_threshold, 1)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self._observed_open_until = None
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._requests = 0
+        self._errors = 0
+        self._last_error = None
+        self._state_changed = False
+        self._drained_at = time.monotonic()
+
+    def is_open(self):
+        """
+        Returns:
+            bool: True while requests must not be sent
+        """
+        return time.time() < self.open_until
+
+    def before_request(self):
+        """
+        Check that a request may be sent.
+
+        Raises:
+            CircuitOpenError: While the breaker is open
+        """
+        if self.is_open():
+            raise CircuitOpenError(self.open_until)
+
+    def record_success(self):
+        """Record a successful request, closing the breaker."""
+        with self._lock:
+            self._requests += 1
+            self.failures = 0
+            if self.open_until:
+                self.open_until = 0.0
+                self._state_changed = True
+                _logger.info("GeM API circuit closed")
+
+    def record_failure(self, error):
+        """
+        Record a failed request, opening the breaker past the threshold.
+
+        Args:
+            error: Description of the failure
+        """
+        with self._lock:
+            self._requests += 1
+            self._errors += 1
+            self._last_error = error
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.open_until = time.time() + self.cooldown
+                self._state_changed = True
+                _logger.warning(
+                    "GeM API circuit opened for %ss after %s consecutive failures: %s",
+                    self.cooldown, self.failures, error
+                )
+
+    def observe(self, open_until):
+        """
+        Align the breaker on a state shared by other workers.
+
+        Args:
+            open_until: Timestamp until which another worker opened the
+                breaker, or None
+        """
+        with self._lock:
+            if open_until == self._observed_open_until:
+                return
+            self._observed_open_until = open_until
+            if open_until and open_until > self.open_until:
+                self.open_until = open_until
+
+    def reset(self):
+        """Close the breaker and forget its failures."""
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self._observed_open_until = None
+
+    def drain_stats(self, interval=0):
+        """
+        Collect the statistics recorded since the last call.
+
+        Args:
+            interval: Minimum seconds between two drains, the statistics are
+                drained earlier when the breaker opened or closed
+
+        Returns:
+            dict: ``requests``, ``errors``, ``last_error``, ``state_changed``
+            and ``open_until``, or None when nothing is due
+        """
+        with self._lock:
+            due = self._state_changed or (
+                self._requests and time.monotonic() - self._drained_at >= interval
+            )
+            if not due:
+                return None
+            stats = {
+                'requests': self._requests,
+                'errors': self._errors,
+                'last_error': self._last_error,
+                'state_changed': self._state_changed,
+                'open_until': self.open_until,
+            }
+            self._reset_stats()
+            return stats
+
+
+def _pool_key(endpoint, pool_size, max_retries):
+    """
+    Build the key identifying the connection pool of an endpoint.
+
+    Args:
+        endpoint: Any URL on the remote host
+        pool_size: Maximum number of kept-alive connections
+        max_retries: Number of connection retries
+
+    Returns:
+        tuple: Pool key
+    """
+    parts = urlsplit(endpoint)
+    return (os.getpid(), parts.scheme, parts.netloc, pool_size, max_retries)
+
+
+def _build_session(pool_size, max_retries, backoff_factor):
+    """
+    Create a keep-alive session with pooled, retrying adapters.
+
+    Only connection failures and idempotent requests are retried here,
+    HTTP error statuses are left to the caller.
+
+    Args:
+        pool_size: Maximum number of kept-alive connections
+        max_retries: Number of connection retries
+        backoff_factor: Backoff factor between retries
+
+    Returns:
+        requests.Session: Configured session
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=0,
+        backoff_factor=backoff_factor,
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.headers['Connection'] = 'keep-alive'
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(endpoint, pool_size=DEFAULT_POOL_SIZE, max_retries=DEFAULT_MAX_RETRIES,
+                backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Get the shared HTTP session of this worker for a GeM endpoint.
+
+    Args:
+        endpoint: Any URL on the remote host
+        pool_size: Maximum number of kept-alive connections
+        max_retries: Number of connection retries
+        backoff_factor: Backoff factor between retries
+
+    Returns:
+        requests.Session: Pooled session for the endpoint's host
+    """
+    key = _pool_key(endpoint, pool_size, max_retries)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                _logger.debug("Opening GeM HTTP pool for %s (size %s)", key[2], pool_size)
+                session = _build_session(pool_size, max_retries, backoff_factor)
+                _sessions[key] = session
+    return session
+
+
+def session_factory(env):
+    """
+    Build a session getter bound to the configured pool settings.
+
+    The returned callable does not use the environment, so it can be
+    handed to threads that must not touch the ORM.
+
+    Args:
+        env: Odoo environment
+
+    Returns:
+        callable: Function returning the pooled session of a URL
+    """
+    ICP = env['ir.config_parameter'].sudo()
+    pool_size = int(ICP.get_param('tender_management.gem_http_pool_size', DEFAULT_POOL_SIZE))
+    max_retries = int(ICP.get_param('tender_management.gem_http_max_retries', DEFAULT_MAX_RETRIES))
+    return lambda endpoint: get_session(endpoint, pool_size=pool_size, max_retries=max_retries)
+
+
+def session_for(env, endpoint):
+    """
+    Get the shared HTTP session for an endpoint using the configured pool settings.
+
+    Args:
+        env: Odoo environment
+        endpoint: Any URL on the remote host
+
+    Returns:
+        requests.Session: Pooled session for the endpoint's host
+    """
+    return session_factory(env)(endpoint)
+
+
+def get_breaker(key, failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN):
+    """
+    Get the circuit breaker of this worker for a remote API.
+
+    Args:
+        key: Hashable key of the API, e.g. the database and portal ID
+        failure_threshold: Consecutive failures opening the breaker
+        cooldown: Seconds during which requests fail fast once open
+
+    Returns:
+        CircuitBreaker: Shared breaker
+    """
+    key = (os.getpid(), key)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker(failure_threshold, cooldown))
+    breaker.failure_threshold = max(failure_threshold, 1)
+    breaker.cooldown = cooldown
+    return breaker
+
+
+def retry_settings(env):
+    """
+    Read the configured retry policy of GeM requests.
+
+    Args:
+        env: Odoo environment
+
+    Returns:
+        dict: Keyword arguments of ``request``
+    """
+    ICP = env['ir.config_parameter'].sudo()
+    return {
+        'max_attempts': int(ICP.get_param('tender_management.gem_http_max_attempts', DEFAULT_MAX_ATTEMPTS)),
+        'backoff_cap': float(ICP.get_param('tender_management.gem_http_backoff_cap', DEFAULT_BACKOFF_CAP)),
+    }
+
+
+def retry_after(response):
+    """
+    Parse the Retry-After header of a response.
+
+    Args:
+        response: requests response
+
+    Returns:
+        float: Seconds to wait, or None when the header is missing
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, backoff_base=DEFAULT_BACKOFF_FACTOR, backoff_cap=DEFAULT_BACKOFF_CAP):
+    """
+    Exponential backoff with full jitter.
+
+    Args:
+        attempt: Number of the failed attempt, starting at 0
+        backoff_base: Delay ceiling of the first retry
+        backoff_cap: Maximum delay ceiling
+
+    Returns:
+        float: Seconds to wait
+    """
+    return random.uniform(0, min(backoff_cap, backoff_base * 2 ** attempt))
+
+
+def request(session, method, url, breaker=None, max_attempts=DEFAULT_MAX_ATTEMPTS,
+            backoff_base=DEFAULT_BACKOFF_FACTOR, backoff_cap=DEFAULT_BACKOFF_CAP, **kwargs):
+    """
+    Send a request, retrying throttled and temporarily failing responses.
+
+    429 responses are retried for any method since the server did not
+    process them, 5xx responses only for idempotent methods. Retry-After is
+    honoured, a retry that would wait longer than ``backoff_cap`` is given
+    up. Connection errors are already retried by the session adapter.
+
+    Args:
+        session: requests session
+        method: HTTP method
+        url: Request URL
+        breaker: CircuitBreaker recording the outcome of the request
+        max_attempts: Maximum number of attempts
+        backoff_base: Delay ceiling of the first retry
+        backoff_cap: Maximum delay between two attempts
+        **kwargs: Arguments of ``session.request``
+
+    Returns:
+        requests.Response: Last response received
+
+    Raises:
+        CircuitOpenError: While the breaker is open
+        requests.exceptions.RequestException: On connection errors
+    """
+    method = method.upper()
+    for attempt in range(max(max_attempts, 1)):
+        if breaker:
+            breaker.before_request()
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if breaker:
+                breaker.record_failure(str(e))
+            raise
+
+        if response.status_code not in RETRY_STATUSES:
+            if breaker:
+                breaker.record_success()
+            return response
+        if breaker:
+            breaker.record_failure(f"HTTP {response.status_code}")
+
+        if attempt + 1 >= max_attempts or not (method in IDEMPOTENT_METHODS or response.status_code == 429):
+            return response
+        delay = max(retry_after(response) or 0.0, backoff_delay(attempt, backoff_base, backoff_cap))
+        if delay > backoff_cap:
+            return response
+        _logger.info("GeM API returned %s for %s, retrying in %.1fs", response.status_code, url, delay)
+        response.close()
+        time.sleep(delay)
+    return response
+
+
+def conditional_headers(etag=None, last_modified=None):
+    """
+    Build the headers of a conditional GET from cached validators.
+
+    Args:
+        etag: ETag of the cached copy
+        last_modified: Last-Modified date of the cached copy
+
+    Returns:
+        dict: Conditional request headers
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    return headers
+
+
+def response_validators(response):
+    """
+    Extract the cache validators of a response.
+
+    Args:
+        response: requests response
+
+    Returns:
+        dict: ``etag`` and ``last_modified`` of the response
+    """
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def close_sessions():
+    """
+    Close every session opened by this process.
+    """
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import gem_session
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 5.0
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_BULK_SIZE = 100
+DEFAULT_TIMEOUT = 15
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting the request rate to a portal.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE, burst=None):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate: Sustained number of requests per second
+            burst: Number of requests allowed at once, defaults to ``rate``
+        """
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(burst or rate), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """
+        Wait until a request may be sent.
+
+        Args:
+            deadline: ``time.monotonic()`` value after which to give up
+
+        Returns:
+            bool: True when a request may be sent, False if the deadline
+            would be exceeded first
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+def parse_bulk_statuses(payload):
+    """
+    Index the statuses returned by the bulk status endpoint by bid ID.
+
+    Args:
+        payload: Response of ``GET /bids/status`` with several bid IDs,
+            either a list or a dict holding it under ``statuses``/``items``
+
+    Returns:
+        dict: Status data by GeM bid ID
+    """
+    if isinstance(payload, dict):
+        payload = payload.get('statuses') or payload.get('items') or []
+    return {
+        status['bidId']: status
+        for status in payload or []
+        if isinstance(status, dict) and status.get('bidId')
+    }
+
+
+class GemStatusPoller:
+    """
+    Fetch GeM bid statuses concurrently under a request rate limit.
+
+    Like the document downloader, worker threads only perform HTTP calls:
+    the statuses are returned to the caller which updates the records.
+    """
+
+    def __init__(self, get_session, endpoint, headers=None, rate_limiter=None,
+                 max_workers=DEFAULT_MAX_WORKERS, bulk_size=0, timeout=DEFAULT_TIMEOUT,
+                 breaker=None, retry=None):
+        """
+        Initialize the poller.
+
+        Args:
+            get_session: Callable returning the requests session of a URL
+            endpoint: GeM API endpoint of the portal
+            headers: Headers sent with every request
+            rate_limiter: RateLimiter shared by the requests to the portal
+            max_workers: Maximum number of concurrent requests
+            bulk_size: Bids per request of the bulk status endpoint, 0 when
+                the portal only offers per-bid statuses
+            timeout: Timeout of a single request in seconds
+            breaker: CircuitBreaker of the portal
+            retry: Retry policy, see ``gem_session.request``
+        """
+        self.get_session = get_session
+        self.endpoint = endpoint.rstrip('/')
+        self.headers = headers or {}
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_workers = max(max_workers, 1)
+        self.bulk_size = max(bulk_size, 0)
+        self.timeout = timeout
+        self.breaker = breaker
+        self.retry = retry or {}
+
+    def _get(self, url, params=None):
+        response = gem_session.request(
+            self.get_session(url), 'GET', url, breaker=self.breaker,
+            headers=self.headers, params=params, timeout=self.timeout, **self.retry
+        )
+        if response.status_code != 200:
+            raise ValueError(f"HTTP {response.status_code}")
+        return response.json()
+
+    def fetch_status(self, bid_id, deadline=None):
+        """
+        Fetch the status of a single bid.
+
+        Args:
+            bid_id: GeM bid ID
+            deadline: ``time.monotonic()`` value after which to give up
+
+        Returns:
+            dict: ``{bid_id: status}``, ``{bid_id: {'error': ...}}`` or an
+            empty dict when the deadline was reached or the circuit is open
+        """
+        if not self.rate_limiter.acquire(deadline):
+            return {}
+        try:
+            return {bid_id: self._get(f"{self.endpoint}/bids/{bid_id}/status")}
+        except gem_session.CircuitOpenError:
+            # Deferred to a later run rather than reported as failed
+            return {}
+        except Exception as e:
+            return {bid_id: {'error': str(e)}}
+
+    def fetch_bulk(self, bid_ids, deadline=None):
+        """
+        Fetch the statuses of several bids with the bulk status endpoint.
+
+        Args:
+            bid_ids: GeM bid IDs
+            deadline: ``time.monotonic()`` value after which to give up
+
+        Returns:
+            dict: Status data or ``{'error': ...}`` by bid ID, empty when the
+            deadline was reached or the circuit is open
+        """
+        if not self.rate_limiter.acquire(deadline):
+            return {}
+        try:
+            statuses = parse_bulk_statuses(self._get(
+                f"{self.endpoint}/bids/status", params={'bid_ids': ','.join(bid_ids)}
+            ))
+        except gem_session.CircuitOpenError:
+            return {}
+        except Exception as e:
+            return {bid_id: {'error': str(e)} for bid_id in bid_ids}
+        return {bid_id: statuses.get(bid_id, {'error': "Missing from bulk response"}) for bid_id in bid_ids}
+
+    def poll(self, bid_ids, deadline=None):
+        """
+        Fetch the statuses of bids concurrently.
+
+        Bids whose request could not start before the deadline or while the
+        circuit breaker is open are left out of the result so the caller
+        can poll them on a later run.
+
+        Args:
+            bid_ids: GeM bid IDs
+            deadline: ``time.monotonic()`` value after which no request starts
+
+        Returns:
+            dict: Status data or ``{'error': ...}`` by bid ID
+        """
+        if not bid_ids:
+            return {}
+        start = time.perf_counter()
+        if self.bulk_size:
+            batches = [bid_ids[i:i + self.bulk_size] for i in range(0, len(bid_ids), self.bulk_size)]
+            fetch = self.fetch_bulk
+        else:
+            batches = bid_ids
+            fetch = self.fetch_status
+
+        statuses = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)),
+                                thread_name_prefix='gem_status') as executor:
+            for result in executor.map(lambda batch: fetch(batch, deadline), batches):
+                statuses.update(result)
+
+        failed = sum(1 for status in statuses.values() if 'error' in status)
+        _logger.info(
+            "Polled %s GeM bid statuses (%s failed, %s deferred) in %.3fs",
+            len(statuses) - failed, failed, len(bid_ids) - len(statuses), time.perf_counter() - start
+        )
+        return statuses
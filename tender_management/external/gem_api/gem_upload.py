@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import re
+import time
+import uuid
+
+from . import gem_session
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_READ_SIZE = 1024 * 1024
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_TIMEOUT = 300
+CONNECT_TIMEOUT = 10
+
+
+class UploadError(Exception):
+    """Raised when GeM rejects an upload."""
+
+
+class MultipartStream:
+    """
+    multipart/form-data body streaming its files from disk.
+
+    The body is produced part by part and files are read ``read_size``
+    bytes at a time, so an upload holds a single block in memory whatever
+    the file size. The stream can be iterated again, which lets a
+    throttled request be retried, and its length is known in advance so
+    it is sent with a Content-Length.
+    """
+
+    def __init__(self, fields=None, files=None, boundary=None, read_size=DEFAULT_READ_SIZE):
+        """
+        Initialize the body.
+
+        Args:
+            fields: Dictionary of form fields
+            files: List of ``(name, filename, path, content_type)`` tuples
+            boundary: Multipart boundary, random by default
+            read_size: Number of bytes read from a file at a time
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.read_size = read_size
+        self._parts = []
+        for name, value in (fields or {}).items():
+            header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{self._quote(name)}"\r\n\r\n'
+            value = str(value).encode()
+            self._parts.append((header.encode(), value, len(value)))
+        for name, filename, path, content_type in files or []:
+            header = (
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{self._quote(name)}"; filename="{self._quote(filename)}"\r\n'
+                f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'
+            )
+            self._parts.append((header.encode(), path, os.path.getsize(path)))
+        self._closing = f'--{self.boundary}--\r\n'.encode()
+
+    @staticmethod
+    def _quote(value):
+        return str(value).replace('\\', '\\\\').replace('"', '%22').replace('\r', ' ').replace('\n', ' ')
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return sum(len(header) + size + 2 for header, _source, size in self._parts) + len(self._closing)
+
+    def __iter__(self):
+        for header, source, _size in self._parts:
+            yield header
+            if isinstance(source, bytes):
+                yield source
+            else:
+                with open(source, 'rb') as part_file:
+                    while True:
+                        block = part_file.read(self.read_size)
+                        if not block:
+                            break
+                        yield block
+            yield b'\r\n'
+        yield self._closing
+
+
+def parse_range_offset(response):
+    """
+    Get the number of bytes received by GeM from an upload response.
+
+    Args:
+        response: Response of an upload chunk or upload status request
+
+    Returns:
+        int: Offset of the next chunk, None when the response has none
+    """
+    match = re.match(r'bytes=(\d+)-(\d+)', response.headers.get('Range') or '')
+    if match:
+        return int(match.group(2)) + 1
+    try:
+        offset = response.json().get('offset')
+    except ValueError:
+        return None
+    return int(offset) if offset is not None else None
+
+
+class GemDocumentUploader:
+    """
+    Upload documents to GeM without loading them in memory.
+
+    Files are either streamed as a single multipart request, or sent in
+    chunks through an upload session when the portal offers resumable
+    uploads: an interrupted session is resumed from the offset GeM
+    acknowledged instead of starting over.
+    """
+
+    def __init__(self, get_session, endpoint, headers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 timeout=DEFAULT_TIMEOUT, breaker=None, retry=None):
+        """
+        Initialize the uploader.
+
+        Args:
+            get_session: Callable returning the requests session of a URL
+            endpoint: GeM API endpoint of the portal
+            headers: Headers sent with every request
+            chunk_size: Size of the chunks of a resumable upload
+            timeout: Read timeout of a single request in seconds
+            breaker: CircuitBreaker of the portal
+            retry: Retry policy, see ``gem_session.request``
+        """
+        self.get_session = get_session
+        self.endpoint = endpoint.rstrip('/')
+        self.headers = headers or {}
+        self.chunk_size = max(int(chunk_size), 1)
+        self.timeout = timeout
+        self.breaker = breaker
+        self.retry = retry or {}
+
+    def _request(self, method, url, headers=None, **kwargs):
+        return gem_session.request(
+            self.get_session(url), method, url, breaker=self.breaker,
+            headers=dict(self.headers, **(headers or {})),
+            timeout=(CONNECT_TIMEOUT, self.timeout), **dict(self.retry, **kwargs)
+        )
+
+    @staticmethod
+    def _check(response, *statuses):
+        if response.status_code not in statuses:
+            raise UploadError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response
+
+    def upload(self, path, filename, content_type=None, fields=None):
+        """
+        Upload a file as one streamed multipart request.
+
+        Args:
+            path: Path of the file
+            filename: Name of the file on GeM
+            content_type: MIME type of the file
+            fields: Form fields sent with the file
+
+        Returns:
+            dict: Upload response
+
+        Raises:
+            UploadError: When GeM rejects the upload
+        """
+        start = time.perf_counter()
+        body = MultipartStream(fields, [('file', filename, path, content_type)])
+        response = self._check(self._request(
+            'POST', f"{self.endpoint}/documents/upload", data=body,
+            headers={'Content-Type': body.content_type}
+        ), 200, 201)
+        _logger.info("Uploaded %s (%s bytes) to GeM in %.3fs", filename, len(body), time.perf_counter() - start)
+        return response.json()
+
+    def upload_offset(self, upload_id):
+        """
+        Get the number of bytes of an upload session received by GeM.
+
+        Args:
+            upload_id: ID of the upload session
+
+        Returns:
+            int: Offset to resume from, None when the session is unknown
+        """
+        response = self._request('GET', f"{self.endpoint}/documents/uploads/{upload_id}")
+        if response.status_code != 200:
+            return None
+        return parse_range_offset(response)
+
+    def upload_resumable(self, path, filename, content_type=None, fields=None, upload_id=None, on_progress=None):
+        """
+        Upload a file in chunks through a resumable upload session.
+
+        Args:
+            path: Path of the file
+            filename: Name of the file on GeM
+            content_type: MIME type of the file
+            fields: Metadata of the upload session
+            upload_id: Session of an interrupted upload to resume
+            on_progress: Callable receiving the session ID and offset after
+                every acknowledged chunk
+
+        Returns:
+            dict: Response of the last chunk, with the ``uploadId``
+
+        Raises:
+            UploadError: When GeM rejects the upload
+        """
+        start = time.perf_counter()
+        size = os.path.getsize(path)
+        chunk_size = self.chunk_size
+        offset = self.upload_offset(upload_id) if upload_id else None
+        if offset is None:
+            response = self._check(self._request('POST', f"{self.endpoint}/documents/uploads", json=dict(
+                fields or {}, fileName=filename, contentType=content_type, size=size
+            )), 200, 201)
+            session = response.json()
+            upload_id = session['uploadId']
+            offset = int(session.get('offset') or 0)
+            chunk_size = int(session.get('chunkSize') or chunk_size)
+        else:
+            _logger.info("Resuming upload of %s to GeM at %s/%s bytes", filename, offset, size)
+        if on_progress:
+            on_progress(upload_id, offset)
+
+        url = f"{self.endpoint}/documents/uploads/{upload_id}"
+        with open(path, 'rb') as upload_file:
+            while True:
+                upload_file.seek(offset)
+                chunk = upload_file.read(chunk_size)
+                content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{size}" if chunk else f"bytes */{size}"
+                response = self._check(self._request(
+                    'PUT', url, data=chunk,
+                    headers={'Content-Type': 'application/octet-stream', 'Content-Range': content_range}
+                ), 200, 201, 308)
+                if response.status_code != 308:
+                    break
+                if not chunk:
+                    raise UploadError(f"GeM did not complete the upload of {filename}")
+                received = parse_range_offset(response)
+                offset = received if received is not None else offset + len(chunk)
+                if on_progress:
+                    on_progress(upload_id, offset)
+
+        _logger.info(
+            "Uploaded %s (%s bytes) to GeM in chunks of %s bytes in %.3fs",
+            filename, size, chunk_size, time.perf_counter() - start
+        )
+        result = response.json()
+        result.setdefault('uploadId', upload_id)
+        return result
@@ -1,3 +1,9 @@
 # -*- coding: utf-8 -*-
 
+from . import content_html
+from . import field_extraction
+from . import image_preprocess
 from . import ocr_processor
+from . import ocr_parallel
+from . import ocr_stream
+from . import page_classifier
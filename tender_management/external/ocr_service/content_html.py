@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import html
+import re
+import zlib
+
+# Key information highlighted in the OCR content, with its background color
+HIGHLIGHTS = [
+    ('deadline', '#FFFF00', ('deadline', 'submission date', 'closing date')),
+    ('value', '#AAFFAA', ('estimated value', 'tender value', 'budget', 'cost')),
+    ('reference', '#AAAAFF', ('tender number', 'tender id', 'reference number')),
+    ('authority', '#FFAAAA', ('issuing authority', 'issuer', 'department', 'ministry')),
+]
+HIGHLIGHT_COLORS = {name: color for name, color, _keywords in HIGHLIGHTS}
+
+# Every highlight in a single alternation, the name of the matched group
+# gives the color
+HIGHLIGHT_PATTERN = re.compile(r'\b(?:%s)\b' % '|'.join(
+    '(?P<%s>%s)' % (name, '|'.join(re.escape(keyword) for keyword in keywords))
+    for name, _color, keywords in HIGHLIGHTS
+), re.IGNORECASE)
+
+# Characters of a displayed page: longer pages, or documents without
+# pages such as text files, are split at line ends
+MAX_PAGE_CHARS = 20000
+PAGE_MARKER = re.compile(r'^--- Page (\d+) ---\n', re.MULTILINE)
+COMPRESSION_LEVEL = 6
+
+
+def _highlight(match):
+    return '<span style="background-color: %s;">%s</span>' % (
+        HIGHLIGHT_COLORS[match.lastgroup], match.group(0)
+    )
+
+
+def render_page(text):
+    """
+    Render the text of a page as HTML with the key information highlighted.
+
+    Args:
+        text: Page text
+
+    Returns:
+        str: HTML of the page, the text is escaped
+    """
+    escaped = html.escape(text or '', quote=False)
+    return HIGHLIGHT_PATTERN.sub(_highlight, escaped).replace('\n', '<br/>')
+
+
+def page_spans(content, pages=None):
+    """
+    Split the OCR content into displayed pages.
+
+    Args:
+        content: OCR content
+        pages: Page metadata with the ``start`` and ``end`` of each page in
+            the content, see ``tender.ocr.cache._page_spans``. The page
+            markers of the content are used when missing
+
+    Returns:
+        list: Tuples of the document page number (1-based), start and end
+    """
+    spans = []
+    if pages and all(page.get('start') is not None for page in pages):
+        spans = [(page['page'] + 1, page['start'], page['end']) for page in pages]
+    else:
+        markers = list(PAGE_MARKER.finditer(content))
+        if markers:
+            ends = [marker.start() for marker in markers[1:]] + [len(content)]
+            spans = [(int(marker.group(1)), marker.end(), end) for marker, end in zip(markers, ends)]
+        elif content:
+            spans = [(1, 0, len(content))]
+
+    result = []
+    for page, start, end in spans:
+        while end - start > MAX_PAGE_CHARS:
+            cut = content.rfind('\n', start, start + MAX_PAGE_CHARS)
+            cut = cut + 1 if cut > start else start + MAX_PAGE_CHARS
+            result.append((page, start, cut))
+            start = cut
+        result.append((page, start, end))
+    return result
+
+
+def pack_pages(content, pages=None):
+    """
+    Render the pages of the OCR content into independently compressed blocks.
+
+    Args:
+        content: OCR content
+        pages: Page metadata, see ``page_spans``
+
+    Returns:
+        tuple: Concatenated blocks and the index of the blocks, a list of
+        document page number, offset and length of each displayed page
+    """
+    blocks, index, offset = [], [], 0
+    for page, start, end in page_spans(content or '', pages):
+        block = zlib.compress(render_page(content[start:end]).encode('utf-8'), COMPRESSION_LEVEL)
+        blocks.append(block)
+        index.append([page, offset, len(block)])
+        offset += len(block)
+    return b''.join(blocks), index
+
+
+def unpack_page(block):
+    """
+    Decompress the block of a displayed page.
+
+    Args:
+        block: Compressed block, see ``pack_pages``
+
+    Returns:
+        str: HTML of the page
+    """
+    return zlib.decompress(block).decode('utf-8')
@@ -0,0 +1,440 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import logging
+import re
+import time
+from datetime import datetime
+
+_logger = logging.getLogger(__name__)
+
+# A rule is tried where the scan meets one of its keywords, or at the start
+# of a number or of an e-mail address
+TRIGGER_KEYWORD = 'keyword'
+TRIGGER_NUMBER = 'number'
+TRIGGER_EMAIL = 'email'
+
+MONTHS = r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*'
+DATE = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}(?:st|nd|rd|th)?\s+' + MONTHS + r'\s+\d{2,4}'
+TIME = r'\d{1,2}:\d{2}(?:\s*[AP]M)?'
+# Thousands separators of both international and Indian (1,20,000) notations
+AMOUNT = r'\d+(?:,\d+)*(?:\.\d+)?'
+CURRENCY = r'(?:Rs\.?|INR|₹)'
+REFERENCE = r'[A-Z0-9-/]+'
+
+DATE_FORMATS = (
+    '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M', '%d/%m/%Y %I:%M %p', '%d-%m-%Y %I:%M %p',
+    '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y',
+    '%d %b %Y %H:%M', '%d %B %Y %H:%M', '%d %b %Y %I:%M %p', '%d %B %Y %I:%M %p', '%d %b %Y', '%d %B %Y',
+)
+
+
+def parse_date(value):
+    """
+    Parse a date found in a tender document, days first.
+
+    Args:
+        value: Date string, optionally followed by a time
+
+    Returns:
+        datetime: Parsed date, None when the format is not recognized
+    """
+    value = re.sub(r'(\d)(?:st|nd|rd|th)\b', r'\1', ' '.join(value.split()))
+    value = re.sub(r'(\d)([AP]M)$', r'\1 \2', value, flags=re.IGNORECASE)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    """
+    Parse an amount with thousands separators.
+
+    Args:
+        value: Amount string, e.g. ``1,20,000.50``
+
+    Returns:
+        float: Amount, None when the string is not a number
+    """
+    try:
+        return float(value.replace(',', ''))
+    except ValueError:
+        return None
+
+
+def parse_monetary_value(value):
+    """Parse an amount, ignoring small numbers that are unlikely to be money"""
+    amount = parse_amount(value)
+    return amount if amount is not None and amount >= 100 else None
+
+
+def strip_value(value):
+    """Strip a text value, dropping empty ones"""
+    return value.strip() or None
+
+
+class FieldRule:
+    """
+    Pattern extracting a field from OCR text.
+
+    The pattern must start with one of the rule keywords when the rule is
+    triggered by keywords. Its first group, or the whole match when it has
+    no group, is converted to the field value.
+    """
+
+    __slots__ = ('field', 'pattern', 'regex', 'keywords', 'trigger', 'convert', 'confidence', 'priority')
+
+    def __init__(self, field, pattern, keywords=(), trigger=TRIGGER_KEYWORD, convert=strip_value,
+                 confidence=0.9, priority=0, flags=re.IGNORECASE):
+        """
+        Initialize the rule.
+
+        Args:
+            field: Name of the extracted field
+            pattern: Regular expression matching the field
+            keywords: Lowercase words the pattern can start with
+            trigger: ``keyword``, ``number`` or ``email``
+            convert: Callable converting the matched text, returning None
+                to reject the match
+            confidence: Confidence of a match (0-1), lower for loose patterns
+            priority: Rules of a field with a lower priority are preferred
+            flags: Regular expression flags
+        """
+        self.field = field
+        self.pattern = pattern
+        self.regex = re.compile(pattern, flags)
+        self.keywords = tuple(keywords)
+        self.trigger = trigger
+        self.convert = convert
+        self.confidence = confidence
+        self.priority = priority
+
+
+class FieldMatch:
+    """Value of a field found in the text, with its position and confidence"""
+
+    __slots__ = ('field', 'value', 'raw', 'start', 'end', 'confidence', 'priority')
+
+    def __init__(self, field, value, raw, start, end, confidence, priority):
+        self.field = field
+        self.value = value
+        self.raw = raw
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.priority = priority
+
+    def to_dict(self):
+        return {
+            'value': self.value.isoformat() if isinstance(self.value, datetime) else self.value,
+            'raw': self.raw,
+            'start': self.start,
+            'end': self.end,
+            'confidence': round(self.confidence, 3),
+        }
+
+
+class ExtractionResult:
+    """Matches of the fields extracted from a text"""
+
+    def __init__(self, matches, duration=0.0):
+        self.matches = matches
+        self.duration = duration
+
+    def best(self, field):
+        """
+        Get the preferred match of a field: the first match of its highest
+        priority rule.
+
+        Args:
+            field: Field name
+
+        Returns:
+            FieldMatch: Best match, None when the field was not found
+        """
+        matches = self.matches.get(field)
+        if not matches:
+            return None
+        return min(matches, key=lambda match: (match.priority, match.start))
+
+    def value(self, field, default=None):
+        """Value of the best match of a field"""
+        match = self.best(field)
+        return match.value if match else default
+
+    def values(self, field):
+        """Values of all the matches of a field, in text order"""
+        return [match.value for match in sorted(self.matches.get(field, []), key=lambda match: match.start)]
+
+    def to_dict(self, fields=None):
+        """Best match of each field, with its position and confidence"""
+        return {
+            field: self.best(field).to_dict()
+            for field in (fields or self.matches) if self.matches.get(field)
+        }
+
+
+class FieldExtractionEngine:
+    """
+    Extract fields from OCR text in a single scan.
+
+    The rules are precompiled once. A single regular expression combining
+    every rule keyword, number and e-mail address start walks through the
+    text; where it stops, only the rules registered for that trigger are
+    tried, anchored at that position. Multi-megabyte OCR output is scanned
+    once instead of once per pattern, and every match keeps its position.
+    Keywords are only recognized at the start of a word.
+    """
+
+    def __init__(self, rules):
+        """
+        Initialize the engine.
+
+        Args:
+            rules: FieldRule list
+        """
+        self.rules = list(rules)
+        self.fields = {rule.field for rule in self.rules}
+        keywords = sorted({keyword for rule in self.rules for keyword in rule.keywords}, key=len, reverse=True)
+        # Rules of every keyword prefixing the one scanned, e.g. "ref" for "reference"
+        self._keyword_rules = {
+            keyword: [rule for rule in self.rules
+                      if rule.trigger == TRIGGER_KEYWORD and any(keyword.startswith(k) for k in rule.keywords)]
+            for keyword in keywords
+        }
+        self._number_rules = [rule for rule in self.rules if rule.trigger == TRIGGER_NUMBER]
+        self._email_rules = [rule for rule in self.rules if rule.trigger == TRIGGER_EMAIL]
+
+        triggers = []
+        if self._email_rules:
+            triggers.append(r'(?P<email>(?<![a-z0-9._%+-])[a-z0-9._%+-]+@)')
+        if keywords:
+            triggers.append(r'(?P<keyword>\b(?:%s))' % _trie_pattern(keywords))
+        if self._number_rules:
+            triggers.append(r'(?P<number>\+?\d[\d,.]*)')
+        # The lowercased text is scanned: case-insensitive alternations are
+        # several times slower in the re module
+        self._scanner = re.compile('|'.join(triggers)) if triggers else None
+        self._scanner_ci = re.compile('|'.join(triggers), re.IGNORECASE) if triggers else None
+
+    def extract(self, text, pages=None, ocr_confidence=None):
+        """
+        Extract the fields of a text.
+
+        Args:
+            text: OCR text
+            pages: Page spans with ``start``, ``end`` and ``confidence``
+                (0-100), the confidence of a match is weighted by the OCR
+                confidence of its page
+            ocr_confidence: OCR confidence (0-100) of the whole text, used
+                when there are no page spans
+
+        Returns:
+            ExtractionResult: Matches by field
+        """
+        start_time = time.perf_counter()
+        matches = {}
+        if not text or not self._scanner:
+            return ExtractionResult(matches)
+
+        page_confidence = self._page_confidence(pages, ocr_confidence)
+        # Matches of a rule do not overlap, like re.findall
+        rule_ends = {}
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            triggers = self._scanner.finditer(lowered)
+        else:
+            # Some characters lowercase to several, positions would not match
+            triggers = self._scanner_ci.finditer(text)
+        for trigger in triggers:
+            kind = trigger.lastgroup
+            if kind == 'keyword':
+                rules = self._keyword_rules.get(trigger.group('keyword').lower(), ())
+            elif kind == 'number':
+                rules = self._number_rules
+            else:
+                rules = self._email_rules
+            position = trigger.start()
+            for rule in rules:
+                if rule_ends.get(id(rule), 0) > position:
+                    continue
+                match = rule.regex.match(text, position)
+                if not match and kind == 'number' and text[position] == '+':
+                    # Only phone numbers start with their international prefix
+                    match = rule.regex.match(text, position + 1)
+                if not match:
+                    continue
+                group = 1 if rule.regex.groups else 0
+                raw = match.group(group)
+                value = rule.convert(raw) if raw is not None else None
+                if value is None:
+                    continue
+                rule_ends[id(rule)] = match.end()
+                # The span covers the stripped value, not the whitespace around it
+                stripped = raw.strip()
+                start = match.start(group) + len(raw) - len(raw.lstrip())
+                matches.setdefault(rule.field, []).append(FieldMatch(
+                    rule.field, value, stripped, start, start + len(stripped),
+                    rule.confidence * page_confidence(start), rule.priority,
+                ))
+        return ExtractionResult(matches, time.perf_counter() - start_time)
+
+    @staticmethod
+    def _page_confidence(pages, ocr_confidence):
+        spans = [page for page in pages or [] if page.get('start') is not None]
+        if not spans:
+            factor = ocr_confidence / 100.0 if ocr_confidence else 1.0
+            return lambda position: factor
+        starts = [page['start'] for page in spans]
+
+        def page_confidence(position):
+            index = bisect.bisect_right(starts, position) - 1
+            return spans[max(index, 0)].get('confidence', 100.0) / 100.0
+        return page_confidence
+
+
+def _trie_pattern(words):
+    # Alternation factored by common prefix, e.g. is(?:sued|suing)
+    groups = {}
+    for word in words:
+        groups.setdefault(word[:1], []).append(word[1:])
+    branches = []
+    for head, tails in sorted(groups.items()):
+        if not head:
+            continue
+        optional = '' in tails
+        tails = [tail for tail in tails if tail]
+        branch = re.escape(head)
+        if len(tails) == 1 and not optional:
+            branch += re.escape(tails[0])
+        elif tails:
+            branch += '(?:%s)%s' % (_trie_pattern(tails), '?' if optional else '')
+        branches.append(branch)
+    return '|'.join(branches)
+
+
+def _keyword_rules(field, keywords, patterns, priority=0, **kwargs):
+    # Patterns of a field are preferred in the order they are listed
+    return [FieldRule(field, pattern, keywords, priority=priority + index, **kwargs)
+            for index, pattern in enumerate(patterns)]
+
+
+# Registry of the field rules, by field
+FIELD_RULES = (
+    # Tender OCR
+    _keyword_rules('submission_deadline', ('submission', 'closing', 'deadline'), [
+        r'(?:submission|closing|deadline)[^\n]*?((?:%s)\s+%s)' % (DATE, TIME),
+        r'(?:submission|closing|deadline)[^\n]*?(%s)' % DATE,
+    ], convert=parse_date)
+    + _keyword_rules('tender_value', ('estimated', 'tender', 'contract'), [
+        r'(?:estimated|tender|contract)\s+value\s*(?::|is|of)?\s*(?:Rs\.?|[A-Z]{3}|[₹$€£])?\s*(%s)' % AMOUNT,
+    ], convert=parse_amount)
+    + _keyword_rules('tender_value', ('budget', 'cost'), [
+        r'(?:budget|cost)\s*(?::|is|of)?\s*(?:Rs\.?|[A-Z]{3}|[₹$€£])?\s*(%s)' % AMOUNT,
+    ], convert=parse_amount, confidence=0.7, priority=1)
+    + _keyword_rules('tender_value', ('value',), [
+        r'value\s*:\s*(?:Rs\.?|[A-Z]{3}|[₹$€£])?\s*(%s)' % AMOUNT,
+    ], convert=parse_amount, confidence=0.6, priority=2)
+    + _keyword_rules('tender_id', ('tender', 'bid', 'ref'), [
+        r'(?:tender|bid|ref(?:erence)?)\s*(?:no|number|id)\.?\s*:?\s*([A-Z0-9-_/]+)',
+    ])
+    + _keyword_rules('issuing_authority', ('issuing', 'procuring'), [
+        r'(?:issuing|procuring)\s+authority\s*:?\s*([^\n]+)',
+    ])
+    + _keyword_rules('issuing_authority', ('issued', 'procured'), [
+        r'(?:issued|procured)\s+by\s*:?\s*([^\n]+)',
+    ], confidence=0.8, priority=1)
+    + _keyword_rules('issuing_authority', ('department', 'ministry', 'organization'), [
+        r'(?:department|ministry|organization)\s*:?\s*([^\n]+)',
+    ], confidence=0.6, priority=2)
+
+    # Tender notices, bid documents and corrigenda
+    + _keyword_rules('tender_reference', ('tender', 'bid'), [
+        r'(?:Tender|Bid)\s+(?:ID|No|Number|Ref|Reference)\s*:?\s*(%s)' % REFERENCE,
+    ])
+    + _keyword_rules('title', ('title', 'subject'), [r'(?:Title|Subject)\s*:?\s*(.+?)(?:\n|$)'])
+    + _keyword_rules('organization', ('organization', 'authority', 'department', 'ministry'), [
+        r'(?:Organization|Authority|Department|Ministry)\s*:?\s*(.+?)(?:\n|$)',
+    ], confidence=0.7)
+    + _keyword_rules('start_date', ('start', 'submission', 'publishing'), [
+        r'(?:Start|Submission|Publishing)\s+Date\s*:?\s*(%s)' % DATE,
+    ])
+    + _keyword_rules('closing_date', ('end', 'closing', 'due'), [
+        r'(?:End|Closing|Due)\s+Date\s*:?\s*(%s)' % DATE,
+    ])
+    + _keyword_rules('estimated_value', ('estimated', 'approximate', 'approx'), [
+        r'(?:Estimated|Approximate|Approx\.?)\s+(?:Value|Cost|Amount|Budget)\s*:?\s*%s?\s*(%s)' % (CURRENCY, AMOUNT),
+    ], convert=parse_amount)
+    + _keyword_rules('bidder_name', ('bidder', 'company', 'vendor', 'supplier'), [
+        r'(?:Bidder|Company|Vendor|Supplier)\s+Name\s*:?\s*(.+?)(?:\n|$)',
+    ])
+    + _keyword_rules('bid_amount', ('bid', 'quoted', 'total'), [
+        r'(?:Bid|Quoted|Total)\s+(?:Amount|Value|Price|Cost)\s*:?\s*%s?\s*(%s)' % (CURRENCY, AMOUNT),
+    ], convert=parse_amount)
+    + _keyword_rules('bid_date', ('submission', 'bid'), [
+        r'(?:Submission|Bid)\s+Date\s*:?\s*(%s)' % DATE,
+    ])
+    + _keyword_rules('contact_person', ('contact', 'authorized'), [
+        r'(?:Contact|Authorized)\s+Person\s*:?\s*(.+?)(?:\n|$)',
+    ])
+    + _keyword_rules('contact_phone', ('phone', 'mobile', 'tel', 'contact'), [
+        r'(?:Phone|Mobile|Tel|Contact)\s*(?:No|Number)?\s*:?\s*(\+?\d[\d\s-]{8,})',
+    ])
+    + _keyword_rules('corrigendum_no', ('corrigendum',), [
+        r'Corrigendum\s+(?:No|Number)\s*:?\s*(\d+)',
+    ], convert=int)
+    + _keyword_rules('original_date', ('original', 'earlier', 'previous'), [
+        r'(?:Original|Earlier|Previous)\s+(?:Date|Time)\s*:?\s*(%s)' % DATE,
+    ])
+    + _keyword_rules('revised_date', ('revised', 'new', 'extended'), [
+        r'(?:Revised|New|Extended)\s+(?:Date|Time)\s*:?\s*(%s)' % DATE,
+    ])
+    + _keyword_rules('change', ('change', 'amendment', 'modification', 'revision'), [
+        r'(?:Change|Amendment|Modification|Revision)\s+\d+\s*:?\s*(.+?)(?:\n\n|\Z)',
+    ], flags=re.IGNORECASE | re.DOTALL)
+    + _keyword_rules('reference_number', ('id', 'no', 'number', 'ref', 'reference'), [
+        r'(?:ID|No|Number|Ref|Reference)\s*:?\s*(%s)' % REFERENCE,
+    ], confidence=0.5)
+
+    # Values found anywhere
+    + [
+        FieldRule('email', r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', trigger=TRIGGER_EMAIL, flags=0),
+        FieldRule('date', r'(%s)' % DATE, trigger=TRIGGER_NUMBER, confidence=0.5),
+        # The currency is optional, so amounts are matched from their first digit
+        FieldRule('monetary_value', r'(%s)' % AMOUNT, trigger=TRIGGER_NUMBER,
+                  convert=parse_monetary_value, confidence=0.4, flags=0),
+        FieldRule('phone_number', r'(\+?\d[\d\s-]{8,})', trigger=TRIGGER_NUMBER, confidence=0.4),
+    ]
+)
+
+# Fields extracted from each kind of document
+PROFILES = {
+    'tender_ocr': ('submission_deadline', 'tender_value', 'tender_id', 'issuing_authority'),
+    'tender_notice': ('tender_reference', 'title', 'organization', 'start_date', 'closing_date', 'estimated_value'),
+    'bid_document': ('tender_reference', 'bidder_name', 'bid_amount', 'bid_date', 'contact_person', 'email',
+                     'contact_phone'),
+    'corrigendum': ('tender_reference', 'corrigendum_no', 'original_date', 'revised_date', 'change'),
+    'generic': ('reference_number', 'date', 'monetary_value', 'email', 'phone_number', 'organization'),
+}
+
+# Engines are compiled once, at import
+ENGINES = {
+    profile: FieldExtractionEngine([rule for rule in FIELD_RULES if rule.field in fields])
+    for profile, fields in PROFILES.items()
+}
+
+
+def get_engine(profile):
+    """
+    Get the precompiled engine of a document profile.
+
+    Args:
+        profile: Key of ``PROFILES``
+
+    Returns:
+        FieldExtractionEngine: Engine extracting the fields of the profile
+    """
+    return ENGINES[profile]
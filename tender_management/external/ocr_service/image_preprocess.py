@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+
+import numpy as np
+from PIL import Image
+
+_logger = logging.getLogger(__name__)
+
+STAGE_NORMALIZE = 'normalize'
+STAGE_GRAYSCALE = 'grayscale'
+STAGE_BLANK = 'blank'
+STAGE_DESKEW = 'deskew'
+STAGE_BINARIZE = 'binarize'
+# Stages in the order they run
+STAGES = (STAGE_NORMALIZE, STAGE_GRAYSCALE, STAGE_BLANK, STAGE_DESKEW, STAGE_BINARIZE)
+# Tesseract binarizes pages itself (Otsu), the adaptive threshold only pays
+# off on photos with uneven lighting and is left to enable
+DEFAULT_STAGES = ','.join(stage for stage in STAGES if stage != STAGE_BINARIZE)
+
+# Resolution Tesseract is trained for
+DEFAULT_TARGET_DPI = 300
+# Longest side of an A4 page at 300 DPI: images without a trustworthy
+# resolution, such as phone photos, are scaled down to it
+DEFAULT_MAX_SIDE = 3508
+
+# Pixels darker than the page background by this much are ink
+INK_CONTRAST = 60
+# Pages with a smaller share of ink pixels are blank
+BLANK_INK_RATIO = 0.001
+
+# Skew angles tried by the deskew stage, in degrees
+MAX_SKEW = 5.0
+SKEW_STEP = 0.25
+# Ink pixels sampled to estimate the skew
+SKEW_SAMPLE = 20000
+# Angles below this are left alone, rotating resamples the text
+MIN_SKEW = 0.3
+
+# Window of the adaptive threshold, in inches, and the share of the
+# window mean a pixel must stay under to be ink
+BINARIZE_WINDOW = 1 / 12
+BINARIZE_SENSITIVITY = 0.15
+
+
+def parse_stages(value):
+    """
+    Parse the enabled stages from a comma separated setting.
+
+    Args:
+        value: Comma separated stage names, ``none`` or empty to disable
+            preprocessing
+
+    Returns:
+        tuple: Enabled stages in run order, unknown names are ignored
+    """
+    names = {name.strip().lower() for name in (value or '').split(',')}
+    unknown = names - set(STAGES) - {'', 'none'}
+    if unknown:
+        _logger.warning("Unknown OCR preprocessing stages ignored: %s", ', '.join(sorted(unknown)))
+    return tuple(stage for stage in STAGES if stage in names)
+
+
+def normalize(image, target_dpi=DEFAULT_TARGET_DPI, max_side=DEFAULT_MAX_SIDE):
+    """
+    Scale an image down to the OCR resolution.
+
+    Images scanned above the target resolution are scaled to it, images
+    without a plausible resolution are scaled so their longest side fits
+    an A4 page at the target resolution. Images are never scaled up.
+
+    Args:
+        image: PIL image
+        target_dpi: Resolution Tesseract works best at
+        max_side: Longest side of images without a trustworthy resolution
+
+    Returns:
+        tuple: Scaled image and scale factor
+    """
+    dpi = image.info.get('dpi', (0, 0))[0] or 0
+    width, height = image.size
+    if dpi >= 150:
+        scale = target_dpi / float(dpi)
+    else:
+        # 72 or 96 DPI are placeholders written by cameras and screenshots
+        scale = max_side * target_dpi / DEFAULT_TARGET_DPI / float(max(width, height))
+    if scale >= 1.0:
+        return image, 1.0
+    size = (max(int(width * scale), 1), max(int(height * scale), 1))
+    if image.format == 'JPEG':
+        # Let the decoder skip the DCT coefficients it would throw away
+        image.draft(image.mode, size)
+    # Box filter: the integer part of the reduction is a plain block
+    # average (``Image.reduce``), only the rest is resampled
+    return image.resize(size, Image.BOX, reducing_gap=1.0), scale
+
+
+def to_grayscale(image):
+    """
+    Convert an image to a grayscale array.
+
+    The conversion is left to PIL: it applies the same ITU-R 601 luma
+    weights as a NumPy dot product, in a single C pass over the pixels
+    without the float copy of the image.
+
+    Args:
+        image: PIL image
+
+    Returns:
+        numpy.ndarray: 2D uint8 array
+    """
+    if image.mode == 'L':
+        return np.asarray(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Transparent areas are paper
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', image.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    return np.asarray(image.convert('L'))
+
+
+def ink_mask(gray):
+    """
+    Find the ink pixels of a grayscale page.
+
+    Args:
+        gray: 2D uint8 array
+
+    Returns:
+        numpy.ndarray: Boolean array, True on pixels darker than the background
+    """
+    # The background is the most common shade, estimated on a sample
+    background = np.median(gray[::4, ::4])
+    return gray < background - INK_CONTRAST
+
+
+def is_blank(gray):
+    """
+    Tell whether a page holds nothing to read.
+
+    Args:
+        gray: 2D uint8 array
+
+    Returns:
+        tuple: Whether the page is blank, and its share of ink pixels
+    """
+    ratio = float(np.count_nonzero(ink_mask(gray))) / gray.size if gray.size else 0.0
+    return ratio < BLANK_INK_RATIO, ratio
+
+
+def estimate_skew(gray, max_skew=MAX_SKEW, step=SKEW_STEP):
+    """
+    Estimate the skew of the text lines of a page.
+
+    Ink pixels are projected on the vertical axis of the page rotated by
+    every candidate angle, all at once. Text lines are sharpest, so the
+    projection profile is the most peaked, at the skew angle.
+
+    Args:
+        gray: 2D uint8 array
+        max_skew: Largest skew tried, in degrees
+        step: Angle step, in degrees
+
+    Returns:
+        float: Skew angle in degrees, counterclockwise
+    """
+    ys, xs = np.nonzero(ink_mask(gray))
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > SKEW_SAMPLE:
+        picked = np.random.default_rng(0).choice(len(ys), SKEW_SAMPLE, replace=False)
+        ys, xs = ys[picked], xs[picked]
+    angles = np.deg2rad(np.arange(-max_skew, max_skew + step / 2, step))
+    ys = ys.astype(np.float32) - gray.shape[0] / 2
+    xs = xs.astype(np.float32) - gray.shape[1] / 2
+    # Row of every sampled pixel once the page is rotated by every angle
+    rows = np.rint(np.outer(np.cos(angles), ys) + np.outer(np.sin(angles), xs)).astype(np.int64)
+    rows -= rows.min(axis=1, keepdims=True)
+    scores = [np.square(np.bincount(row)).sum() for row in rows]
+    return float(np.rad2deg(angles[int(np.argmax(scores))]))
+
+
+def rotate(gray, angle):
+    """
+    Rotate a grayscale page, the uncovered corners are paper.
+
+    Args:
+        gray: 2D uint8 array
+        angle: Angle in degrees, counterclockwise
+
+    Returns:
+        numpy.ndarray: Rotated 2D uint8 array of the same size
+    """
+    image = Image.fromarray(gray)
+    return np.asarray(image.rotate(angle, resample=Image.BILINEAR, fillcolor=255))
+
+
+def binarize(gray, window=None, sensitivity=BINARIZE_SENSITIVITY):
+    """
+    Binarize a page with a threshold adapted to its local brightness.
+
+    A pixel is ink when it is darker than the mean of the window around
+    it by ``sensitivity``. Window means come from an integral image, so
+    every pixel costs the same whatever the window size, and shadows or
+    uneven lighting of photos do not swallow the text.
+
+    Args:
+        gray: 2D uint8 array
+        window: Side of the window in pixels, odd
+        sensitivity: Share of the local mean a pixel must stay under
+
+    Returns:
+        numpy.ndarray: 2D uint8 array of 0 (ink) and 255 (paper)
+    """
+    window = window or max(int(DEFAULT_TARGET_DPI * BINARIZE_WINDOW) | 1, 3)
+    half = window // 2
+    # Edges are extended so that every window is full, and the window sums
+    # are differences of shifted slices of the integral image. They stay
+    # exact in uint32 arithmetic even when the integral image wraps around.
+    padded = np.pad(gray, half + 1, mode='edge')
+    integral = np.cumsum(np.cumsum(padded, axis=0, dtype=np.uint32), axis=1, dtype=np.uint32)
+    sums = (integral[window:, window:] - integral[:-window, window:]
+            - integral[window:, :-window] + integral[:-window, :-window])[:gray.shape[0], :gray.shape[1]]
+    threshold = sums.astype(np.float32) * ((1 - sensitivity) / (window * window))
+    ink = gray < threshold
+    return np.where(ink, 0, 255).astype(np.uint8)
+
+
+def merge_reports(reports):
+    """
+    Merge the reports of the images of a page or document.
+
+    Args:
+        reports: Reports returned by ``ImagePreprocessor.run``
+
+    Returns:
+        dict: Summed ``timings``, largest absolute ``skew``, smallest
+        ``scale``, and ``blank`` when every image was blank
+    """
+    timings = {}
+    for report in reports:
+        for stage, seconds in report['timings'].items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+    return {
+        'timings': timings,
+        'scale': min((report['scale'] for report in reports), default=1.0),
+        'skew': max((report['skew'] for report in reports), key=abs, default=0.0),
+        'blank': bool(reports) and all(report['blank'] for report in reports),
+    }
+
+
+def format_timings(timings):
+    """
+    Format stage timings for the logs.
+
+    Args:
+        timings: Seconds by stage
+
+    Returns:
+        str: Stages in run order with their time in milliseconds
+    """
+    return ', '.join('%s %.1f ms' % (stage, timings[stage] * 1000) for stage in STAGES if stage in timings)
+
+
+class ImagePreprocessor:
+    """
+    Prepare images for Tesseract.
+
+    Runs the enabled stages in order: scale down to the OCR resolution,
+    convert to grayscale, skip blank pages, straighten skewed pages and
+    binarize with a local threshold. Stages work on NumPy arrays, whole
+    images at a time. The time spent in every stage is reported.
+    """
+
+    def __init__(self, stages=STAGES, target_dpi=DEFAULT_TARGET_DPI, max_side=DEFAULT_MAX_SIDE):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Enabled stages, see ``STAGES``
+            target_dpi: Resolution images are scaled down to
+            max_side: Longest side of images without a trustworthy resolution
+        """
+        self.stages = tuple(stage for stage in STAGES if stage in stages)
+        self.target_dpi = target_dpi
+        self.max_side = max_side
+
+    def run(self, image):
+        """
+        Preprocess an image.
+
+        Args:
+            image: PIL image
+
+        Returns:
+            tuple: Preprocessed PIL image, None for a blank page, and the
+            report: ``timings`` per stage in seconds, ``scale``,
+            ``ink_ratio``, ``skew`` and ``blank``
+        """
+        report = {'timings': {}, 'scale': 1.0, 'ink_ratio': None, 'skew': 0.0, 'blank': False,
+                  'size': image.size}
+        if not self.stages:
+            return image, report
+
+        def timed(stage, func, *args):
+            start = time.perf_counter()
+            result = func(*args)
+            report['timings'][stage] = time.perf_counter() - start
+            return result
+
+        if STAGE_NORMALIZE in self.stages:
+            image, report['scale'] = timed(STAGE_NORMALIZE, normalize, image, self.target_dpi, self.max_side)
+        if self.stages == (STAGE_NORMALIZE,):
+            # Only scaling was asked for: keep the colors
+            return image, report
+        # The remaining stages work on arrays, converting is part of the grayscale stage
+        gray = timed(STAGE_GRAYSCALE, to_grayscale, image)
+        if STAGE_BLANK in self.stages:
+            report['blank'], report['ink_ratio'] = timed(STAGE_BLANK, is_blank, gray)
+            if report['blank']:
+                return None, report
+        if STAGE_DESKEW in self.stages:
+            start = time.perf_counter()
+            report['skew'] = estimate_skew(gray)
+            if abs(report['skew']) >= MIN_SKEW:
+                gray = rotate(gray, -report['skew'])
+            report['timings'][STAGE_DESKEW] = time.perf_counter() - start
+        if STAGE_BINARIZE in self.stages:
+            window = max(int(self.target_dpi * BINARIZE_WINDOW) | 1, 3)
+            gray = timed(STAGE_BINARIZE, binarize, gray, window)
+        return Image.fromarray(gray), report
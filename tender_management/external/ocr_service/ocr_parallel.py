@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pytesseract
+from pdf2image import convert_from_path
+
+from . import image_preprocess
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_DPI = 300
+DEFAULT_LANGUAGE = 'eng'
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+# A4 page in inches, the reference size of the raster memory estimate
+A4_WIDTH = 8.27
+A4_HEIGHT = 11.69
+
+
+def available_cores():
+    """
+    Get the number of cores the process may run on.
+
+    Returns:
+        int: Number of usable cores
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return max(len(os.sched_getaffinity(0)), 1)
+    return os.cpu_count() or 1
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version():
+    """
+    Get the version of the Tesseract engine.
+
+    Returns:
+        str: Tesseract version, empty when Tesseract is not installed
+    """
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception as e:
+        _logger.warning("Could not get the Tesseract version: %s", e)
+        return ''
+
+
+def page_raster_bytes(dpi=DEFAULT_DPI):
+    """
+    Estimate the memory held by a rasterized page while it is OCRed.
+
+    Args:
+        dpi: Rasterization resolution
+
+    Returns:
+        int: Bytes of an RGB A4 page, plus the grayscale copy made by Tesseract
+    """
+    pixels = int(A4_WIDTH * dpi) * int(A4_HEIGHT * dpi)
+    return pixels * 4
+
+
+def text_from_data(data):
+    """
+    Rebuild the text of a page from ``pytesseract.image_to_data`` output.
+
+    Words are joined by line and lines by paragraph, which gives the same
+    layout as ``image_to_string`` without running Tesseract a second time.
+
+    Args:
+        data: Dictionary returned by ``image_to_data`` with ``Output.DICT``
+
+    Returns:
+        str: Page text
+    """
+    lines = []
+    current_key = None
+    current_par = None
+    words = []
+    for index, word in enumerate(data.get('text') or []):
+        if not word or not word.strip():
+            continue
+        key = (data['block_num'][index], data['par_num'][index], data['line_num'][index])
+        if key != current_key:
+            if words:
+                lines.append(' '.join(words))
+            if current_par is not None and key[:2] != current_par:
+                lines.append('')
+            current_key, current_par, words = key, key[:2], []
+        words.append(word.strip())
+    if words:
+        lines.append(' '.join(words))
+    return '\n'.join(lines)
+
+
+def ocr_image(image, lang=DEFAULT_LANGUAGE, config=''):
+    """
+    OCR an image with a single Tesseract run.
+
+    Args:
+        image: PIL image
+        lang: Tesseract language
+        config: Additional Tesseract options
+
+    Returns:
+        tuple: Text and mean word confidence (0-100) of the image
+    """
+    data = pytesseract.image_to_data(image, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+    confidences = [float(conf) for conf in data.get('conf') or [] if float(conf) >= 0]
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text_from_data(data), confidence
+
+
+def rasterize_page(path, page_index, dpi=DEFAULT_DPI):
+    """
+    Render a single page of a PDF file.
+
+    Args:
+        path: Path of the PDF file
+        page_index: Zero-based page number
+        dpi: Rendering resolution
+
+    Returns:
+        list: PIL images of the page
+    """
+    return convert_from_path(path, dpi=dpi, first_page=page_index + 1, last_page=page_index + 1)
+
+
+def ocr_pdf_page(path, page_index, dpi=DEFAULT_DPI, lang=DEFAULT_LANGUAGE, config='', preprocess=None):
+    """
+    Rasterize and OCR a single PDF page.
+
+    Runs in the worker processes of ``ParallelPageOCR``: it only reads the
+    file and never touches the database.
+
+    Args:
+        path: Path of the PDF file
+        page_index: Zero-based page number
+        dpi: Rendering resolution
+        lang: Tesseract language
+        config: Additional Tesseract options
+        preprocess: ``image_preprocess.ImagePreprocessor`` run on the page
+            before Tesseract, blank pages are not OCRed
+
+    Returns:
+        dict: ``page``, ``text``, ``confidence``, ``method`` and ``duration``,
+        with the ``preprocess`` report and the ``blank`` flag when preprocessed
+    """
+    start = time.perf_counter()
+    texts, confidences, reports = [], [], []
+    for image in rasterize_page(path, page_index, dpi):
+        prepared = image
+        if preprocess is not None:
+            # Rendered at the OCR resolution: large page formats are not photos to scale down
+            image.info.setdefault('dpi', (dpi, dpi))
+            prepared, report = preprocess.run(image)
+            reports.append(report)
+        if prepared is None:
+            # Blank page: nothing to read, and nothing read wrong
+            text, confidence = '', 100.0
+        else:
+            text, confidence = ocr_image(prepared, lang, config)
+            if prepared is not image:
+                prepared.close()
+        image.close()
+        texts.append(text)
+        confidences.append(confidence)
+    result = {
+        'page': page_index,
+        'text': '\n'.join(texts),
+        'confidence': sum(confidences) / len(confidences) if confidences else 0.0,
+        'method': 'ocr',
+        'duration': time.perf_counter() - start,
+    }
+    if reports:
+        result['preprocess'] = image_preprocess.merge_reports(reports)
+        result['blank'] = result['preprocess']['blank']
+    return result
+
+
+def _init_worker():
+    # Workers are forked from an Odoo worker: drop its signal handlers so
+    # the pool can be shut down and stray signals do not run server code
+    for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGHUP, signal.SIGQUIT, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+
+
+class ParallelPageOCR:
+    """
+    OCR the pages of a PDF file on a pool of processes.
+
+    Tesseract is CPU bound, so pages are spread over processes sized to the
+    available cores. The number of pages in flight is also bounded by a
+    memory budget, each in-flight page holding its raster. Results keep
+    their page number and confidence and are returned in page order.
+    """
+
+    def __init__(self, max_workers=None, memory_budget=DEFAULT_MEMORY_BUDGET, dpi=DEFAULT_DPI,
+                 lang=DEFAULT_LANGUAGE, config='', page_func=ocr_pdf_page):
+        """
+        Initialize the engine.
+
+        Args:
+            max_workers: Number of worker processes, the available cores by default
+            memory_budget: Bytes of rasterized pages allowed in flight
+            dpi: Rasterization resolution
+            lang: Tesseract language
+            config: Additional Tesseract options
+            page_func: Function OCRing one page, see ``ocr_pdf_page``
+        """
+        self.max_workers = max(int(max_workers or available_cores()), 1)
+        self.memory_budget = memory_budget
+        self.dpi = dpi
+        self.lang = lang
+        self.config = config
+        self.page_func = page_func
+
+    @property
+    def max_in_flight(self):
+        """Number of pages OCRed at the same time"""
+        by_memory = int(self.memory_budget // page_raster_bytes(self.dpi)) if self.memory_budget else self.max_workers
+        return max(min(self.max_workers, by_memory), 1)
+
+    def _run_page(self, path, page_index):
+        try:
+            return self.page_func(path, page_index, self.dpi, self.lang, self.config)
+        except Exception as e:
+            return self._failed_page(page_index, e)
+
+    @staticmethod
+    def _failed_page(page_index, error):
+        _logger.error("OCR of page %s failed: %s", page_index + 1, error)
+        return {'page': page_index, 'text': '', 'confidence': 0.0, 'method': 'ocr', 'error': str(error)}
+
+    def run(self, path, pages, progress=None):
+        """
+        OCR pages of a PDF file.
+
+        Args:
+            path: Path of the PDF file
+            pages: Zero-based numbers of the pages to OCR
+            progress: Callable receiving the number of pages done and total
+
+        Returns:
+            list: Page results, see ``ocr_pdf_page``, sorted by page
+        """
+        pages = list(pages)
+        if not pages:
+            return []
+        start = time.perf_counter()
+        in_flight = min(self.max_in_flight, len(pages))
+        results = {}
+
+        if in_flight == 1:
+            for page_index in pages:
+                results[page_index] = self._run_page(path, page_index)
+                if progress:
+                    progress(len(results), len(pages))
+        else:
+            pending = {}
+            queue = iter(pages)
+            with ProcessPoolExecutor(max_workers=in_flight, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=_init_worker) as executor:
+                for page_index in queue:
+                    pending[executor.submit(self.page_func, path, page_index, self.dpi, self.lang,
+                                            self.config)] = page_index
+                    if len(pending) >= in_flight:
+                        break
+                while pending:
+                    done, _running = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page_index = pending.pop(future)
+                        try:
+                            results[page_index] = future.result()
+                        except Exception as e:
+                            results[page_index] = self._failed_page(page_index, e)
+                        # Only submit a page when another one released its raster
+                        next_page = next(queue, None)
+                        if next_page is not None:
+                            pending[executor.submit(self.page_func, path, next_page, self.dpi, self.lang,
+                                                    self.config)] = next_page
+                    if progress:
+                        progress(len(results), len(pages))
+
+        _logger.info(
+            "OCRed %s pages on %s processes in %.3fs",
+            len(pages), in_flight, time.perf_counter() - start
+        )
+        return [results[page_index] for page_index in sorted(results)]
+
+
+def merge_pages(pages):
+    """
+    Merge page results into the document text and confidence.
+
+    Args:
+        pages: Page results sorted by page
+
+    Returns:
+        tuple: Document text with page separators and mean page confidence
+    """
+    content = ''.join(f"--- Page {page['page'] + 1} ---\n{page['text']}\n\n" for page in pages)
+    confidence = sum(page['confidence'] for page in pages) / len(pages) if pages else 0.0
+    return content, confidence
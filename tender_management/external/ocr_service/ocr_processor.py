@@ -3,11 +3,17 @@
 import base64
 import json
 import logging
+import os
+import tempfile
 import requests
+from contextlib import contextmanager
 from io import BytesIO
 from odoo import models, api, fields, _
 from odoo.exceptions import UserError, ValidationError
 
+from . import field_extraction
+from . import ocr_stream
+
 _logger = logging.getLogger(__name__)
 
 class OCRProcessor:
@@ -60,29 +66,126 @@ class OCRProcessor:
         if not self.is_available():
             raise UserError(_("OCR service is not properly configured or enabled."))
         
-        # Get document data
+        mimetype = self._get_mimetype(document)
+        with self._document_path(document) as path:
+            # Paid services are only called for documents not OCRed yet
+            cache = self.env['tender.ocr.cache']
+            provider = self.config['ocr_service_provider']
+            file_hash = getattr(document, 'content_hash', None) or ocr_stream.hash_file(path)
+            settings = self._get_cache_settings(mimetype)
+            entry = cache._lookup(file_hash, provider, settings)
+            if entry:
+                return self._result_from_cache(entry)
+            
+            # Select OCR service provider
+            if provider == 'google_vision':
+                result = self._process_with_google_vision(path, mimetype)
+            elif provider == 'microsoft_azure':
+                result = self._process_with_azure_ocr(path, mimetype)
+            elif provider == 'tesseract_api':
+                result = self._process_with_tesseract_api(path, mimetype)
+            else:
+                result = self._process_with_custom_ocr(path, mimetype)
+            file_size = os.path.getsize(path)
+        
+        if result.get('success'):
+            cache._store(
+                file_hash, provider, settings, result.get('text', ''), result.get('confidence', 0.0),
+                pages=[{'page': 0, 'text': result.get('text', ''), 'confidence': result.get('confidence', 0.0),
+                        'method': 'ocr'}],
+                layout=result.get('raw_response'), file_name=getattr(document, 'file_name', None),
+                file_size=file_size,
+            )
+        return result
+    
+    @contextmanager
+    def _document_path(self, document):
+        """
+        Get the path of a document file, without reading it in memory.
+        
+        Documents stored in the filestore are read in place. Documents only
+        given as base64 ``file_content`` are decoded to a temporary file.
+        
+        Args:
+            document: tender.document record, or object with a ``file_content``
+            
+        Yields:
+            str: Path of the file
+        """
+        if hasattr(document, '_file_path'):
+            with document._file_path() as path:
+                yield path
+            return
         try:
             document_data = base64.b64decode(document.file_content)
         except Exception as e:
             _logger.error(f"Failed to decode document data: {e}")
             raise UserError(_("Invalid document data: %s") % str(e))
+        fd, path = tempfile.mkstemp(prefix='tender_ocr_')
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                spool.write(document_data)
+            del document_data
+            yield path
+        finally:
+            os.unlink(path)
+    
+    def _get_mimetype(self, document):
+        """
+        Get the MIME type of a document file.
+        
+        Args:
+            document: tender.document record, or object with a ``mimetype``
             
-        # Select OCR service provider
-        if self.config['ocr_service_provider'] == 'google_vision':
-            return self._process_with_google_vision(document_data, document.mimetype)
-        elif self.config['ocr_service_provider'] == 'microsoft_azure':
-            return self._process_with_azure_ocr(document_data, document.mimetype)
-        elif self.config['ocr_service_provider'] == 'tesseract_api':
-            return self._process_with_tesseract_api(document_data, document.mimetype)
-        else:
-            return self._process_with_custom_ocr(document_data, document.mimetype)
+        Returns:
+            str: MIME type
+        """
+        mimetype = getattr(document, 'mimetype', None)
+        if not mimetype and hasattr(document, '_get_file_attachment'):
+            mimetype = document._get_file_attachment().mimetype
+        return mimetype or 'application/octet-stream'
     
-    def _process_with_google_vision(self, document_data, mimetype):
+    def _get_cache_settings(self, mimetype):
+        """
+        Get the settings an OCR result depends on, part of its cache key.
+        
+        Args:
+            mimetype: Document MIME type
+            
+        Returns:
+            dict: Service settings
+        """
+        return {
+            'service_url': self.config['ocr_service_url'],
+            'mimetype': mimetype,
+        }
+    
+    def _result_from_cache(self, entry):
+        """
+        Build an OCR result from a cache entry.
+        
+        Args:
+            entry: tender.ocr.cache record
+            
+        Returns:
+            dict: OCR results, flagged as ``cached``
+        """
+        return {
+            'success': True,
+            'text': entry.content or '',
+            'provider': entry.provider,
+            'confidence': entry.confidence_score,
+            'pages': entry._get_pages(),
+            'raw_response': json.loads(entry.layout_json) if entry.layout_json else {},
+            'cached': True,
+        }
+    
+    def _process_with_google_vision(self, path, mimetype):
         """
         Process document using Google Cloud Vision OCR.
         
         Args:
-            document_data: Binary document data
+            path: Path of the document file
             mimetype: Document MIME type
             
         Returns:
@@ -95,15 +198,13 @@ class OCRProcessor:
                 'Authorization': f"Bearer {self.config['ocr_api_key']}"
             }
             
-            # Encode image data to base64
-            encoded_content = base64.b64encode(document_data).decode('utf-8')
-            
-            # Prepare the request payload
+            # Prepare the request payload, the image is base64 encoded
+            # block by block while the body is sent
             payload = {
                 "requests": [
                     {
                         "image": {
-                            "content": encoded_content
+                            "content": ocr_stream.PAYLOAD_PLACEHOLDER
                         },
                         "features": [
                             {
@@ -115,7 +216,8 @@ class OCRProcessor:
             }
             
             # Make the API request
-            response = requests.post(endpoint, headers=headers, data=json.dumps(payload), timeout=60)
+            response = requests.post(endpoint, headers=headers, data=ocr_stream.Base64JSONStream(payload, path),
+                                     timeout=60)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -157,12 +259,12 @@ class OCRProcessor:
                 'provider': 'google_vision'
             }
     
-    def _process_with_azure_ocr(self, document_data, mimetype):
+    def _process_with_azure_ocr(self, path, mimetype):
         """
         Process document using Microsoft Azure OCR.
         
         Args:
-            document_data: Binary document data
+            path: Path of the document file
             mimetype: Document MIME type
             
         Returns:
@@ -175,8 +277,9 @@ class OCRProcessor:
                 'Ocp-Apim-Subscription-Key': self.config['ocr_api_key']
             }
             
-            # Make the initial API request
-            response = requests.post(endpoint, headers=headers, data=document_data, timeout=30)
+            # Make the initial API request, the file is streamed from disk
+            with open(path, 'rb') as document_file:
+                response = requests.post(endpoint, headers=headers, data=document_file, timeout=30)
             
             if response.status_code in [200, 202]:
                 # Get operation location from response header
@@ -251,12 +354,12 @@ class OCRProcessor:
                 'provider': 'microsoft_azure'
             }
     
-    def _process_with_tesseract_api(self, document_data, mimetype):
+    def _process_with_tesseract_api(self, path, mimetype):
         """
         Process document using Tesseract OCR API.
         
         Args:
-            document_data: Binary document data
+            path: Path of the document file
             mimetype: Document MIME type
             
         Returns:
@@ -269,12 +372,10 @@ class OCRProcessor:
                 'x-api-key': self.config['ocr_api_key']
             }
             
-            # Encode image data to base64
-            encoded_content = base64.b64encode(document_data).decode('utf-8')
-            
-            # Prepare the request payload
+            # Prepare the request payload, the image is base64 encoded
+            # block by block while the body is sent
             payload = {
-                "image": encoded_content,
+                "image": ocr_stream.PAYLOAD_PLACEHOLDER,
                 "mimetype": mimetype,
                 "options": {
                     "lang": "eng",  # Default to English
@@ -284,7 +385,8 @@ class OCRProcessor:
             }
             
             # Make the API request
-            response = requests.post(endpoint, headers=headers, json=payload, timeout=60)
+            response = requests.post(endpoint, headers=headers, data=ocr_stream.Base64JSONStream(payload, path),
+                                     timeout=60)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -314,12 +416,12 @@ class OCRProcessor:
                 'provider': 'tesseract_api'
             }
     
-    def _process_with_custom_ocr(self, document_data, mimetype):
+    def _process_with_custom_ocr(self, path, mimetype):
         """
         Process document using a custom OCR service.
         
         Args:
-            document_data: Binary document data
+            path: Path of the document file
             mimetype: Document MIME type
             
         Returns:
@@ -332,13 +434,11 @@ class OCRProcessor:
                 'Authorization': f"Bearer {self.config['ocr_api_key']}"
             }
             
-            # Encode image data to base64
-            encoded_content = base64.b64encode(document_data).decode('utf-8')
-            
-            # Prepare the request payload
+            # Prepare the request payload, the document is base64 encoded
+            # block by block while the body is sent
             payload = {
                 "document": {
-                    "content": encoded_content,
+                    "content": ocr_stream.PAYLOAD_PLACEHOLDER,
                     "mimeType": mimetype,
                 },
                 "options": {
@@ -349,7 +449,8 @@ class OCRProcessor:
             }
             
             # Make the API request
-            response = requests.post(endpoint, headers=headers, json=payload, timeout=60)
+            response = requests.post(endpoint, headers=headers, data=ocr_stream.Base64JSONStream(payload, path),
+                                     timeout=60)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -419,56 +520,17 @@ class OCRProcessor:
         Returns:
             dict: Extracted information
         """
-        # Simple rule-based extraction - in a real implementation, 
-        # this would use more sophisticated NLP techniques
-        import re
-        
-        # Initialize result dictionary
-        result = {
+        result = field_extraction.get_engine('tender_notice').extract(text)
+        return {
             'success': True,
-            'tender_id': None,
-            'tender_title': None,
-            'organization': None,
-            'submission_date': None,
-            'closing_date': None,
-            'estimated_value': None,
+            'tender_id': result.value('tender_reference'),
+            'tender_title': result.value('title'),
+            'organization': result.value('organization'),
+            'submission_date': result.value('start_date'),
+            'closing_date': result.value('closing_date'),
+            'estimated_value': result.value('estimated_value'),
+            'fields': result.to_dict(),
         }
-        
-        # Extract tender ID/reference
-        tender_id_match = re.search(r'Tender\s+(?:ID|No|Number|Ref|Reference)\s*:?\s*([A-Z0-9-/]+)', text, re.IGNORECASE)
-        if tender_id_match:
-            result['tender_id'] = tender_id_match.group(1).strip()
-        
-        # Extract tender title
-        title_match = re.search(r'(?:Title|Subject)\s*:?\s*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        if title_match:
-            result['tender_title'] = title_match.group(1).strip()
-        
-        # Extract organization
-        org_match = re.search(r'(?:Organization|Authority|Department|Ministry)\s*:?\s*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        if org_match:
-            result['organization'] = org_match.group(1).strip()
-        
-        # Extract dates (submission, closing)
-        submission_date_match = re.search(r'(?:Start|Submission|Publishing)\s+Date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if submission_date_match:
-            result['submission_date'] = submission_date_match.group(1).strip()
-            
-        closing_date_match = re.search(r'(?:End|Closing|Due)\s+Date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if closing_date_match:
-            result['closing_date'] = closing_date_match.group(1).strip()
-        
-        # Extract estimated value
-        value_match = re.search(r'(?:Estimated|Approximate|Approx\.?)\s+(?:Value|Cost|Amount|Budget)\s*:?\s*(?:Rs\.?|INR|₹)?\s*(\d+(?:,\d+)*(?:\.\d+)?)', text, re.IGNORECASE)
-        if value_match:
-            # Remove commas and convert to float
-            value_str = value_match.group(1).replace(',', '')
-            try:
-                result['estimated_value'] = float(value_str)
-            except ValueError:
-                pass
-        
-        return result
     
     def _extract_bid_document_info(self, text):
         """
@@ -480,59 +542,18 @@ class OCRProcessor:
         Returns:
             dict: Extracted information
         """
-        import re
-        
-        # Initialize result dictionary
-        result = {
+        result = field_extraction.get_engine('bid_document').extract(text)
+        return {
             'success': True,
-            'bid_id': None,
-            'bidder_name': None,
-            'bid_amount': None,
-            'submission_date': None,
-            'contact_person': None,
-            'contact_email': None,
-            'contact_phone': None,
+            'bid_id': result.value('tender_reference'),
+            'bidder_name': result.value('bidder_name'),
+            'bid_amount': result.value('bid_amount'),
+            'submission_date': result.value('bid_date'),
+            'contact_person': result.value('contact_person'),
+            'contact_email': result.value('email'),
+            'contact_phone': result.value('contact_phone'),
+            'fields': result.to_dict(),
         }
-        
-        # Extract bid ID
-        bid_id_match = re.search(r'(?:Bid|Tender)\s+(?:ID|No|Number|Ref|Reference)\s*:?\s*([A-Z0-9-/]+)', text, re.IGNORECASE)
-        if bid_id_match:
-            result['bid_id'] = bid_id_match.group(1).strip()
-        
-        # Extract bidder name
-        bidder_match = re.search(r'(?:Bidder|Company|Vendor|Supplier)\s+Name\s*:?\s*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        if bidder_match:
-            result['bidder_name'] = bidder_match.group(1).strip()
-        
-        # Extract bid amount
-        amount_match = re.search(r'(?:Bid|Quoted|Total)\s+(?:Amount|Value|Price|Cost)\s*:?\s*(?:Rs\.?|INR|₹)?\s*(\d+(?:,\d+)*(?:\.\d+)?)', text, re.IGNORECASE)
-        if amount_match:
-            # Remove commas and convert to float
-            amount_str = amount_match.group(1).replace(',', '')
-            try:
-                result['bid_amount'] = float(amount_str)
-            except ValueError:
-                pass
-        
-        # Extract submission date
-        date_match = re.search(r'(?:Submission|Bid)\s+Date\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if date_match:
-            result['submission_date'] = date_match.group(1).strip()
-        
-        # Extract contact information
-        contact_person_match = re.search(r'(?:Contact|Authorized)\s+Person\s*:?\s*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        if contact_person_match:
-            result['contact_person'] = contact_person_match.group(1).strip()
-            
-        email_match = re.search(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', text)
-        if email_match:
-            result['contact_email'] = email_match.group(0)
-            
-        phone_match = re.search(r'(?:Phone|Mobile|Tel|Contact)\s*(?:No|Number)?\s*:?\s*(\+?\d[\d\s-]{8,})', text, re.IGNORECASE)
-        if phone_match:
-            result['contact_phone'] = phone_match.group(1).strip()
-        
-        return result
     
     def _extract_corrigendum_info(self, text):
         """
@@ -544,45 +565,16 @@ class OCRProcessor:
         Returns:
             dict: Extracted information
         """
-        import re
-        
-        # Initialize result dictionary
-        result = {
+        result = field_extraction.get_engine('corrigendum').extract(text)
+        return {
             'success': True,
-            'tender_id': None,
-            'corrigendum_no': None,
-            'original_date': None,
-            'revised_date': None,
-            'changes': [],
+            'tender_id': result.value('tender_reference'),
+            'corrigendum_no': result.value('corrigendum_no'),
+            'original_date': result.value('original_date'),
+            'revised_date': result.value('revised_date'),
+            'changes': result.values('change'),
+            'fields': result.to_dict(),
         }
-        
-        # Extract tender ID
-        tender_id_match = re.search(r'(?:Tender|Bid)\s+(?:ID|No|Number|Ref|Reference)\s*:?\s*([A-Z0-9-/]+)', text, re.IGNORECASE)
-        if tender_id_match:
-            result['tender_id'] = tender_id_match.group(1).strip()
-        
-        # Extract corrigendum number
-        corr_match = re.search(r'Corrigendum\s+(?:No|Number)\s*:?\s*(\d+)', text, re.IGNORECASE)
-        if corr_match:
-            result['corrigendum_no'] = int(corr_match.group(1))
-        
-        # Extract original date
-        orig_date_match = re.search(r'(?:Original|Earlier|Previous)\s+(?:Date|Time)\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if orig_date_match:
-            result['original_date'] = orig_date_match.group(1).strip()
-        
-        # Extract revised date
-        revised_date_match = re.search(r'(?:Revised|New|Extended)\s+(?:Date|Time)\s*:?\s*(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if revised_date_match:
-            result['revised_date'] = revised_date_match.group(1).strip()
-        
-        # Extract changes (simplified - would be more sophisticated in real implementation)
-        # Look for sections that mention changes, amendments, or modifications
-        change_sections = re.findall(r'(?:Change|Amendment|Modification|Revision)\s+\d+\s*:?\s*(.+?)(?:\n\n|\Z)', text, re.IGNORECASE | re.DOTALL)
-        if change_sections:
-            result['changes'] = [section.strip() for section in change_sections]
-        
-        return result
     
     def _extract_generic_info(self, text):
         """
@@ -594,56 +586,14 @@ class OCRProcessor:
         Returns:
             dict: Extracted information
         """
-        import re
-        
-        # Initialize result dictionary
-        result = {
+        result = field_extraction.get_engine('generic').extract(text)
+        return {
             'success': True,
-            'reference_numbers': [],
-            'dates': [],
-            'monetary_values': [],
-            'organizations': [],
-            'email_addresses': [],
-            'phone_numbers': [],
+            'reference_numbers': result.values('reference_number'),
+            'dates': result.values('date'),
+            'monetary_values': result.values('monetary_value'),
+            'organizations': result.values('organization'),
+            'email_addresses': result.values('email'),
+            'phone_numbers': result.values('phone_number'),
+            'fields': result.to_dict(),
         }
-        
-        # Extract reference numbers (IDs, tender numbers, etc.)
-        ref_matches = re.findall(r'(?:ID|No|Number|Ref|Reference)\s*:?\s*([A-Z0-9-/]+)', text, re.IGNORECASE)
-        if ref_matches:
-            result['reference_numbers'] = [match.strip() for match in ref_matches]
-        
-        # Extract dates
-        date_matches = re.findall(r'(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})', text, re.IGNORECASE)
-        if date_matches:
-            result['dates'] = [match.strip() for match in date_matches]
-        
-        # Extract monetary values
-        money_matches = re.findall(r'(?:Rs\.?|INR|₹)?\s*(\d+(?:,\d+)*(?:\.\d+)?)', text)
-        if money_matches:
-            result['monetary_values'] = []
-            for match in money_matches:
-                # Remove commas and convert to float
-                try:
-                    value = float(match.replace(',', ''))
-                    # Filter out small numbers that are likely not monetary values
-                    if value >= 100:  # Arbitrary threshold
-                        result['monetary_values'].append(value)
-                except ValueError:
-                    pass
-        
-        # Extract email addresses
-        email_matches = re.findall(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', text)
-        if email_matches:
-            result['email_addresses'] = email_matches
-        
-        # Extract phone numbers
-        phone_matches = re.findall(r'(?:Phone|Mobile|Tel|Contact)?\s*(?:No|Number)?\s*:?\s*(\+?\d[\d\s-]{8,})', text, re.IGNORECASE)
-        if phone_matches:
-            result['phone_numbers'] = [match.strip() for match in phone_matches]
-        
-        # Extract organizations (simple approach - would be more sophisticated in real implementation)
-        org_matches = re.findall(r'(?:Organization|Authority|Department|Ministry)\s*:?\s*(.+?)(?:\n|$)', text, re.IGNORECASE)
-        if org_matches:
-            result['organizations'] = [match.strip() for match in org_matches]
-        
-        return result
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import hashlib
+import json
+import mmap
+import os
+import sys
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# Multiple of 3: blocks are base64 encoded without padding in between
+DEFAULT_READ_SIZE = 3 * 256 * 1024
+PAYLOAD_PLACEHOLDER = '\x00ocr-document-content\x00'
+
+
+@contextmanager
+def map_file(path):
+    """
+    Map a file in memory, read only.
+
+    The pages of the file are loaded on demand by the kernel and shared
+    with the page cache, nothing is copied in the process heap.
+
+    Args:
+        path: Path of the file
+
+    Yields:
+        mmap.mmap: Mapped file, an empty bytes object for empty files
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b''
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def hash_file(path):
+    """
+    Get the SHA-256 of a file without reading it in memory.
+
+    Args:
+        path: Path of the file
+
+    Returns:
+        str: Hexadecimal digest
+    """
+    with map_file(path) as data:
+        return hashlib.sha256(data).hexdigest()
+
+
+class Base64JSONStream:
+    """
+    JSON request body embedding the base64 encoding of a file.
+
+    Cloud OCR APIs take the document base64 encoded in a JSON payload.
+    Encoding the whole document and dumping the payload holds the file,
+    its encoding and the payload in memory at once. This body is produced
+    block by block instead: the payload is dumped with a placeholder, and
+    the file is read and encoded ``read_size`` bytes at a time in place of
+    it. Its length is known in advance so it is sent with a
+    Content-Length, and it can be iterated again for a retry.
+    """
+
+    def __init__(self, payload, path, read_size=DEFAULT_READ_SIZE):
+        """
+        Initialize the body.
+
+        Args:
+            payload: JSON payload, ``PAYLOAD_PLACEHOLDER`` marks the value
+                replaced by the base64 encoded file
+            path: Path of the file
+            read_size: Number of bytes read at a time, a multiple of 3
+        """
+        if read_size % 3:
+            raise ValueError("read_size must be a multiple of 3")
+        prefix, suffix = json.dumps(payload).split(json.dumps(PAYLOAD_PLACEHOLDER))
+        self.prefix = (prefix + '"').encode()
+        self.suffix = ('"' + suffix).encode()
+        self.path = path
+        self.read_size = read_size
+        self.size = os.path.getsize(path)
+
+    def __len__(self):
+        return len(self.prefix) + 4 * ((self.size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.path, 'rb') as f:
+            while True:
+                block = f.read(self.read_size)
+                if not block:
+                    break
+                yield base64.b64encode(block)
+        yield self.suffix
+
+
+def reset_peak_rss():
+    """
+    Reset the peak resident memory of the process, where the kernel allows
+    it (Linux 4.0+), so that ``peak_rss`` measures the next job only.
+
+    Returns:
+        bool: Whether the peak was reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """
+    Get the peak resident memory of the process.
+
+    Returns:
+        int: Bytes, since the last ``reset_peak_rss`` where supported,
+        since the start of the process otherwise
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    # Kilobytes on Linux, bytes on macOS
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == 'darwin' else usage * 1024
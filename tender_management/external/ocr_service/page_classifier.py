@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+
+from PyPDF2.generic import ContentStream
+
+_logger = logging.getLogger(__name__)
+
+# Bumped whenever the heuristics change, recorded decisions of an older
+# version are classified again
+CLASSIFIER_VERSION = 1
+
+# Pages with fewer characters are OCRed, their text layer is at most a
+# header, a footer or a page number
+MIN_TEXT_CHARS = 20
+# Share of readable glyphs below which a text layer is garbage, e.g. a
+# font without Unicode mapping extracted as symbols or (cid:..) codes
+MIN_GLYPH_SANITY = 0.8
+# Share of letters and digits expected in readable text
+MIN_ALNUM_RATIO = 0.5
+# Pages whose images cover this share of the page may hold scanned content
+IMAGE_COVERAGE_SCANNED = 0.3
+# Characters per square inch of a page fully covered by its text layer,
+# such as a searchable scan: no OCR is needed on top of it
+DENSE_TEXT_DENSITY = 10.0
+
+DECISION_TEXT = 'text'
+DECISION_OCR = 'ocr'
+DECISION_BOTH = 'both'
+
+# Confidence of a readable embedded text layer
+TEXT_LAYER_CONFIDENCE = 95.0
+
+CID_PATTERN = re.compile(r'\(cid:\d+\)')
+MAX_FORM_DEPTH = 3
+
+
+def glyph_sanity(text):
+    """
+    Score how readable an extracted text layer is.
+
+    Args:
+        text: Text extracted from the page
+
+    Returns:
+        float: Score from 0 (garbage) to 1 (readable text)
+    """
+    text, cid_count = CID_PATTERN.subn('', text or '')
+    glyphs = [char for char in text if not char.isspace()]
+    total = len(glyphs) + cid_count
+    if not total:
+        return 0.0
+    valid = alnum = 0
+    for char in glyphs:
+        category = unicodedata.category(char)
+        if char == '\ufffd' or category in ('Cc', 'Cf', 'Co', 'Cn', 'Cs'):
+            continue
+        valid += 1
+        # Marks are part of the letters of Indic scripts
+        if category[0] in 'LNM':
+            alnum += 1
+    alnum_ratio = alnum / total
+    return (valid / total) * min(alnum_ratio / MIN_ALNUM_RATIO, 1.0)
+
+
+def _det(operands):
+    a, b, c, d = (float(value) for value in operands[:4])
+    return a * d - b * c
+
+
+def image_coverage(page):
+    """
+    Estimate the share of a page covered by images.
+
+    Images are drawn as the unit square scaled by the current transformation
+    matrix, so the area of an image is the determinant of that matrix.
+    Images of form XObjects are included, clipping and overlaps are not
+    accounted for.
+
+    Args:
+        page: PyPDF2 page
+
+    Returns:
+        float: Covered share of the page, from 0 to 1
+    """
+    box = page.mediabox
+    page_area = abs(float(box.width) * float(box.height))
+    if not page_area:
+        return 0.0
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0
+    area = _drawn_image_area(contents, page.get('/Resources'), page.pdf, 1.0, 0)
+    return min(area / page_area, 1.0)
+
+
+def _resolve(obj):
+    return obj.get_object() if hasattr(obj, 'get_object') else (obj or {})
+
+
+def _drawn_image_area(contents, resources, pdf, scale, depth):
+    resources = _resolve(resources)
+    xobjects = _resolve(resources.get('/XObject'))
+    base_scale = scale
+    stack = []
+    area = 0.0
+    for operands, operator in ContentStream(contents, pdf).operations:
+        if operator == b'q':
+            stack.append(scale)
+        elif operator == b'Q':
+            scale = stack.pop() if stack else base_scale
+        elif operator == b'cm':
+            scale *= _det(operands)
+        elif operator == b'INLINE IMAGE':
+            area += abs(scale)
+        elif operator == b'Do' and operands[0] in xobjects:
+            xobject = xobjects[operands[0]].get_object()
+            subtype = xobject.get('/Subtype')
+            if subtype == '/Image':
+                area += abs(scale)
+            elif subtype == '/Form' and depth < MAX_FORM_DEPTH:
+                matrix = xobject.get('/Matrix')
+                form_scale = scale * (_det(matrix) if matrix else 1.0)
+                area += _drawn_image_area(
+                    xobject, xobject.get('/Resources', resources), pdf, form_scale, depth + 1
+                )
+    return area
+
+
+def page_hash(page):
+    """
+    Hash what is drawn on a PDF page.
+
+    The page size, content streams and the data of the images and forms
+    they draw are hashed, without rendering the page: pages of a new
+    version of a document keep their hash unless they changed.
+
+    Args:
+        page: PyPDF2 page
+
+    Returns:
+        str: SHA-256 of the page
+    """
+    digest = hashlib.sha256()
+    box = page.mediabox
+    digest.update(f"{float(box.width)}x{float(box.height)}".encode())
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    _hash_xobjects(digest, page.get('/Resources'), 0)
+    return digest.hexdigest()
+
+
+def _hash_xobjects(digest, resources, depth):
+    xobjects = _resolve(_resolve(resources).get('/XObject'))
+    for name in sorted(xobjects):
+        xobject = xobjects[name].get_object()
+        digest.update(str(name).encode())
+        # Raw stream data: images are hashed without being decoded
+        data = getattr(xobject, '_data', b'') or b''
+        digest.update(data.encode('latin-1') if isinstance(data, str) else data)
+        if xobject.get('/Subtype') == '/Form' and depth < MAX_FORM_DEPTH:
+            _hash_xobjects(digest, xobject.get('/Resources'), depth + 1)
+
+
+def classify_page(page, page_index):
+    """
+    Decide how to read the text of a PDF page.
+
+    Readable text layers are used as is. Pages without text, or whose text
+    layer is garbage, are OCRed. Pages with a readable but sparse text layer
+    on top of large images, such as a scan with a typed header, get both:
+    the text layer and the OCR of the page.
+
+    Args:
+        page: PyPDF2 page
+        page_index: Zero-based page number
+
+    Returns:
+        tuple: Decision dictionary and the extracted text layer
+    """
+    start = time.perf_counter()
+    text = page.extract_text() or ''
+    chars = len(''.join(text.split()))
+    box = page.mediabox
+    square_inches = abs(float(box.width) * float(box.height)) / (72 * 72) or 1.0
+    density = chars / square_inches
+    sanity = glyph_sanity(text) if chars else 0.0
+    try:
+        coverage = image_coverage(page)
+    except Exception as e:
+        # Unparsable content stream: assume the page may be scanned
+        _logger.warning("Could not measure the images of page %s: %s", page_index + 1, e)
+        coverage = 1.0
+
+    if chars < MIN_TEXT_CHARS or sanity < MIN_GLYPH_SANITY:
+        decision = DECISION_OCR
+    elif coverage >= IMAGE_COVERAGE_SCANNED and density < DENSE_TEXT_DENSITY:
+        decision = DECISION_BOTH
+    else:
+        decision = DECISION_TEXT
+
+    return {
+        'page': page_index,
+        'decision': decision,
+        'chars': chars,
+        'density': round(density, 2),
+        'sanity': round(sanity, 3),
+        'image_coverage': round(coverage, 3),
+        'duration': time.perf_counter() - start,
+        'version': CLASSIFIER_VERSION,
+    }, text
+
+
+def combine_page(page_index, text, ocr_page):
+    """
+    Combine the text layer and the OCR of a page classified as ``both``.
+
+    Args:
+        page_index: Zero-based page number
+        text: Embedded text layer of the page
+        ocr_page: OCR result of the page, see ``ocr_parallel.ocr_pdf_page``
+
+    Returns:
+        dict: Page result with the text layer followed by the OCRed text,
+        and a confidence weighted by the length of each part
+    """
+    ocr_text = ocr_page.get('text') or ''
+    text_chars, ocr_chars = len(text.strip()), len(ocr_text.strip())
+    if text_chars + ocr_chars:
+        confidence = (TEXT_LAYER_CONFIDENCE * text_chars + ocr_page.get('confidence', 0.0) * ocr_chars) \
+            / (text_chars + ocr_chars)
+    else:
+        confidence = 0.0
+    return dict(ocr_page, page=page_index, text='\n'.join(part for part in (text, ocr_text) if part.strip()),
+                confidence=confidence, method=DECISION_BOTH)
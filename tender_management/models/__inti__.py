@@ -1,6 +1,10 @@
 # models/__init__.py
 from . import tender
 from . import gem_portal
+from . import gem_payload_journal
 from . import company_department
+from . import res_currency
 from . import analytics_team
 from . import ocr
+from . import ocr_cache
+from . import ocr_page
@@ -204,6 +204,24 @@ class TenderDepartment(models.Model):
     # Notes
     notes = fields.Html(string='Notes')
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        departments = super(TenderDepartment, self).create(vals_list)
+        # Departments are indexed in the GeM reference data
+        self.env['gem.portal']._invalidate_gem_reference_data()
+        return departments
+    
+    def write(self, vals):
+        res = super(TenderDepartment, self).write(vals)
+        if {'name', 'code'} & set(vals):
+            self.env['gem.portal']._invalidate_gem_reference_data()
+        return res
+    
+    def unlink(self):
+        res = super(TenderDepartment, self).unlink()
+        self.env['gem.portal']._invalidate_gem_reference_data()
+        return res
+    
     @api.depends('tender_ids', 'tender_ids.tender_value')
     def _compute_budget_utilized(self):
         for department in self:
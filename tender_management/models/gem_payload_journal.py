@@ -0,0 +1,129 @@
+# models/gem_payload_journal.py
+import base64
+import json
+import logging
+import time
+import zlib
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+class GemPayloadJournal(models.Model):
+    _name = 'gem.payload.journal'
+    _description = 'GeM Payload Journal'
+    _order = 'fetch_date, id'
+
+    portal_id = fields.Many2one('gem.portal', string='GeM Portal', required=True, ondelete='cascade', index=True)
+    gem_bid_id = fields.Char(string='GeM Bid Number', required=True, index=True)
+    kind = fields.Selection([
+        ('tender', 'Tender'),
+        ('detail', 'Tender Details'),
+    ], string='Payload Type', required=True, default='tender')
+    fetch_date = fields.Datetime(string='Fetched On', required=True, default=fields.Datetime.now, index=True)
+
+    # Compressed Payload
+    payload = fields.Binary(string='Compressed Payload', attachment=False, required=True)
+    payload_size = fields.Integer(string='Size (bytes)')
+    compressed_size = fields.Integer(string='Compressed Size (bytes)')
+    payload_json = fields.Text(string='Payload', compute='_compute_payload_json')
+
+    def _compute_payload_json(self):
+        for entry in self:
+            entry.payload_json = json.dumps(entry._get_payload(), indent=2, sort_keys=True, default=str)
+
+    def write(self, vals):
+        raise UserError(_("GeM payload journal entries cannot be modified."))
+
+    @api.model
+    def _is_enabled(self):
+        """Whether raw GeM payloads should be journaled"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return str(ICP.get_param('tender_management.gem_payload_journal', False)).lower() in ('1', 'true')
+
+    @api.model
+    def _compress(self, data):
+        """Compressed, encoded form of a payload"""
+        raw = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str).encode()
+        compressed = zlib.compress(raw)
+        return base64.b64encode(compressed), len(raw), len(compressed)
+
+    def _get_payload(self):
+        """Decompressed payload of the entry"""
+        self.ensure_one()
+        return json.loads(zlib.decompress(base64.b64decode(self.payload)))
+
+    @api.model
+    def _append(self, portal, payloads, kind='tender'):
+        """Journal raw GeM payloads of a portal
+
+        :param portal: gem.portal record the payloads were fetched from
+        :param payloads: list of GeM payloads, with their ``bidId``
+        :param kind: payload type
+        :return: created journal entries
+        """
+        if not payloads or not self._is_enabled():
+            return self.browse()
+        fetch_date = fields.Datetime.now()
+        vals_list = []
+        for data in payloads:
+            if not data.get('bidId'):
+                continue
+            payload, size, compressed_size = self._compress(data)
+            vals_list.append({
+                'portal_id': portal.id,
+                'gem_bid_id': data.get('bidId'),
+                'kind': kind,
+                'fetch_date': fetch_date,
+                'payload': payload,
+                'payload_size': size,
+                'compressed_size': compressed_size,
+            })
+        return self.sudo().create(vals_list)
+
+    @api.model
+    def _iter_payloads(self, domain=None, batch_size=1000):
+        """Iterate over journaled payloads in fetch order, batch by batch
+
+        Only one batch of entries is held in memory at a time, which makes
+        the journal usable as a fixture source for large replays.
+
+        :param domain: domain selecting the entries
+        :param batch_size: number of entries read per query
+        :return: generator of ``(portal, entries, payloads)`` batches
+        """
+        last_id = 0
+        while True:
+            entries = self.search((domain or []) + [('id', '>', last_id)], order='id', limit=batch_size)
+            if not entries:
+                return
+            last_id = entries[-1].id
+            for portal, portal_entries in entries.grouped('portal_id').items():
+                yield portal, portal_entries, [entry._get_payload() for entry in portal_entries]
+            self.env.invalidate_all()
+
+    @api.model
+    def _replay(self, domain=None, batch_size=1000):
+        """Re-run the mapping and upsert of journaled payloads
+
+        Tenders are upserted from the journal only, without any request to
+        GeM: documents are not downloaded and payload fingerprints do not
+        prevent the new mapping from being applied.
+
+        :param domain: domain selecting the entries to replay
+        :param batch_size: number of entries replayed per batch
+        :return: dict with the upsert counters, ``entries`` and ``duration``
+        """
+        start = time.perf_counter()
+        totals = {'entries': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'writes': 0}
+        for portal, entries, payloads in self._iter_payloads(domain, batch_size):
+            stats = portal._create_update_tenders(payloads, replay=True)
+            totals['entries'] += len(entries)
+            for key in ('created', 'updated', 'unchanged', 'skipped', 'writes'):
+                totals[key] += stats[key]
+        totals['duration'] = time.perf_counter() - start
+        _logger.info(
+            "Replayed %s GeM journal entries in %.3fs: %s created, %s updated, %s unchanged",
+            totals['entries'], totals['duration'], totals['created'], totals['updated'], totals['unchanged']
+        )
+        return totals
@@ -1,13 +1,39 @@
 # models/gem_portal.py
+import base64
+import hashlib
 import logging
 import requests
 import json
-from datetime import datetime
-from odoo import models, fields, api, _
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
 
+from ..external.gem_api import gem_session
+from ..external.gem_api.gem_api import gem_mappings
+from ..external.gem_api.gem_client import GemAPIClient
+from ..external.gem_api.gem_downloader import GemDocumentDownloader
+from ..external.gem_api.gem_status_poller import GemStatusPoller, RateLimiter
+from ..external.gem_api.gem_upload import GemDocumentUploader
+
 _logger = logging.getLogger(__name__)
 
+# Advisory lock class serialising GeM token refreshes, the portal ID is the key
+_GEM_TOKEN_LOCK = 0x47454D
+# Advisory lock class held while a portal is synced, the portal ID is the key
+_GEM_SYNC_LOCK = 0x47454E
+# Counter bumped by every change of the reference data mapped from GeM payloads
+_GEM_REFERENCE_VERSION_PARAM = 'tender_management.gem_reference_version'
+
+
+def _bid_id_key(bid_id):
+    """Natural sort key of a GeM bid ID: its numbers compare as numbers,
+    so that GEM/2024/B/10 comes after GEM/2024/B/9"""
+    return [int(part) if index % 2 else part for index, part in enumerate(re.split(r'(\d+)', bid_id or ''))]
+
 class GemPortal(models.Model):
     _name = 'gem.portal'
     _description = 'GeM Portal Integration'
@@ -32,8 +58,54 @@ class GemPortal(models.Model):
     bid_count = fields.Integer(compute='_compute_bid_count')
     
     # Technical Fields
-    token = fields.Char(string='Access Token', groups="tender_management.group_tender_admin")
-    token_expiry = fields.Datetime(string='Token Expiry')
+    # Kept on gem.portal.health, refreshing the token never writes the portal
+    token = fields.Char(string='Access Token', compute='_compute_api_health',
+                        groups="tender_management.group_tender_admin")
+    token_expiry = fields.Datetime(string='Token Expiry', compute='_compute_api_health')
+    auth_call_count = fields.Integer(string='Authentications', compute='_compute_api_health',
+                                     help="Number of token requests sent to GeM since the counter start")
+    auth_count_since = fields.Datetime(string='Counting Since', compute='_compute_api_health')
+    auth_calls_per_hour = fields.Float(string='Authentications per Hour', compute='_compute_auth_calls_per_hour')
+    
+    # Synchronization Cursor
+    sync_cursor_date = fields.Datetime(string='Last Synced Publication', readonly=True, copy=False,
+                                       help="Publication date of the most recent tender synced from GeM")
+    sync_cursor_bid_id = fields.Char(string='Last Synced Bid ID', readonly=True, copy=False)
+    
+    # Synchronization Job
+    sync_cron_id = fields.Many2one('ir.cron', string='Sync Job', readonly=True, copy=False, ondelete='set null',
+                                   help="Scheduled action running the synchronization of this portal")
+    last_sync_state = fields.Selection([
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Last Sync Status', readonly=True, copy=False)
+    last_sync_date = fields.Datetime(string='Last Sync Start', readonly=True, copy=False)
+    last_sync_duration = fields.Float(string='Last Sync Duration (s)', readonly=True, copy=False)
+    last_sync_success = fields.Datetime(string='Last Successful Sync', readonly=True, copy=False)
+    last_sync_error = fields.Char(string='Last Sync Error', readonly=True, copy=False)
+    
+    # Bid Status Polling
+    bulk_status_supported = fields.Boolean(string='Bulk Status Endpoint',
+                                           help="The portal returns the status of several bids per request")
+    status_rate_limit = fields.Float(string='Status Requests per Second', default=5.0,
+                                     help="Maximum rate of bid status requests sent to the portal")
+    chunked_upload_supported = fields.Boolean(string='Resumable Uploads',
+                                              help="The portal accepts documents in chunks through resumable "
+                                                   "upload sessions")
+    
+    # API Health
+    circuit_state = fields.Selection([
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+    ], string='Circuit Breaker', compute='_compute_api_health',
+        help="While open, calls to the portal fail fast instead of waiting for timeouts")
+    circuit_open_until = fields.Datetime(string='Circuit Open Until', compute='_compute_api_health')
+    api_request_count = fields.Integer(string='API Requests', compute='_compute_api_health')
+    api_error_count = fields.Integer(string='API Errors', compute='_compute_api_health')
+    api_error_rate = fields.Float(string='API Error Rate (%)', compute='_compute_api_health')
+    api_last_error = fields.Char(string='Last API Error', compute='_compute_api_health')
+    api_last_error_date = fields.Datetime(string='Last API Error On', compute='_compute_api_health')
     
     @api.depends('tender_ids')
     def _compute_tender_count(self):
@@ -49,6 +121,57 @@ class GemPortal(models.Model):
                 ('gem_portal_id', '=', portal.id)
             ])
     
+    @api.depends('auth_call_count', 'auth_count_since')
+    def _compute_auth_calls_per_hour(self):
+        now = fields.Datetime.now()
+        for portal in self:
+            if portal.auth_count_since and portal.auth_call_count:
+                hours = max((now - portal.auth_count_since).total_seconds() / 3600.0, 1.0)
+                portal.auth_calls_per_hour = portal.auth_call_count / hours
+            else:
+                portal.auth_calls_per_hour = 0.0
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        portals = super(GemPortal, self).create(vals_list)
+        portals._ensure_sync_cron()
+        return portals
+    
+    def write(self, vals):
+        res = super(GemPortal, self).write(vals)
+        if 'active' in vals:
+            self.sync_cron_id.sudo().write({'active': vals['active']})
+        return res
+    
+    def unlink(self):
+        crons = self.sync_cron_id
+        res = super(GemPortal, self).unlink()
+        crons.sudo().unlink()
+        return res
+    
+    def _compute_api_health(self):
+        healths = {
+            health.portal_id.id: health
+            for health in self.env['gem.portal.health'].sudo().search([('portal_id', 'in', self.ids)])
+        }
+        now = fields.Datetime.now()
+        for portal in self:
+            health = healths.get(portal.id)
+            open_until = health.circuit_open_until if health else False
+            portal.circuit_state = 'open' if open_until and open_until > now else 'closed'
+            portal.circuit_open_until = open_until
+            portal.api_request_count = health.request_count if health else 0
+            portal.api_error_count = health.error_count if health else 0
+            portal.api_error_rate = (
+                100.0 * portal.api_error_count / portal.api_request_count if portal.api_request_count else 0.0
+            )
+            portal.api_last_error = health.last_error if health else False
+            portal.api_last_error_date = health.last_error_date if health else False
+            portal.token = health.token if health else False
+            portal.token_expiry = health.token_expiry if health else False
+            portal.auth_call_count = health.auth_call_count if health else 0
+            portal.auth_count_since = health.auth_count_since if health else False
+    
     def action_test_connection(self):
         """Test the connection to the GeM Portal"""
         self.ensure_one()
@@ -59,8 +182,6 @@ class GemPortal(models.Model):
                 self.write({
                     'connection_status': 'connected',
                     'last_connection': fields.Datetime.now(),
-                    'token': token['access_token'],
-                    'token_expiry': datetime.fromtimestamp(token['expires_at'])
                 })
                 return {
                     'type': 'ir.actions.client',
@@ -103,28 +224,222 @@ class GemPortal(models.Model):
                 }
             }
     
+    def _get_circuit_breaker(self):
+        """Circuit breaker of the portal in this worker
+        
+        The breaker is opened when another worker persisted an open state.
+        """
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        breaker = gem_session.get_breaker(
+            (self.env.cr.dbname, self._name, self.id),
+            failure_threshold=int(ICP.get_param('tender_management.gem_circuit_threshold', 5)),
+            cooldown=float(ICP.get_param('tender_management.gem_circuit_cooldown', 120)),
+        )
+        self.env.cr.execute("SELECT circuit_open_until FROM gem_portal_health WHERE portal_id = %s", (self.id,))
+        row = self.env.cr.fetchone()
+        breaker.observe(row and row[0] and row[0].replace(tzinfo=timezone.utc).timestamp())
+        return breaker
+    
+    def _flush_api_health(self, force=False):
+        """Persist the breaker state and request statistics of this worker
+        
+        Statistics are written at most every 30 seconds, or as soon as the
+        breaker opens or closes. They go to ``gem.portal.health`` in a
+        separate transaction, so that workers never conflict on the portal
+        record itself.
+        """
+        self.ensure_one()
+        stats = self._get_circuit_breaker().drain_stats(0 if force else 30)
+        if not stats:
+            return
+        now = fields.Datetime.now()
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("""
+                    INSERT INTO gem_portal_health AS health
+                           (portal_id, request_count, error_count, circuit_open_until, last_error,
+                            last_error_date, create_uid, create_date, write_uid, write_date)
+                    VALUES (%(portal_id)s, %(requests)s, %(errors)s, %(open_until)s, %(last_error)s,
+                            %(last_error_date)s, %(uid)s, %(now)s, %(uid)s, %(now)s)
+                    ON CONFLICT (portal_id) DO UPDATE
+                       SET request_count = COALESCE(health.request_count, 0) + EXCLUDED.request_count,
+                           error_count = COALESCE(health.error_count, 0) + EXCLUDED.error_count,
+                           circuit_open_until = CASE WHEN %(state_changed)s
+                                                     THEN EXCLUDED.circuit_open_until
+                                                     ELSE health.circuit_open_until END,
+                           last_error = COALESCE(EXCLUDED.last_error, health.last_error),
+                           last_error_date = COALESCE(EXCLUDED.last_error_date, health.last_error_date),
+                           write_uid = EXCLUDED.write_uid,
+                           write_date = EXCLUDED.write_date
+                """, {
+                    'portal_id': self.id,
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'open_until': datetime.utcfromtimestamp(stats['open_until']) if stats['open_until'] else None,
+                    'state_changed': stats['state_changed'],
+                    'last_error': stats['last_error'],
+                    'last_error_date': now if stats['last_error'] else None,
+                    'uid': self.env.uid,
+                    'now': now,
+                })
+        except Exception as e:
+            # Health statistics must never break the call they describe
+            _logger.warning("Could not store API health of GeM Portal %s: %s", self.name, str(e))
+    
+    def _gem_request(self, method, url, **kwargs):
+        """Send a request to GeM with retries, through the portal's circuit breaker
+        
+        :raise CircuitOpenError: while the circuit breaker of the portal is open
+        """
+        self.ensure_one()
+        try:
+            return gem_session.request(
+                self._get_http_session(url), method, url,
+                breaker=self._get_circuit_breaker(),
+                **dict(gem_session.retry_settings(self.env), **kwargs)
+            )
+        finally:
+            self._flush_api_health()
+    
+    def action_reset_circuit(self):
+        """Close the circuit breaker and clear the API statistics"""
+        for portal in self:
+            portal._get_circuit_breaker().reset()
+        # The token and authentication counter are kept
+        self.env['gem.portal.health'].sudo().search([('portal_id', 'in', self.ids)]).write({
+            'request_count': 0,
+            'error_count': 0,
+            'circuit_open_until': False,
+            'last_error': False,
+            'last_error_date': False,
+        })
+    
+    def _get_http_session(self, url=None):
+        """Pooled keep-alive HTTP session for the portal's API endpoint, or for ``url``"""
+        self.ensure_one()
+        return gem_session.session_for(self.env, url or self.api_endpoint)
+    
+    def _get_token_refresh_margin(self):
+        """Seconds before expiry at which a cached token gets refreshed"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return int(ICP.get_param('tender_management.gem_token_refresh_margin', 300))
+    
+    def _is_token_fresh(self, token, token_expiry):
+        """Whether a cached token is valid beyond the refresh margin"""
+        margin = timedelta(seconds=self._get_token_refresh_margin())
+        return bool(token and token_expiry and token_expiry - margin > fields.Datetime.now())
+    
+    def _format_token(self, token, token_expiry):
+        """Token in the format returned by the GeM authentication endpoint"""
+        return {
+            'access_token': token,
+            'expires_at': token_expiry.replace(tzinfo=timezone.utc).timestamp(),
+        }
+    
     def _get_token(self):
-        """Get authentication token from GeM Portal"""
+        """Get authentication token from GeM Portal
+        
+        The token stored on the health record of the portal is shared by
+        every worker. Once it is close to expiry, a single process refreshes
+        it while the others wait for that refresh and reuse its result.
+        """
         self.ensure_one()
+        portal = self.sudo()
         
         # Check if we already have a valid token
-        if self.token and self.token_expiry and self.token_expiry > fields.Datetime.now():
-            return {
-                'access_token': self.token,
-                'expires_at': self.token_expiry.timestamp()
-            }
+        if self._is_token_fresh(portal.token, portal.token_expiry):
+            return self._format_token(portal.token, portal.token_expiry)
+        
+        return self._refresh_token()
+    
+    def _refresh_token(self):
+        """Refresh the shared token, authenticating at most once per portal
         
-        # Otherwise, get a new token
+        The token is refreshed in a short transaction of its own, committed
+        before returning, so other workers and requests never wait for the
+        transaction of the caller. Refreshes are serialized by an advisory
+        lock keyed on the portal: the transaction reading the token starts
+        once the lock is granted, so a worker that waited for another one
+        reuses the token it just committed. The token is stored on
+        ``gem.portal.health``, the caller writing the portal afterwards
+        does not conflict with it.
+        
+        :return: the token, or None when authentication failed or the
+                 portal no longer exists
+        """
+        self.ensure_one()
+        lock = (_GEM_TOKEN_LOCK, self.id)
+        with self.pool.cursor() as cr:
+            cr.execute("SELECT pg_advisory_lock(%s, %s)", lock)
+            try:
+                # Start a new snapshot, taken after the lock was granted
+                cr.commit()
+                result = self.with_env(self.env(cr=cr))._refresh_stored_token()
+                cr.commit()
+            finally:
+                cr.rollback()
+                cr.execute("SELECT pg_advisory_unlock(%s, %s)", lock)
+        # The caller reads the new token from the health record again
+        self.env['gem.portal.health'].invalidate_model()
+        self.invalidate_recordset(['token', 'token_expiry', 'auth_call_count', 'auth_count_since'])
+        return result
+    
+    def _refresh_stored_token(self):
+        """Request a new token unless the stored one is still fresh, and store it"""
+        self.ensure_one()
+        cr = self.env.cr
+        cr.execute("SELECT 1 FROM gem_portal WHERE id = %s", (self.id,))
+        if not cr.fetchone():
+            _logger.error("GeM Portal %s no longer exists, no token can be requested", self.id)
+            return None
+        cr.execute("SELECT token, token_expiry FROM gem_portal_health WHERE portal_id = %s", (self.id,))
+        token, token_expiry = cr.fetchone() or (None, None)
+        if self._is_token_fresh(token, token_expiry):
+            return self._format_token(token, token_expiry)
+        
+        result = self._request_token()
+        if not result:
+            return None
+        
+        token_expiry = datetime.utcfromtimestamp(result['expires_at'])
+        now = fields.Datetime.now()
+        cr.execute("""
+            INSERT INTO gem_portal_health AS health
+                   (portal_id, token, token_expiry, auth_call_count, auth_count_since,
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (%(portal_id)s, %(token)s, %(token_expiry)s, 1, %(now)s, %(uid)s, %(now)s, %(uid)s, %(now)s)
+            ON CONFLICT (portal_id) DO UPDATE
+               SET token = EXCLUDED.token,
+                   token_expiry = EXCLUDED.token_expiry,
+                   auth_call_count = COALESCE(health.auth_call_count, 0) + 1,
+                   auth_count_since = COALESCE(health.auth_count_since, EXCLUDED.auth_count_since),
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, {
+            'portal_id': self.id,
+            'token': result['access_token'],
+            'token_expiry': token_expiry,
+            'uid': self.env.uid,
+            'now': now,
+        })
+        return self._format_token(result['access_token'], token_expiry)
+    
+    def _request_token(self):
+        """Authenticate with the GeM Portal and return the new token"""
+        self.ensure_one()
+        portal = self.sudo()
         try:
             headers = {
                 'Content-Type': 'application/json',
             }
             data = {
-                'apiKey': self.api_key,
-                'secret': self.api_secret
+                'apiKey': portal.api_key,
+                'secret': portal.api_secret
             }
             
-            response = requests.post(
+            response = self._gem_request(
+                'POST',
                 f"{self.api_endpoint}/auth/token",
                 headers=headers,
                 data=json.dumps(data),
@@ -133,6 +448,11 @@ class GemPortal(models.Model):
             
             if response.status_code == 200:
                 result = response.json()
+                if not result.get('access_token'):
+                    _logger.error("GeM Portal returned no access token")
+                    return None
+                if not result.get('expires_at'):
+                    result['expires_at'] = time.time() + int(result.get('expires_in', 3600))
                 return result
             else:
                 _logger.error(
@@ -144,6 +464,15 @@ class GemPortal(models.Model):
             _logger.error("Error getting token from GeM Portal: %s", str(e))
             return None
     
+    def action_reset_auth_counter(self):
+        """Restart the authentication call counter"""
+        Health = self.env['gem.portal.health'].sudo()
+        healths = Health.search([('portal_id', 'in', self.ids)])
+        vals = {'auth_call_count': 0, 'auth_count_since': fields.Datetime.now()}
+        healths.write(vals)
+        Health.create([dict(vals, portal_id=portal.id) for portal in self - healths.portal_id])
+        self.invalidate_recordset(['auth_call_count', 'auth_count_since'])
+    
     def fetch_tender_details(self, tender):
         """Fetch tender details from GeM Portal"""
         self.ensure_one()
@@ -160,15 +489,30 @@ class GemPortal(models.Model):
                 'Authorization': f"Bearer {token['access_token']}"
             }
             
-            response = requests.get(
+            # Only download the bid again when it changed on GeM
+            headers.update(gem_session.conditional_headers(tender.gem_etag, tender.gem_last_modified))
+            
+            response = self._gem_request(
+                'GET',
                 f"{self.api_endpoint}/tenders/{tender.gem_bid_id}",
                 headers=headers,
                 timeout=15
             )
             
+            if response.status_code == 304:
+                _logger.debug("GeM tender %s not modified since last fetch", tender.gem_bid_id)
+                return True
             if response.status_code == 200:
                 tender_data = response.json()
+                self.env['gem.payload.journal']._append(
+                    self, [dict(tender_data, bidId=tender_data.get('bidId') or tender.gem_bid_id)], kind='detail'
+                )
                 self._update_tender_from_gem_data(tender, tender_data)
+                validators = gem_session.response_validators(response)
+                tender.write({
+                    'gem_etag': validators['etag'] or False,
+                    'gem_last_modified': validators['last_modified'] or False,
+                })
                 return True
             else:
                 _logger.error(
@@ -180,48 +524,281 @@ class GemPortal(models.Model):
             _logger.error("Error fetching tender details from GeM Portal: %s", str(e))
             raise UserError(_("Error fetching tender details: %s") % str(e))
     
-    def _update_tender_from_gem_data(self, tender, data):
-        """Update tender with data from GeM Portal"""
-        if not data:
-            return
+    def _parse_gem_datetime(self, value, date_format='%Y-%m-%dT%H:%M:%S'):
+        """Parse a GeM timestamp, returning False when it is missing"""
+        return datetime.strptime(value, date_format) if value else False
+    
+    def _prepare_tender_vals_from_gem(self, data):
+        """Prepare tender values from a GeM tender payload
         
-        # Update tender fields with GeM data
-        tender.write({
-            'title': data.get('title', tender.title),
-            'description': data.get('description', tender.description),
-            'submission_date': datetime.strptime(data.get('submissionDate'), '%Y-%m-%dT%H:%M:%S') if data.get('submissionDate') else tender.submission_date,
-            'publication_date': datetime.strptime(data.get('publicationDate'), '%Y-%m-%dT%H:%M:%S') if data.get('publicationDate') else tender.publication_date,
-            'opening_date': datetime.strptime(data.get('openingDate'), '%Y-%m-%dT%H:%M:%S') if data.get('openingDate') else tender.opening_date,
+        Keys missing from the payload are left out so that existing values
+        are kept on update.
+        """
+        vals = {}
+        for key, field_name in (('title', 'title'),
+                                ('description', 'description'),
+                                ('issuingAuthority', 'issuing_authority'),
+                                ('sourceUrl', 'source_url')):
+            if key in data:
+                vals[field_name] = data[key]
+        for key, field_name in (('submissionDate', 'submission_date'),
+                                ('publicationDate', 'publication_date'),
+                                ('openingDate', 'opening_date')):
+            if data.get(key):
+                vals[field_name] = self._parse_gem_datetime(data[key])
+        vals.update({
             'tender_value': float(data.get('estimatedValue', 0.0)),
             'bid_security': float(data.get('bidSecurityAmount', 0.0)),
             'emd_required': bool(data.get('emdRequired', False)),
             'emd_amount': float(data.get('emdAmount', 0.0)),
-            'issuing_authority': data.get('issuingAuthority', tender.issuing_authority),
-            'source_url': data.get('sourceUrl', tender.source_url),
         })
+        return vals
+    
+    def _prepare_new_tender_vals(self, gem_bid_id, data):
+        """Prepare creation values for a tender not yet known locally"""
+        vals = {
+            'name': f"GeM-{gem_bid_id}",
+            'title': '',
+            'description': '',
+            'submission_date': False,
+            'publication_date': False,
+            'issuing_authority': '',
+            'source_url': '',
+            'tender_type': 'gem',
+            'gem_portal_id': self.id,
+            'gem_bid_id': gem_bid_id,
+            'state': 'draft'
+        }
+        vals.update(self._prepare_tender_vals_from_gem(data))
+        department_id = self._get_gem_reference_data().department_id(data.get('issuingAuthority'))
+        if department_id:
+            vals['department_id'] = department_id
+        return vals
+    
+    def _gem_payload_fingerprint(self, data):
+        """Stable fingerprint of a GeM tender payload"""
+        payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _update_tender_from_gem_data(self, tender, data):
+        """Update tender with data from GeM Portal
         
-        # Create documents if they exist in the response
-        if 'documents' in data and isinstance(data['documents'], list):
-            for doc_data in data['documents']:
-                # Check if document already exists
-                existing_doc = self.env['tender.document'].search([
-                    ('tender_id', '=', tender.id),
-                    ('name', '=', doc_data.get('name'))
-                ], limit=1)
-                
-                if not existing_doc:
-                    # Download the document
-                    doc_content = self._download_document(doc_data.get('url'))
-                    if doc_content:
-                        self.env['tender.document'].create({
-                            'tender_id': tender.id,
-                            'name': doc_data.get('name'),
-                            'document_type': self._map_document_type(doc_data.get('type')),
-                            'description': doc_data.get('description'),
-                            'file': doc_content,
-                            'file_name': doc_data.get('name'),
-                            'date': datetime.strptime(doc_data.get('date'), '%Y-%m-%d').date() if doc_data.get('date') else fields.Date.today(),
-                        })
+        Nothing is written when the payload is unchanged since the last
+        sync, otherwise only the fields that differ are written.
+        """
+        if not data:
+            return
+        
+        fingerprint = self._gem_payload_fingerprint(data)
+        if tender.gem_payload_hash == fingerprint:
+            return
+        vals = tender._get_changed_vals(self._prepare_tender_vals_from_gem(data))
+        vals['gem_payload_hash'] = fingerprint
+        tender.write(vals)
+        self._sync_tender_documents([(tender, data)])
+    
+    def _store_payload_fingerprints(self, fingerprints):
+        """Store payload fingerprints of existing tenders in one query
+        
+        Fingerprints differ for every tender, writing them through the ORM
+        would defeat the grouping of identical updates.
+        
+        :param fingerprints: dict mapping tender IDs to fingerprints
+        """
+        if not fingerprints:
+            return
+        Tender = self.env['tender.tender']
+        # Pending ORM writes of the column must not overwrite the query
+        Tender.flush_model(['gem_payload_hash'])
+        self.env.cr.execute("""
+            UPDATE tender_tender AS tender
+               SET gem_payload_hash = payload.hash
+              FROM (SELECT unnest(%s::int[]) AS id, unnest(%s::varchar[]) AS hash) AS payload
+             WHERE tender.id = payload.id
+        """, (list(fingerprints), list(fingerprints.values())))
+        Tender.invalidate_model(['gem_payload_hash'])
+    
+    def _sync_tender_documents(self, tender_payloads):
+        """Create the documents listed in GeM payloads that the tenders lack
+        
+        Missing files are downloaded concurrently to temporary files, then
+        the documents are created in batches from this thread.
+        
+        :param tender_payloads: list of (tender, GeM payload) pairs
+        """
+        Document = self.env['tender.document']
+        pending = []
+        for tender, data in tender_payloads:
+            # Create documents if they exist in the response
+            if isinstance(data.get('documents'), list):
+                pending.extend((tender, doc_data) for doc_data in data['documents'] if doc_data.get('url'))
+        if not pending:
+            return
+        
+        # Check which documents already exist with a single query
+        existing = {
+            (doc['tender_id'][0], doc['name']): doc
+            for doc in Document.search_read([
+                ('tender_id', 'in', list({tender.id for tender, _doc_data in pending})),
+                ('name', 'in', list({doc_data.get('name') for _tender, doc_data in pending})),
+            ], ['tender_id', 'name', 'source_etag', 'source_last_modified'])
+        }
+        to_download = []
+        to_refresh = []
+        seen = set()
+        for tender, doc_data in pending:
+            key = (tender.id, doc_data.get('name'))
+            if key in seen:
+                continue
+            seen.add(key)
+            document = existing.get(key)
+            if not document:
+                to_download.append((tender, doc_data))
+            elif document['source_etag'] or document['source_last_modified']:
+                # Known documents are only re-fetched when they can be
+                # validated with a conditional request
+                to_refresh.append((document, doc_data))
+        
+        # Content already stored under the announced checksum is shared
+        # instead of downloaded again
+        remote_hashes = {self._get_remote_checksum(doc_data) for _tender, doc_data in to_download} - {None}
+        known_hashes = set(Document.sudo().search([
+            ('content_hash', 'in', list(remote_hashes)),
+        ]).mapped('content_hash')) if remote_hashes else set()
+        if known_hashes:
+            shared_vals_list = []
+            for tender, doc_data in to_download:
+                content_hash = self._get_remote_checksum(doc_data)
+                if content_hash in known_hashes:
+                    vals = self._prepare_document_vals(tender, doc_data, False)
+                    vals.pop('file')
+                    vals['content_hash'] = content_hash
+                    shared_vals_list.append(vals)
+            Document.create(shared_vals_list)
+            _logger.info("Skipped download of %s GeM documents already stored", len(shared_vals_list))
+            to_download = [
+                (tender, doc_data) for tender, doc_data in to_download
+                if self._get_remote_checksum(doc_data) not in known_hashes
+            ]
+        if not to_download and not to_refresh:
+            return
+        
+        token = self._get_token()
+        if not token:
+            _logger.error("Failed to authenticate with GeM Portal to download documents")
+            return
+        
+        downloader = self._get_document_downloader(token)
+        results = downloader.download_all(
+            [doc_data['url'] for _tender, doc_data in to_download] +
+            [(doc_data['url'], gem_session.conditional_headers(document['source_etag'], document['source_last_modified']))
+             for document, doc_data in to_refresh]
+        )
+        self._flush_api_health()
+        try:
+            batch_limit = self._get_document_batch_bytes()
+            vals_list, batch_size = [], 0
+            for (tender, doc_data), result in zip(to_download, results):
+                if not result.get('path'):
+                    continue
+                with open(result['path'], 'rb') as document_file:
+                    content = base64.b64encode(document_file.read())
+                downloader.cleanup([result])
+                vals = self._prepare_document_vals(tender, doc_data, content)
+                vals.update(self._prepare_document_validator_vals(result))
+                vals_list.append(vals)
+                batch_size += len(content)
+                if batch_size >= batch_limit:
+                    Document.create(vals_list)
+                    vals_list, batch_size = [], 0
+            if vals_list:
+                Document.create(vals_list)
+            
+            for (document, doc_data), result in zip(to_refresh, results[len(to_download):]):
+                if not result.get('path'):
+                    continue
+                with open(result['path'], 'rb') as document_file:
+                    content = base64.b64encode(document_file.read())
+                downloader.cleanup([result])
+                vals = self._prepare_document_validator_vals(result)
+                vals['file'] = content
+                Document.browse(document['id']).write(vals)
+        finally:
+            downloader.cleanup(results)
+    
+    def _prepare_document_validator_vals(self, result):
+        """Cache validators of a downloaded document"""
+        return {
+            'source_url': result['url'],
+            'source_etag': result.get('etag') or False,
+            'source_last_modified': result.get('last_modified') or False,
+        }
+    
+    def _get_remote_checksum(self, doc_data):
+        """SHA-256 checksum announced by GeM for a document, if any"""
+        checksum = doc_data.get('sha256') or doc_data.get('checksum')
+        return checksum.lower() if isinstance(checksum, str) else None
+    
+    def _prepare_document_vals(self, tender, doc_data, content):
+        """Prepare tender.document values for a downloaded GeM document"""
+        return {
+            'tender_id': tender.id,
+            'name': doc_data.get('name'),
+            'document_type': self._map_document_type(doc_data.get('type')),
+            'description': doc_data.get('description'),
+            'file': content,
+            'file_name': doc_data.get('name'),
+            'date': datetime.strptime(doc_data.get('date'), '%Y-%m-%d').date() if doc_data.get('date') else fields.Date.today(),
+        }
+    
+    def _get_status_poller(self, token):
+        """Build the bid status poller of the portal"""
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        return GemStatusPoller(
+            gem_session.session_factory(self.env),
+            self.api_endpoint,
+            headers={'Authorization': f"Bearer {token['access_token']}"},
+            rate_limiter=RateLimiter(self.status_rate_limit or 5.0),
+            max_workers=int(ICP.get_param('tender_management.gem_status_workers', 4)),
+            bulk_size=int(ICP.get_param('tender_management.gem_status_bulk_size', 100))
+            if self.bulk_status_supported else 0,
+            breaker=self._get_circuit_breaker(),
+            retry=gem_session.retry_settings(self.env),
+        )
+    
+    def _get_document_downloader(self, token):
+        """Concurrent document downloader configured for this portal"""
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        return GemDocumentDownloader(
+            gem_session.session_factory(self.env),
+            headers={'Authorization': f"Bearer {token['access_token']}"},
+            max_workers=int(ICP.get_param('tender_management.gem_download_workers', 4)),
+            per_host=int(ICP.get_param('tender_management.gem_download_per_host', 2)),
+            timeout=int(ICP.get_param('tender_management.gem_download_timeout', 120)),
+            breaker=self._get_circuit_breaker(),
+            retry=gem_session.retry_settings(self.env),
+        )
+    
+    def _get_document_uploader(self, token):
+        """Streaming document uploader configured for this portal"""
+        self.ensure_one()
+        ICP = self.env['ir.config_parameter'].sudo()
+        return GemDocumentUploader(
+            gem_session.session_factory(self.env),
+            self.api_endpoint,
+            headers={'Authorization': f"Bearer {token['access_token']}"},
+            chunk_size=int(ICP.get_param('tender_management.gem_upload_chunk_size', 8 * 1024 * 1024)),
+            timeout=int(ICP.get_param('tender_management.gem_upload_timeout', 300)),
+            breaker=self._get_circuit_breaker(),
+            retry=gem_session.retry_settings(self.env),
+        )
+    
+    def _get_document_batch_bytes(self):
+        """Encoded size of downloaded documents created in one batch"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return int(ICP.get_param('tender_management.gem_document_batch_bytes', 50 * 1024 * 1024))
     
     def _download_document(self, url):
         """Download document from URL"""
@@ -238,7 +815,8 @@ class GemPortal(models.Model):
                 'Authorization': f"Bearer {token['access_token']}"
             }
             
-            response = requests.get(
+            response = self._gem_request(
+                'GET',
                 url,
                 headers=headers,
                 timeout=30
@@ -256,18 +834,70 @@ class GemPortal(models.Model):
             _logger.error("Error downloading document from GeM Portal: %s", str(e))
             return None
     
+    @api.model
+    def _get_gem_reference_data(self):
+        """Currencies, document types and departments indexed for GeM mappings
+        
+        Loaded once per version of the reference data, so mapping a synced
+        tender is pure in-memory work.
+        """
+        return self._load_gem_reference_data(self._get_gem_reference_version())
+    
+    @api.model
+    @tools.ormcache('version')
+    def _load_gem_reference_data(self, version):
+        return gem_mappings.GemReferenceData.load(self.env)
+    
+    @api.model
+    def _get_gem_reference_version(self):
+        """Version of the reference data seen by the current transaction
+        
+        The version is a counter bumped by every change of departments and
+        currencies, in the transaction of the change, so it is always read
+        from the same snapshot as the data. It is read once per transaction.
+        """
+        cr = self.env.cr
+        version = cr.cache.get('gem_reference_version')
+        if version is None:
+            cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", (_GEM_REFERENCE_VERSION_PARAM,))
+            row = cr.fetchone()
+            version = self._remember_gem_reference_version(int(row[0]) if row else 0)
+        return version
+    
+    def _remember_gem_reference_version(self, counter, transaction=None):
+        cr = self.env.cr
+        version = cr.cache['gem_reference_version'] = (counter, transaction)
+        # Other transactions may change the reference data
+        cr.postcommit.add(self._forget_gem_reference_version)
+        cr.postrollback.add(self._forget_gem_reference_version)
+        return version
+    
+    def _forget_gem_reference_version(self):
+        self.env.cr.cache.pop('gem_reference_version', None)
+    
+    @api.model
+    def _invalidate_gem_reference_data(self):
+        """Bump the version of the reference data once departments or
+        currencies changed
+        
+        The counter is written with SQL: ``set_param`` would clear every
+        cache of the registry, and it is never read through ``get_param``.
+        Until it commits, the transaction of the change uses a version of
+        its own, its data is never cached for the others.
+        """
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO ir_config_parameter AS param (key, value, create_uid, create_date, write_uid, write_date)
+                 VALUES (%(key)s, '1', %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC')
+            ON CONFLICT (key) DO UPDATE
+                    SET value = (COALESCE(NULLIF(param.value, ''), '0')::int + 1)::text
+              RETURNING value::int, txid_current()
+        """, {'key': _GEM_REFERENCE_VERSION_PARAM, 'uid': self.env.uid})
+        self._remember_gem_reference_version(*cr.fetchone())
+    
     def _map_document_type(self, gem_type):
         """Map GeM document type to Odoo document type"""
-        mapping = {
-            'TENDER_NOTICE': 'tender_notice',
-            'TECHNICAL_SPECIFICATION': 'technical_specification',
-            'FINANCIAL_SPECIFICATION': 'financial_specification',
-            'CORRIGENDUM': 'corrigendum',
-            'PRE_BID_QUERY': 'pre_bid_query',
-            'BID_DOCUMENT': 'bid_document',
-            'SUBMISSION': 'submission'
-        }
-        return mapping.get(gem_type, 'other')
+        return self._get_gem_reference_data().document_type(gem_type)
     
     def action_view_tenders(self):
         """View tenders using this GeM Portal"""
@@ -295,16 +925,109 @@ class GemPortal(models.Model):
     
     @api.model
     def _cron_sync_gem_tenders(self):
-        """Cron job to sync tenders from GeM Portal"""
+        """Cron job queuing the sync job of every active GeM Portal
+        
+        Each portal is synced by its own scheduled action, in its own
+        transactions, so portals run in parallel on the available cron
+        workers and a failing portal does not affect the others.
+        """
         portals = self.search([('active', '=', True)])
+        portals._ensure_sync_cron()
         for portal in portals:
-            try:
-                portal._sync_tenders()
-            except Exception as e:
-                _logger.error("Error syncing tenders from GeM Portal %s: %s", portal.name, str(e))
+            if portal._get_circuit_breaker().is_open():
+                _logger.info("Skipping sync of GeM Portal %s while its circuit breaker is open", portal.name)
+                continue
+            portal.sync_cron_id._trigger()
+    
+    def _ensure_sync_cron(self):
+        """Create the scheduled action syncing each portal"""
+        model_id = self.env['ir.model']._get_id(self._name)
+        for portal in self.filtered(lambda p: not p.sync_cron_id):
+            # Portal jobs are triggered by the main sync cron, their own
+            # schedule is only a fallback
+            portal.sync_cron_id = self.env['ir.cron'].sudo().create({
+                'name': _("GeM Portal: Sync %s") % portal.name,
+                'model_id': model_id,
+                'state': 'code',
+                'code': f"model.browse({portal.id})._cron_sync_portal()",
+                'interval_number': 1,
+                'interval_type': 'days',
+                'numbercall': -1,
+                'doall': False,
+                'active': portal.active,
+                'user_id': self.env.ref('base.user_root').id,
+            })
+    
+    def action_sync_now(self):
+        """Queue the sync job of the portals"""
+        self._ensure_sync_cron()
+        for portal in self:
+            portal.sync_cron_id._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Synchronization Queued'),
+                'message': _('Tenders will be synchronized from GeM Portal in the background.'),
+                'sticky': False,
+            }
+        }
+    
+    def _cron_sync_portal(self):
+        """Sync job of a single portal, run by its own scheduled action
+        
+        Odoo never runs the same scheduled action twice at once. The sync
+        also holds an advisory lock on a separate cursor, so that a portal
+        synced from any other entry point is skipped rather than synced
+        twice.
+        """
+        self.ensure_one()
+        if not self.active or self._get_circuit_breaker().is_open():
+            return
+        with self.env.registry.cursor() as lock_cr:
+            lock_cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (_GEM_SYNC_LOCK, self.id))
+            if not lock_cr.fetchone()[0]:
+                _logger.info("GeM Portal %s is already being synced by another worker", self.name)
+                return
+            return self._run_sync_job()
+    
+    def _run_sync_job(self):
+        """Sync the portal, recording the outcome and duration of the run"""
+        self.ensure_one()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        start = time.perf_counter()
+        self.write({'last_sync_state': 'running', 'last_sync_date': fields.Datetime.now()})
+        if auto_commit:
+            self.env.cr.commit()
+        
+        try:
+            totals = self._sync_tenders()
+            error = totals['error'] if totals else _("Authentication failed")
+        except Exception as e:
+            if auto_commit:
+                self.env.cr.rollback()
+            _logger.error("Error syncing tenders from GeM Portal %s: %s", self.name, str(e))
+            totals, error = None, str(e)
+        
+        vals = {
+            'last_sync_state': 'failed' if error else 'done',
+            'last_sync_duration': time.perf_counter() - start,
+            'last_sync_error': error or False,
+        }
+        if not error:
+            vals['last_sync_success'] = fields.Datetime.now()
+        self.write(vals)
+        if auto_commit:
+            self.env.cr.commit()
+        return totals
     
     def _sync_tenders(self):
-        """Sync tenders from GeM Portal"""
+        """Sync tenders published on GeM after the portal's sync cursor
+        
+        Pages are followed until the portal has no more results. The cursor
+        is moved forward and committed together with each page, so a failed
+        run resumes from the last committed page on the next call.
+        """
         self.ensure_one()
         
         token = self._get_token()
@@ -312,68 +1035,376 @@ class GemPortal(models.Model):
             _logger.error("Failed to authenticate with GeM Portal to sync tenders")
             return
         
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        page_size = self._get_sync_page_size()
+        totals = {
+            'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0,
+            'writes': 0, 'tracking_values': 0, 'pages': 0, 'error': None,
+        }
+        page_token = None
+        
         try:
             headers = {
                 'Content-Type': 'application/json',
                 'Authorization': f"Bearer {token['access_token']}"
             }
             
-            # Get new tenders published in the last 24 hours
-            response = requests.get(
-                f"{self.api_endpoint}/tenders/recent",
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                tenders_data = response.json()
-                self._create_update_tenders(tenders_data)
-            else:
-                _logger.error(
-                    "Failed to sync tenders from GeM Portal. Status code: %s, Response: %s",
-                    response.status_code, response.text
+            while True:
+                params = self._prepare_sync_params(page_size, page_token)
+                response = self._gem_request(
+                    'GET',
+                    f"{self.api_endpoint}/tenders",
+                    headers=headers,
+                    params=params,
+                    timeout=30
                 )
+                
+                if response.status_code != 200:
+                    _logger.error(
+                        "Failed to sync tenders from GeM Portal. Status code: %s, Response: %s",
+                        response.status_code, response.text
+                    )
+                    totals['error'] = _("GeM Portal returned status %s") % response.status_code
+                    break
+                
+                tenders_data, page_token = self._parse_sync_page(response.json())
+                stats = self._create_update_tenders(tenders_data)
+                cursor = (self.sync_cursor_date, self.sync_cursor_bid_id)
+                self._advance_sync_cursor(tenders_data)
+                cursor_moved = (self.sync_cursor_date, self.sync_cursor_bid_id) != cursor
+                if auto_commit:
+                    self.env.cr.commit()
+                
+                totals['pages'] += 1
+                for key in ('created', 'updated', 'unchanged', 'skipped', 'writes', 'tracking_values'):
+                    totals[key] += stats[key]
+                
+                # Without a page token the cursor itself pages through the
+                # results, a short page means we reached the end
+                if not tenders_data or (not page_token and len(tenders_data) < page_size):
+                    break
+                if not page_token and not cursor_moved:
+                    # The same page would be requested again, forever
+                    _logger.error(
+                        "GeM Portal %s: sync stopped, a full page did not move the sync cursor past %s %s",
+                        self.name, cursor[0], cursor[1]
+                    )
+                    totals['error'] = _("A page of GeM results did not move the sync cursor, "
+                                        "check the publication dates returned by GeM")
+                    break
         except Exception as e:
+            if auto_commit:
+                self.env.cr.rollback()
             _logger.error("Error syncing tenders from GeM Portal: %s", str(e))
+            totals['error'] = str(e)
+        
+        _logger.info(
+            "GeM Portal %s: sync finished after %s pages with %s created, %s updated, %s unchanged and "
+            "%s skipped tenders (%s writes, %s tracking values)",
+            self.name, totals['pages'], totals['created'], totals['updated'], totals['unchanged'],
+            totals['skipped'], totals['writes'], totals['tracking_values']
+        )
+        return totals
+    
+    def _get_sync_page_size(self):
+        """Number of tenders requested per page from GeM"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return max(int(ICP.get_param('tender_management.gem_sync_page_size', 500)), 1)
     
-    def _create_update_tenders(self, tenders_data):
-        """Create or update tenders from GeM data"""
+    def _prepare_sync_params(self, page_size, page_token=None):
+        """Query parameters selecting the tenders after the sync cursor"""
+        params = {'pageSize': page_size}
+        if page_token:
+            params['pageToken'] = page_token
+            return params
+        if self.sync_cursor_date:
+            params['publishedAfter'] = self.sync_cursor_date.strftime('%Y-%m-%dT%H:%M:%S')
+        if self.sync_cursor_bid_id:
+            params['afterBidId'] = self.sync_cursor_bid_id
+        return params
+    
+    def _parse_sync_page(self, page):
+        """Split a page of GeM results into its tenders and next page token"""
+        if isinstance(page, list):
+            return page, None
+        if not isinstance(page, dict):
+            return [], None
+        return page.get('items') or page.get('tenders') or [], page.get('nextPageToken')
+    
+    def _advance_sync_cursor(self, tenders_data):
+        """Move the sync cursor to the latest tender of a committed page
+        
+        The cursor only ever moves forward, ordered on publication date and
+        then bid ID, so replayed or out-of-order pages never rewind it. Bid
+        IDs are compared on their natural order, see ``_bid_id_key``.
+        """
+        self.ensure_one()
+        cursor = (self.sync_cursor_date or datetime.min, _bid_id_key(self.sync_cursor_bid_id))
+        latest, latest_bid_id = cursor, self.sync_cursor_bid_id
+        for tender_data in tenders_data or []:
+            if not isinstance(tender_data, dict) or not tender_data.get('bidId'):
+                continue
+            try:
+                published = self._parse_gem_datetime(tender_data.get('publicationDate'))
+            except ValueError:
+                continue
+            if not published:
+                continue
+            key = (published, _bid_id_key(str(tender_data['bidId'])))
+            if key > latest:
+                latest, latest_bid_id = key, str(tender_data['bidId'])
+        
+        if latest > cursor:
+            self.write({
+                'sync_cursor_date': latest[0],
+                'sync_cursor_bid_id': latest_bid_id,
+            })
+    
+    def action_replay_journal(self):
+        """Re-apply the journaled GeM payloads of the portals without calling GeM"""
+        totals = self.env['gem.payload.journal']._replay([('portal_id', 'in', self.ids)])
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Journal Replayed'),
+                'message': _('%(entries)s payloads replayed in %(duration).1fs: %(created)s tenders created, '
+                             '%(updated)s updated.') % totals,
+                'sticky': False,
+            }
+        }
+    
+    def action_reset_sync_cursor(self):
+        """Forget the sync cursor so that the next sync fetches everything"""
+        self.write({
+            'sync_cursor_date': False,
+            'sync_cursor_bid_id': False,
+        })
+    
+    def _get_sync_batch_size(self):
+        """Number of tenders created or updated per ORM batch"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return max(int(ICP.get_param('tender_management.gem_sync_batch_size', 500)), 1)
+    
+    def _create_update_tenders(self, tenders_data, defaults=None, replay=False):
+        """Create or update tenders from GeM data in batches
+        
+        Existing tenders are looked up once for the whole payload, new
+        tenders are created with one ``create()`` per chunk and updates
+        sharing the same values are grouped into a single ``write()``.
+        Tenders whose payload fingerprint is unchanged are left untouched
+        and only the fields that differ are written on the others.
+        
+        :param tenders_data: list of GeM tender payloads
+        :param defaults: values of the created tenders not coming from GeM
+        :param replay: payloads come from the journal, apply them even when
+                       their fingerprint is unchanged and skip documents
+        :return: dict with ``created``, ``updated``, ``unchanged`` and
+                 ``skipped`` counts, the number of ``writes`` and of
+                 ``tracking_values`` generated, and the per-chunk
+                 statistics under ``chunks``
+        """
+        self.ensure_one()
+        stats = {
+            'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0,
+            'writes': 0, 'tracking_values': 0, 'chunks': [],
+        }
         if not tenders_data or not isinstance(tenders_data, list):
-            return
+            return stats
         
+        # Index payloads by bid ID, the last occurrence of a duplicate wins
+        payloads = {}
         for tender_data in tenders_data:
-            gem_bid_id = tender_data.get('bidId')
+            gem_bid_id = tender_data.get('bidId') if isinstance(tender_data, dict) else None
             if not gem_bid_id:
+                stats['skipped'] += 1
                 continue
+            if gem_bid_id in payloads:
+                stats['skipped'] += 1
+            payloads[gem_bid_id] = tender_data
+        
+        Tender = self.env['tender.tender']
+        existing = {
+            tender.gem_bid_id: tender
+            for tender in Tender.search([
+                ('gem_portal_id', '=', self.id),
+                ('gem_bid_id', 'in', list(payloads)),
+            ])
+        }
+        
+        bid_ids = list(payloads)
+        batch_size = self._get_sync_batch_size()
+        for start in range(0, len(bid_ids), batch_size):
+            chunk_start = time.perf_counter()
+            chunk = bid_ids[start:start + batch_size]
             
-            # Check if tender already exists
-            existing_tender = self.env['tender.tender'].search([
-                ('gem_bid_id', '=', gem_bid_id),
-                ('gem_portal_id', '=', self.id)
-            ], limit=1)
+            create_vals_list = []
+            create_bid_ids = []
+            changed_bid_ids = []
+            fingerprints = {}
+            tracking_values = 0
+            write_groups = defaultdict(list)
+            for gem_bid_id in chunk:
+                data = payloads[gem_bid_id]
+                fingerprint = self._gem_payload_fingerprint(data)
+                tender = existing.get(gem_bid_id)
+                if not tender:
+                    vals = dict(self._prepare_new_tender_vals(gem_bid_id, data), **(defaults or {}))
+                    vals['gem_payload_hash'] = fingerprint
+                    create_vals_list.append(vals)
+                    create_bid_ids.append(gem_bid_id)
+                    continue
+                if tender.gem_payload_hash == fingerprint and not replay:
+                    continue
+                changed_bid_ids.append(gem_bid_id)
+                fingerprints[tender.id] = fingerprint
+                vals = tender._get_changed_vals(self._prepare_tender_vals_from_gem(data))
+                if vals:
+                    write_groups[tuple(sorted(vals.items()))].append(tender.id)
+                    tracking_values += tender._count_tracked_vals(vals)
             
-            if existing_tender:
-                # Update existing tender
-                self._update_tender_from_gem_data(existing_tender, tender_data)
-            else:
-                # Create new tender
-                new_tender = self.env['tender.tender'].create({
-                    'name': f"GeM-{gem_bid_id}",
-                    'title': tender_data.get('title', ''),
-                    'description': tender_data.get('description', ''),
-                    'submission_date': datetime.strptime(tender_data.get('submissionDate'), '%Y-%m-%dT%H:%M:%S') if tender_data.get('submissionDate') else False,
-                    'publication_date': datetime.strptime(tender_data.get('publicationDate'), '%Y-%m-%dT%H:%M:%S') if tender_data.get('publicationDate') else False,
-                    'tender_value': float(tender_data.get('estimatedValue', 0.0)),
-                    'issuing_authority': tender_data.get('issuingAuthority', ''),
-                    'source_url': tender_data.get('sourceUrl', ''),
-                    'tender_type': 'gem',
-                    'gem_portal_id': self.id,
-                    'gem_bid_id': gem_bid_id,
-                    'state': 'draft'
-                })
-                
-                # Update with full data
-                self._update_tender_from_gem_data(new_tender, tender_data)
+            # A freshly imported tender has no history worth tracking
+            created = Tender.with_context(tracking_disable=True).create(create_vals_list)
+            chunk_tenders = dict(zip(create_bid_ids, created))
+            for frozen_vals, tender_ids in write_groups.items():
+                Tender.browse(tender_ids).write(dict(frozen_vals))
+            self._store_payload_fingerprints(fingerprints)
+            chunk_tenders.update({bid: existing[bid] for bid in changed_bid_ids})
+            
+            if not replay:
+                self.env['gem.payload.journal']._append(
+                    self, [payloads[bid] for bid in create_bid_ids + changed_bid_ids]
+                )
+                # Documents of unchanged payloads are already in sync
+                self._sync_tender_documents([
+                    (chunk_tenders[bid], payloads[bid]) for bid in create_bid_ids + changed_bid_ids
+                ])
+            
+            chunk_stats = {
+                'size': len(chunk),
+                'created': len(created),
+                'updated': len(changed_bid_ids),
+                'unchanged': len(chunk) - len(created) - len(changed_bid_ids),
+                'writes': len(write_groups),
+                'tracking_values': tracking_values,
+                'duration': time.perf_counter() - chunk_start,
+            }
+            stats['chunks'].append(chunk_stats)
+            for key in ('created', 'updated', 'unchanged', 'writes', 'tracking_values'):
+                stats[key] += chunk_stats[key]
+            _logger.info(
+                "GeM Portal %s: synced chunk of %s tenders (%s created, %s updated, %s unchanged, "
+                "%s writes, %s tracking values) in %.3fs",
+                self.name, chunk_stats['size'], chunk_stats['created'], chunk_stats['updated'],
+                chunk_stats['unchanged'], chunk_stats['writes'], chunk_stats['tracking_values'],
+                chunk_stats['duration']
+            )
+        
+        return stats
+    
+    def _gem_payload_from_search(self, tender):
+        """Convert a tender of the client search API to a GeM sync payload"""
+        payload = {
+            'bidId': tender.get('gem_bid_id'),
+            'title': tender.get('name') or '',
+            'issuingAuthority': tender.get('organization_name') or '',
+            'estimatedValue': tender.get('estimated_value') or 0.0,
+        }
+        if tender.get('submission_date'):
+            payload['publicationDate'] = tender['submission_date'].strftime('%Y-%m-%dT%H:%M:%S')
+        if tender.get('closing_date'):
+            payload['submissionDate'] = tender['closing_date'].strftime('%Y-%m-%dT%H:%M:%S')
+        return payload
+    
+    def _import_tenders(self, import_all=False, date_filter=None, department_id=False, user_id=False):
+        """Import the tenders matching a search on the GeM Portal
+        
+        Search results are streamed page by page and upserted in chunks of
+        ``_get_sync_batch_size()`` tenders, each committed on its own so
+        memory stays flat whatever the number of results.
+        
+        :param import_all: import closed tenders as well as active ones
+        :param date_filter: dict with optional ``from_date`` and ``to_date``
+        :param department_id: department of the created tenders
+        :param user_id: responsible of the created tenders
+        :return: dict with ``created``, ``updated``, ``unchanged``,
+                 ``skipped`` and ``errors`` counts and ``error_details``
+        """
+        self.ensure_one()
+        filters = {}
+        if not import_all:
+            filters['status'] = 'ACTIVE'
+        for key in ('from_date', 'to_date'):
+            if (date_filter or {}).get(key):
+                filters[key] = fields.Date.to_string(date_filter[key])
+        defaults = {}
+        if department_id:
+            defaults['department_id'] = department_id
+        if user_id:
+            defaults['user_id'] = user_id
+        
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        batch_size = self._get_sync_batch_size()
+        result = {'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0, 'errors': 0, 'error_details': []}
+        
+        def import_chunk(chunk):
+            stats = self._create_update_tenders(chunk, defaults=defaults)
+            for key in ('created', 'updated', 'unchanged', 'skipped'):
+                result[key] += stats[key]
+            if auto_commit:
+                self.env.cr.commit()
+            # Drop the records of the committed chunk from the cache
+            self.env.invalidate_all()
+        
+        chunk = []
+        client = GemAPIClient(self.env, portal=self)
+        try:
+            for tender in client.iter_tenders(filters, page_size=self._get_sync_page_size()):
+                payload = self._gem_payload_from_search(tender)
+                if not payload['bidId'] or not payload.get('submissionDate'):
+                    result['errors'] += 1
+                    result['error_details'].append(
+                        _("Tender %s has no bid ID or submission deadline") % (payload['bidId'] or payload['title'])
+                    )
+                    continue
+                chunk.append(payload)
+                if len(chunk) >= batch_size:
+                    import_chunk(chunk)
+                    chunk = []
+            if chunk:
+                import_chunk(chunk)
+        except Exception as e:
+            if auto_commit:
+                self.env.cr.rollback()
+            _logger.error("Error importing tenders from GeM Portal %s: %s", self.name, str(e))
+            result['errors'] += 1
+            result['error_details'].append(str(e))
+        
+        _logger.info(
+            "GeM Portal %s: imported %s new and %s updated tenders (%s unchanged, %s errors)",
+            self.name, result['created'], result['updated'], result['unchanged'], result['errors']
+        )
+        return result
+
+
+class GemPortalHealth(models.Model):
+    _name = 'gem.portal.health'
+    _description = 'GeM Portal API Health'
+    
+    portal_id = fields.Many2one('gem.portal', string='GeM Portal', required=True, ondelete='cascade')
+    request_count = fields.Integer(string='Requests', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    circuit_open_until = fields.Datetime(string='Circuit Open Until', readonly=True)
+    last_error = fields.Char(string='Last Error', readonly=True)
+    last_error_date = fields.Datetime(string='Last Error On', readonly=True)
+    token = fields.Char(string='Access Token', readonly=True, groups="tender_management.group_tender_admin")
+    token_expiry = fields.Datetime(string='Token Expiry', readonly=True)
+    auth_call_count = fields.Integer(string='Authentications', readonly=True)
+    auth_count_since = fields.Datetime(string='Counting Since', readonly=True)
+    
+    _sql_constraints = [
+        ('portal_uniq', 'unique(portal_id)', 'A GeM portal has a single health record.'),
+    ]
 
 
 class GemBid(models.Model):
@@ -404,6 +1435,7 @@ class GemBid(models.Model):
     # Dates
     submission_date = fields.Datetime(string='Submission Date')
     award_date = fields.Datetime(string='Award Date')
+    status_checked_at = fields.Datetime(string='Status Checked On', readonly=True, copy=False, index=True)
     
     # Documents
     document_ids = fields.One2many('tender.document', 'gem_bid_id', string='Bid Documents')
@@ -422,6 +1454,25 @@ class GemBid(models.Model):
         if not token:
             raise UserError(_("Failed to authenticate with GeM Portal"))
         
+        # Documents are uploaded first, a failed upload is resumed on the
+        # next submission
+        failed = self._upload_documents(token)
+        if failed:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Upload Incomplete'),
+                    'message': _('%(count)s documents could not be uploaded to GeM Portal (%(errors)s). '
+                                 'Submit the bid again to resume.') % {
+                        'count': len(failed),
+                        'errors': ', '.join(f"{document.name}: {error}" for document, error in failed),
+                    },
+                    'type': 'warning',
+                    'sticky': True,
+                }
+            }
+        
         try:
             # Prepare bid data
             bid_data = self._prepare_bid_data()
@@ -432,7 +1483,8 @@ class GemBid(models.Model):
                 'Authorization': f"Bearer {token['access_token']}"
             }
             
-            response = requests.post(
+            response = self.gem_portal_id._gem_request(
+                'POST',
                 f"{self.gem_portal_id.api_endpoint}/bids",
                 headers=headers,
                 data=json.dumps(bid_data),
@@ -467,15 +1519,66 @@ class GemBid(models.Model):
         except Exception as e:
             raise UserError(_("Error submitting bid: %s") % str(e))
     
+    def _upload_documents(self, token):
+        """Upload the bid documents not yet on GeM
+        
+        Files are streamed from the filestore, in chunks through resumable
+        upload sessions when the portal supports them. The session of an
+        interrupted upload is kept on the document to resume it later.
+        
+        :param token: GeM access token
+        :return: list of ``(document, error)`` of the failed uploads
+        """
+        self.ensure_one()
+        portal = self.gem_portal_id
+        documents = self.document_ids.filtered(lambda doc: not doc.gem_document_id)
+        if not documents:
+            return []
+        
+        uploader = portal._get_document_uploader(token)
+        failed = []
+        for document in documents:
+            attachment = document._get_file_attachment()
+            form_fields = {
+                'bid_id': self.bid_id,
+                'document_type': self._reverse_map_document_type(document.document_type),
+                'description': document.description or '',
+            }
+            progress = {'upload_id': document.gem_upload_id}
+            try:
+                with document._file_path() as path:
+                    if portal.chunked_upload_supported:
+                        result = uploader.upload_resumable(
+                            path, document.file_name or document.name, attachment.mimetype, form_fields,
+                            upload_id=document.gem_upload_id,
+                            on_progress=lambda upload_id, offset: progress.update(upload_id=upload_id),
+                        )
+                    else:
+                        result = uploader.upload(path, document.file_name or document.name, attachment.mimetype, form_fields)
+            except Exception as e:
+                _logger.error("Failed to upload document %s to GeM Portal: %s", document.name, str(e))
+                document.write({'gem_upload_id': progress['upload_id'] or False})
+                failed.append((document, str(e)))
+                continue
+            document.write({
+                'gem_document_id': result.get('documentId') or result.get('id'),
+                'gem_upload_id': False,
+            })
+        portal._flush_api_health()
+        return failed
+    
     def _prepare_bid_data(self):
-        """Prepare bid data for GeM submission"""
-        # Get documents to attach
+        """Prepare bid data for GeM submission
+        
+        Documents are referenced by the ID GeM returned for their upload,
+        their content is never inlined in the submission.
+        """
         documents = []
         for doc in self.document_ids:
             doc_data = {
                 'name': doc.name,
                 'type': self._reverse_map_document_type(doc.document_type),
-                'content': doc.file.decode('utf-8') if doc.file else None
+                'documentId': doc.gem_document_id or None,
             }
             documents.append(doc_data)
         
@@ -489,17 +1592,7 @@ class GemBid(models.Model):
     
     def _reverse_map_document_type(self, odoo_type):
         """Map Odoo document type to GeM document type"""
-        mapping = {
-            'tender_notice': 'TENDER_NOTICE',
-            'technical_specification': 'TECHNICAL_SPECIFICATION',
-            'financial_specification': 'FINANCIAL_SPECIFICATION',
-            'corrigendum': 'CORRIGENDUM',
-            'pre_bid_query': 'PRE_BID_QUERY',
-            'bid_document': 'BID_DOCUMENT',
-            'submission': 'SUBMISSION',
-            'other': 'OTHER'
-        }
-        return mapping.get(odoo_type, 'OTHER')
+        return self.env['gem.portal']._get_gem_reference_data().gem_document_type(odoo_type)
     
     def action_check_status(self):
         """Check bid status from GeM Portal"""
@@ -517,7 +1610,8 @@ class GemBid(models.Model):
                 'Authorization': f"Bearer {token['access_token']}"
             }
             
-            response = requests.get(
+            response = self.gem_portal_id._gem_request(
+                'GET',
                 f"{self.gem_portal_id.api_endpoint}/bids/{self.bid_id}/status",
                 headers=headers,
                 timeout=15
@@ -546,7 +1640,10 @@ class GemBid(models.Model):
         """Update bid status from GeM data"""
         if not status_data:
             return
-        
+        self._apply_gem_statuses({self.bid_id: status_data})
+    
+    def _prepare_status_vals(self, status_data):
+        """Prepare bid values from GeM status data"""
         # Map GeM status to Odoo status
         status_mapping = {
             'DRAFT': 'draft',
@@ -570,26 +1667,94 @@ class GemBid(models.Model):
         if odoo_status == 'awarded' and status_data.get('awardDate'):
             values['award_date'] = datetime.strptime(status_data.get('awardDate'), '%Y-%m-%dT%H:%M:%S')
         
-        self.write(values)
+        return values
+    
+    def _apply_gem_statuses(self, statuses):
+        """Update bids from GeM status data, grouping identical updates
+        
+        Bids missing from ``statuses`` are left untouched, bids whose status
+        could not be fetched are only marked as checked.
+        
+        :param statuses: dict of status data by GeM bid ID
+        :return: number of ``write()`` calls
+        """
+        now = fields.Datetime.now()
+        write_groups = defaultdict(list)
+        updated = self.browse()
+        for bid in self:
+            status_data = statuses.get(bid.bid_id)
+            if not status_data:
+                continue
+            values = {'status_checked_at': now}
+            if 'error' in status_data:
+                _logger.error("Error updating bid status for bid %s: %s", bid.name, status_data['error'])
+            else:
+                values.update(bid._prepare_status_vals(status_data))
+                updated |= bid
+            write_groups[tuple(sorted(values.items()))].append(bid.id)
+        
+        for frozen_values, bid_ids in write_groups.items():
+            self.browse(bid_ids).write(dict(frozen_values))
         
         # Update tender status
-        if odoo_status == 'awarded' and self.tender_id.state != 'awarded':
-            self.tender_id.action_mark_awarded()
-        elif odoo_status == 'rejected' and self.tender_id.state != 'rejected':
-            self.tender_id.action_mark_rejected()
+        for bid in updated:
+            if bid.state == 'awarded' and bid.tender_id.state != 'awarded':
+                bid.tender_id.action_mark_awarded()
+            elif bid.state == 'rejected' and bid.tender_id.state != 'rejected':
+                bid.tender_id.action_mark_rejected()
+        return len(write_groups)
     
     @api.model
     def _cron_update_gem_bid_status(self):
-        """Cron job to update GeM bid statuses"""
+        """Cron job to update GeM bid statuses
+        
+        Statuses are polled concurrently under the rate limit of each portal
+        and committed per batch. The bids checked least recently come first,
+        so a run stopped by its time budget resumes on the next one.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        budget = float(ICP.get_param('tender_management.gem_status_poll_budget', 600))
+        batch_size = max(int(ICP.get_param('tender_management.gem_status_batch_size', 200)), 1)
+        deadline = time.monotonic() + budget
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        
         # Find bids with submitted state
         bids = self.search([
             ('state', 'in', ['submitted', 'under_evaluation']),
             ('gem_portal_id', '!=', False),
             ('bid_id', '!=', False)
-        ])
+        ], order='status_checked_at asc nulls first, id')
         
-        for bid in bids:
-            try:
-                bid.action_check_status()
-            except Exception as e:
-                _logger.error("Error updating bid status for bid %s: %s", bid.name, str(e))
+        pollers = {}
+        stats = {'polled': 0, 'writes': 0, 'batches': 0}
+        for start in range(0, len(bids), batch_size):
+            if time.monotonic() >= deadline:
+                break
+            batch = bids[start:start + batch_size]
+            for portal, portal_bids in batch.grouped('gem_portal_id').items():
+                if portal._get_circuit_breaker().is_open():
+                    continue
+                try:
+                    if portal.id not in pollers:
+                        token = portal._get_token()
+                        pollers[portal.id] = token and portal._get_status_poller(token)
+                    if not pollers[portal.id]:
+                        _logger.error("Failed to authenticate with GeM Portal %s to check bid status", portal.name)
+                        continue
+                    statuses = pollers[portal.id].poll(portal_bids.mapped('bid_id'), deadline)
+                    portal._flush_api_health()
+                    stats['writes'] += portal_bids._apply_gem_statuses(statuses)
+                    stats['polled'] += len(statuses)
+                    if auto_commit:
+                        self.env.cr.commit()
+                except Exception as e:
+                    if auto_commit:
+                        self.env.cr.rollback()
+                    _logger.error("Error updating bid statuses from GeM Portal %s: %s", portal.name, str(e))
+            stats['batches'] += 1
+        
+        _logger.info(
+            "GeM bid status update polled %s of %s bids in %s batches with %s writes",
+            stats['polled'], len(bids), stats['batches'], stats['writes']
+        )
+        return stats
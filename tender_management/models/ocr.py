@@ -1,20 +1,29 @@
 # models/ocr.py
 import base64
+import functools
+import json
 import logging
-import tempfile
+import threading
+import time
 import os
-from datetime import datetime
-import re
+from datetime import timedelta
+import psycopg2
 import PyPDF2
 import pytesseract
-from PIL import Image
-import io
+from PIL import Image, UnidentifiedImageError
+from PyPDF2.errors import PdfReadError
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
 
+from ..external.ocr_service import content_html, field_extraction, image_preprocess, ocr_parallel, ocr_stream, page_classifier
+
 _logger = logging.getLogger(__name__)
 
+# Provider of the OCR results cached by the local engine
+OCR_PROVIDER = 'tesseract'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif')
+
 class TenderOCR(models.Model):
     _name = 'tender.ocr'
     _description = 'Tender OCR Processing'
@@ -25,8 +34,18 @@ class TenderOCR(models.Model):
     tender_id = fields.Many2one('tender.tender', string='Tender', required=True, ondelete='cascade')
     
     # OCR Content
-    content = fields.Text(string='OCR Content')
-    content_html = fields.Html(string='Formatted Content', compute='_compute_content_html', store=True)
+    # Not prefetched: forms display a single rendered page, not the whole content
+    content = fields.Text(string='OCR Content', prefetch=False)
+    content_html = fields.Html(string='Formatted Content', compute='_compute_content_html', sanitize=False,
+                               help="Displayed page of the content, with the key information highlighted")
+    content_html_data = fields.Binary(string='Rendered Content', attachment=True, readonly=True, copy=False,
+                                      help="Compressed HTML of the content pages, rendered once at completion")
+    content_html_index = fields.Text(string='Rendered Pages (JSON)', readonly=True, copy=False,
+                                     help="Document page, offset and length of each rendered page")
+    content_page = fields.Integer(string='Displayed Page', compute='_compute_content_html',
+                                  help="Page of the content displayed by the form, passed in the context")
+    content_page_count = fields.Integer(string='Displayed Pages', compute='_compute_content_html')
+    content_page_label = fields.Char(string='Page', compute='_compute_content_html')
     
     # Extracted Data
     extracted_data = fields.Text(string='Extracted Data')
@@ -35,6 +54,7 @@ class TenderOCR(models.Model):
     # Processing Status
     state = fields.Selection([
         ('draft', 'Draft'),
+        ('queued', 'Queued'),
         ('processing', 'Processing'),
         ('done', 'Completed'),
         ('failed', 'Failed')
@@ -42,6 +62,43 @@ class TenderOCR(models.Model):
     processing_date = fields.Datetime(string='Processing Date')
     completion_date = fields.Datetime(string='Completion Date')
     
+    # Job Queue
+    priority = fields.Selection([
+        ('0', 'Normal'),
+        ('1', 'Urgent'),
+    ], string='Priority', default='0',
+        help="Urgent jobs run first, then jobs of the tenders closing first")
+    queue_date = fields.Datetime(string='Queued On', readonly=True, copy=False)
+    attempt_count = fields.Integer(string='Attempts', readonly=True, copy=False)
+    next_attempt_date = fields.Datetime(string='Next Attempt', readonly=True, copy=False, index=True)
+    progress = fields.Float(string='Progress', readonly=True, copy=False, help="Percentage of the job done")
+    progress_message = fields.Char(string='Progress Details', readonly=True, copy=False)
+    heartbeat_date = fields.Datetime(string='Last Heartbeat', readonly=True, copy=False,
+                                     help="Last progress reported by the worker running the job")
+    peak_memory = fields.Float(string='Peak Memory (MiB)', readonly=True, copy=False,
+                               help="Peak resident memory of the worker while it read the document")
+    
+    # OCR Cache
+    file_hash = fields.Char(string='File SHA-256', readonly=True, copy=False, index=True)
+    cache_id = fields.Many2one('tender.ocr.cache', string='Cached Result', readonly=True, copy=False,
+                               ondelete='set null')
+    cache_hit = fields.Boolean(string='Served from Cache', readonly=True, copy=False)
+    skip_cache = fields.Boolean(string='Bypass OCR Cache', copy=False,
+                                help="OCR the document again instead of reusing the result cached for "
+                                     "the same file, the cache is refreshed with the new result")
+    refresh_cache = fields.Boolean(string='Refresh OCR Cache', readonly=True, copy=False,
+                                   help="Bypass the OCR cache for the next run only, set when reprocessing")
+    
+    # PDF Page Decisions
+    page_decisions_json = fields.Text(string='Page Decisions (JSON)', readonly=True, copy=False,
+                                      help="How the text of each page was read: text layer, OCR or both, "
+                                           "with the measures the decision was based on")
+    page_count = fields.Integer(string='Pages', readonly=True, copy=False)
+    ocr_page_count = fields.Integer(string='Pages OCRed', readonly=True, copy=False)
+    
+    # Page Results, the content and confidence of the document are aggregated from them
+    page_ids = fields.One2many('tender.ocr.page', 'ocr_id', string='Page Results', copy=False)
+    
     # Error Handling
     error_message = fields.Text(string='Error Message')
     
@@ -65,238 +122,836 @@ class TenderOCR(models.Model):
             else:
                 record.name = f"New OCR Processing ({record.state})"
     
-    @api.depends('content')
+    @api.depends('content', 'content_html_index')
+    @api.depends_context('content_page')
     def _compute_content_html(self):
+        for record in self:
+            page = record._get_content_html_page(self.env.context.get('content_page', 1))
+            record.content_page = page['position']
+            record.content_html = page['html'] or False
+            record.content_page_count = page['page_count']
+            record.content_page_label = page['label'] or False
+    
+    def _get_content_html_page(self, position):
+        """Rendered page of the content
+        
+        The pages are rendered and compressed at completion: a single block
+        is read and decompressed, whatever the size of the document.
+        
+        :param position: 1-based number of the displayed page, clamped to the pages
+        :return: dict with the ``position``, ``page_count``, document ``page``,
+                 ``label`` and ``html`` of the page
+        """
+        self.ensure_one()
+        index = json.loads(self.content_html_index or '[]')
+        data = None
+        if not index and self.content:
+            # Content not rendered yet, e.g. OCRed before the pages were stored
+            data, index = content_html.pack_pages(self.content, self._get_pages())
+        if not index:
+            return {'position': 0, 'page_count': 0, 'page': 0, 'label': '', 'html': ''}
+        position = min(max(position or 1, 1), len(index))
+        page, offset, length = index[position - 1]
+        block = data[offset:offset + length] if data is not None else self._read_content_html_block(offset, length)
+        return {
+            'position': position,
+            'page_count': len(index),
+            'page': page,
+            'label': _("%(position)s / %(count)s (document page %(page)s)") % {
+                'position': position, 'count': len(index), 'page': page,
+            },
+            'html': f'<div style="font-family: monospace;">{content_html.unpack_page(block)}</div>',
+        }
+    
+    def _render_content_html(self):
+        """Render the pages of the content with the key information highlighted
+        
+        Each page is compressed on its own and stored in the filestore, the
+        index keeps the offset of every page so one can be read without the
+        others.
+        """
         for record in self:
             if not record.content:
-                record.content_html = False
+                record.write({'content_html_data': False, 'content_html_index': False})
                 continue
-            
-            # Convert plain text to HTML with basic formatting
-            html_content = record.content.replace('\n', '<br/>')
-            
-            # Highlight key information
-            patterns = {
-                r'\b(deadline|submission date|closing date)\b': '<span style="background-color: #FFFF00;">\\1</span>',
-                r'\b(estimated value|tender value|budget|cost)\b': '<span style="background-color: #AAFFAA;">\\1</span>',
-                r'\b(tender number|tender id|reference number)\b': '<span style="background-color: #AAAAFF;">\\1</span>',
-                r'\b(issuing authority|issuer|department|ministry)\b': '<span style="background-color: #FFAAAA;">\\1</span>'
-            }
-            
-            for pattern, replacement in patterns.items():
-                html_content = re.sub(pattern, replacement, html_content, flags=re.IGNORECASE)
-            
-            record.content_html = f'<div style="font-family: monospace;">{html_content}</div>'
+            data, index = content_html.pack_pages(record.content, record._get_pages())
+            record.write({
+                'content_html_data': base64.b64encode(data),
+                'content_html_index': json.dumps(index),
+            })
     
-    def action_process(self):
-        """Process document with OCR"""
+    def _read_content_html_block(self, offset, length):
+        """Bytes of a rendered page, read from the filestore when possible"""
+        self.ensure_one()
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'content_html_data'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if attachment.store_fname:
+            with open(attachment._full_path(attachment.store_fname), 'rb') as f:
+                f.seek(offset)
+                return f.read(length)
+        return attachment.raw[offset:offset + length]
+    
+    def action_content_previous_page(self):
+        """Display the previous page of the content"""
         self.ensure_one()
+        return self._action_show_content_page(self.content_page - 1)
+    
+    def action_content_next_page(self):
+        """Display the next page of the content"""
+        self.ensure_one()
+        return self._action_show_content_page(self.content_page + 1)
+    
+    def _action_show_content_page(self, position):
+        """Reopen the form on a page of the content
+        
+        The displayed page only lives in the context of the action, browsing
+        the content never writes the record.
+        """
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'current',
+            'context': dict(self.env.context, content_page=min(max(position, 1), max(self.content_page_count, 1))),
+        }
+    
+    def action_process(self):
+        """Queue the document for OCR processing
         
-        if self.state != 'draft':
+        Documents already OCRed with the same engine settings are completed
+        at once from the OCR cache. The others are OCRed in the background
+        on the queue workers, the progress of the job is reported on the
+        record.
+        """
+        if any(record.state != 'draft' for record in self):
             raise UserError(_("This document has already been processed"))
         
-        # Update state and processing date
+        cached = self.filtered(lambda record: record._process_from_cache())
+        (self - cached)._queue()
+    
+    def action_reprocess(self):
+        """Process the document again, reading only the pages that changed
+        since the last run and the pages flagged to reprocess"""
+        if any(record.state not in ('done', 'failed') for record in self):
+            raise UserError(_("Only processed documents can be reprocessed"))
+        self._queue_reprocess()
+    
+    def action_reprocess_low_confidence(self):
+        """Read again the pages read with a low confidence, e.g. after tuning
+        the OCR engine, the other pages are kept"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        threshold = float(ICP.get_param('tender_management.ocr_page_min_confidence', 60))
+        pages = self.page_ids.filtered(lambda page: page.confidence < threshold)
+        if not pages:
+            raise UserError(_("No page was read with a confidence below %s%%") % threshold)
+        pages.action_reprocess()
+    
+    def _queue(self):
+        """Put the jobs in the OCR queue and wake the workers up"""
+        if not self:
+            return
+        self.write({
+            'state': 'queued',
+            'queue_date': fields.Datetime.now(),
+            'attempt_count': 0,
+            'next_attempt_date': False,
+            'progress': 0.0,
+            'progress_message': _("Waiting for an OCR worker"),
+            'error_message': False,
+        })
+        self._trigger_ocr_queue()
+    
+    def _queue_reprocess(self):
+        """Queue processed documents again
+        
+        The OCR cache is bypassed, and refreshed with the new result. Pages
+        whose hash did not change and that are not flagged to reprocess are
+        kept as they are, see ``_get_reusable_pages``.
+        """
+        self.write({'refresh_cache': True})
+        self._queue()
+    
+    @api.model
+    def _get_queue_worker_crons(self):
+        """Scheduled actions running the OCR queue workers"""
+        return self.env['ir.cron'].sudo().with_context(active_test=False).search([
+            ('model_id', '=', self.env['ir.model']._get_id(self._name)),
+            ('code', '=', 'model._cron_process_ocr_queue()'),
+        ], order='id')
+    
+    @api.model
+    def _ensure_queue_workers(self):
+        """Align the OCR queue workers with the configured number of workers
+        
+        Each worker is a scheduled action, so jobs run in parallel on up to
+        as many cron threads as there are workers.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        count = max(int(ICP.get_param('tender_management.ocr_queue_workers', 2)), 1)
+        crons = self._get_queue_worker_crons()
+        for index in range(len(crons), count):
+            crons |= self.env['ir.cron'].sudo().create({
+                'name': _("OCR: Queue Worker %s") % (index + 1),
+                'model_id': self.env['ir.model']._get_id(self._name),
+                'state': 'code',
+                'code': 'model._cron_process_ocr_queue()',
+                'interval_number': 1,
+                'interval_type': 'hours',
+                'numbercall': -1,
+                'doall': False,
+                'user_id': self.env.ref('base.user_root').id,
+            })
+        crons[:count].filtered(lambda cron: not cron.active).write({'active': True})
+        crons[count:].filtered('active').write({'active': False})
+        return crons[:count]
+    
+    @api.model
+    def _trigger_ocr_queue(self):
+        """Wake the OCR queue workers up"""
+        for cron in self._ensure_queue_workers():
+            cron._trigger()
+    
+    @api.model
+    def _cron_dispatch_ocr_queue(self):
+        """Cron job waking the workers up while jobs are waiting"""
+        if self.search_count([('state', 'in', ('queued', 'processing'))]):
+            self._trigger_ocr_queue()
+    
+    @api.model
+    def _claim_ocr_job(self):
+        """Lock the next OCR job to run, skipping jobs locked by other workers
+        
+        Jobs run by order of priority, then of the submission deadline of
+        their tender. Processing jobs whose worker has not reported any
+        progress for longer than the heartbeat timeout are claimed again,
+        however long they have been running.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        now = fields.Datetime.now()
+        timeout = int(ICP.get_param('tender_management.ocr_heartbeat_timeout', 600))
+        self.flush_model(['state', 'next_attempt_date', 'processing_date', 'heartbeat_date', 'priority', 'tender_id'])
+        self.env['tender.tender'].flush_model(['submission_date'])
+        self.env.cr.execute("""
+            SELECT ocr.id
+              FROM tender_ocr ocr
+         LEFT JOIN tender_tender tender ON tender.id = ocr.tender_id
+             WHERE (ocr.state = 'queued' AND (ocr.next_attempt_date IS NULL OR ocr.next_attempt_date <= %s))
+                OR (ocr.state = 'processing' AND COALESCE(ocr.heartbeat_date, ocr.processing_date) < %s)
+          ORDER BY ocr.priority DESC, tender.submission_date ASC NULLS LAST, ocr.id
+             LIMIT 1
+               FOR UPDATE OF ocr SKIP LOCKED
+        """, (now, now - timedelta(seconds=timeout)))
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+    
+    @api.model
+    def _cron_process_ocr_queue(self):
+        """OCR queue worker, run by the queue worker scheduled actions
+        
+        Jobs are claimed one at a time until the queue is empty or the
+        worker time budget is spent. Each job is committed on its own.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        deadline = time.monotonic() + int(ICP.get_param('tender_management.ocr_queue_time_budget', 900))
+        processed = 0
+        while time.monotonic() < deadline:
+            try:
+                job = self._claim_ocr_job()
+            except psycopg2.errors.SerializationFailure:
+                # The job was updated by another worker since this
+                # transaction started, look again in a new one
+                if not auto_commit:
+                    raise
+                self.env.cr.rollback()
+                continue
+            if not job:
+                break
+            job._run_ocr_job()
+            processed += 1
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+        if processed:
+            _logger.info("OCR queue worker processed %s jobs", processed)
+        return processed
+    
+    def _report_progress(self, progress, message=None):
+        """Record the progress of the running job, visible to the polling UI
+        
+        Progress reports are the heartbeat of the job, see ``_claim_ocr_job``.
+        """
+        self.ensure_one()
+        self.write({
+            'progress': min(max(progress, 0.0), 100.0),
+            'progress_message': message or False,
+            'heartbeat_date': fields.Datetime.now(),
+        })
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+    
+    def _run_ocr_job(self):
+        """Run a claimed OCR job
+        
+        Unexpected errors are retried with an exponential backoff until the
+        maximum number of attempts, user errors fail the job immediately.
+        """
+        self.ensure_one()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        ICP = self.env['ir.config_parameter'].sudo()
         self.write({
             'state': 'processing',
-            'processing_date': fields.Datetime.now()
+            'processing_date': fields.Datetime.now(),
+            'attempt_count': self.attempt_count + 1,
         })
+        self._report_progress(0.0, _("Reading document"))
         
         try:
-            # Process document
-            self._process_document()
-            
-            # Extract key information
-            self._extract_key_information()
-            
-            # Update tender with extracted information if confidence is high enough
-            if self.confidence_score >= 75.0:
-                self._update_tender_information()
-            
-            # Update state and completion date
-            self.write({
-                'state': 'done',
-                'completion_date': fields.Datetime.now()
-            })
-            
+            self._process()
         except Exception as e:
-            _logger.error("OCR processing error: %s", str(e))
-            self.write({
-                'state': 'failed',
-                'error_message': str(e),
-                'completion_date': fields.Datetime.now()
-            })
+            if auto_commit:
+                self.env.cr.rollback()
+            max_attempts = int(ICP.get_param('tender_management.ocr_max_attempts', 3))
+            if isinstance(e, UserError) or self.attempt_count >= max_attempts:
+                _logger.error("OCR processing error: %s", str(e))
+                self.write({
+                    'state': 'failed',
+                    'error_message': str(e),
+                    'progress_message': False,
+                    'refresh_cache': False,
+                    'completion_date': fields.Datetime.now()
+                })
+            else:
+                backoff = int(ICP.get_param('tender_management.ocr_retry_backoff', 60))
+                delay = backoff * 2 ** (self.attempt_count - 1)
+                _logger.warning("OCR processing error, retrying in %ss: %s", delay, str(e))
+                self.write({
+                    'state': 'queued',
+                    'error_message': str(e),
+                    'next_attempt_date': fields.Datetime.now() + timedelta(seconds=delay),
+                    'progress_message': _("Retrying after error: %s") % str(e),
+                })
+    
+    def _process(self):
+        """Process document with OCR"""
+        self.ensure_one()
+        # Process document
+        exact = ocr_stream.reset_peak_rss()
+        self._process_document()
+        self.peak_memory = ocr_stream.peak_rss() / 1024 / 1024
+        _logger.info(
+            "OCR of %s: %.1f MiB peak resident memory%s",
+            self.document_id.name, self.peak_memory, "" if exact else " (since the worker started)"
+        )
+        self._report_progress(90.0, _("Extracting key information"))
+        self._complete()
+    
+    def _process_from_cache(self):
+        """Complete the job from the OCR cache
+        
+        :return: whether the document was found in the cache
+        """
+        self.ensure_one()
+        if self._bypass_ocr_cache() or not self.document_id._get_file_attachment():
+            return False
+        entry = self._lookup_ocr_cache(self._get_file_hash())
+        if not entry:
+            return False
+        now = fields.Datetime.now()
+        self.write({'queue_date': now, 'processing_date': now, 'attempt_count': 0})
+        self._apply_ocr_cache(entry)
+        self._complete()
+        return True
+    
+    def _bypass_ocr_cache(self):
+        """Whether the document must be OCRed again instead of read from the cache"""
+        self.ensure_one()
+        return self.skip_cache or self.refresh_cache
+    
+    def _complete(self):
+        """Extract the key information of the OCR content and complete the job"""
+        self.ensure_one()
+        # Extract key information
+        self._extract_key_information()
+        self._render_content_html()
+        
+        # Update tender with extracted information if confidence is high enough
+        if self.confidence_score >= 75.0:
+            self._update_tender_information()
+        
+        # Update state and completion date
+        self.write({
+            'state': 'done',
+            'progress': 100.0,
+            'progress_message': False,
+            'error_message': False,
+            'next_attempt_date': False,
+            'refresh_cache': False,
+            'completion_date': fields.Datetime.now()
+        })
     
     def _process_document(self):
-        """Process document with OCR to extract text"""
-        if not self.document_id or not self.document_id.file:
+        """Process document with OCR to extract text
+        
+        The result is read from the OCR cache when the same file was already
+        OCRed with the same engine settings, and cached otherwise.
+        """
+        if not self.document_id or not self.document_id._get_file_attachment():
             raise UserError(_("No document file available for OCR processing"))
         
-        # Get file data
-        file_data = base64.b64decode(self.document_id.file)
-        file_name = self.document_id.file_name or 'document'
+        file_hash = self._get_file_hash()
+        self.file_hash = file_hash
+        if not self._bypass_ocr_cache():
+            entry = self._lookup_ocr_cache(file_hash)
+            if entry:
+                self._apply_ocr_cache(entry)
+                return
+        
+        # Process based on file type
+        file_type = self._get_file_type()
+        previous = self._get_reusable_pages().get(0)
+        # The file is read in place from the filestore, it is never decoded in memory
+        with self.document_id._file_path() as path:
+            file_size = os.path.getsize(path)
+            if file_type == 'pdf':
+                pages = self._process_pdf(path)
+            elif previous and previous.image_hash == file_hash:
+                pages = [previous._to_page_dict()]
+            elif file_type == 'image':
+                text = self._process_image(path)
+                pages = [{'page': 0, 'text': text, 'confidence': self.confidence_score, 'method': 'ocr',
+                          'engine': self._get_engine_label('ocr'), 'image_hash': file_hash}]
+            else:
+                text = self._process_text(path)
+                pages = [{'page': 0, 'text': text, 'confidence': self.confidence_score, 'method': 'text',
+                          'engine': self._get_engine_label('text'), 'image_hash': file_hash}]
+        self._store_pages(pages)
         
-        # Process based on file extension
-        file_ext = os.path.splitext(file_name)[1].lower() if file_name else ''
+        entry = self.env['tender.ocr.cache']._store(
+            file_hash, OCR_PROVIDER, self._get_ocr_cache_settings(), self.content, self.confidence_score,
+            pages=pages, file_name=self.document_id.file_name, file_size=file_size,
+        )
+        self.write({
+            'cache_id': entry.id,
+            'cache_hit': False,
+        })
+    
+    def _get_file_hash(self):
+        """SHA-256 of the document file, the one recorded on the document
+        or hashed from the filestore without reading the file in memory"""
+        self.ensure_one()
+        if self.document_id.content_hash:
+            return self.document_id.content_hash
+        with self.document_id._file_path() as path:
+            return ocr_stream.hash_file(path)
+    
+    def _store_pages(self, pages):
+        """Store the page results and aggregate them into the document
         
-        if file_ext in ('.pdf', '.PDF'):
-            content = self._process_pdf(file_data)
-        elif file_ext in ('.png', '.jpg', '.jpeg', '.tiff', '.bmp', '.gif'):
-            content = self._process_image(file_data)
+        :param pages: list of page dicts sorted by page, see
+                      ``ocr_parallel.ocr_pdf_page``, with the ``engine``,
+                      ``image_hash`` and ``classification`` of the page.
+                      Pages marked ``reused`` are kept as they are stored.
+        """
+        self.ensure_one()
+        existing = {page.page_index: page for page in self.page_ids}
+        now = fields.Datetime.now()
+        kept = self.env['tender.ocr.page']
+        to_create = []
+        for data in pages:
+            page = existing.get(data['page'])
+            if page and data.get('reused'):
+                kept |= page
+                continue
+            text = data.get('text') or ''
+            vals = {
+                'text': text,
+                'char_count': len(''.join(text.split())),
+                'confidence': data.get('confidence', 0.0),
+                'method': data.get('method') or page_classifier.DECISION_OCR,
+                'engine': data.get('engine'),
+                'image_hash': data.get('image_hash') or False,
+                'classification_json': json.dumps(data['classification']) if data.get('classification') else False,
+                'duration': data.get('duration', 0.0),
+                'processing_date': now,
+                'to_reprocess': False,
+            }
+            if page:
+                page.write(vals)
+                kept |= page
+            else:
+                to_create.append(dict(vals, ocr_id=self.id, page_index=data['page']))
+        (self.page_ids - kept).unlink()
+        if to_create:
+            self.env['tender.ocr.page'].create(to_create)
+        self._aggregate_pages()
+    
+    def _aggregate_pages(self):
+        """Aggregate the stored pages into the content, confidence and page
+        counts of the document"""
+        self.ensure_one()
+        pages = [page._to_page_dict() for page in self.page_ids.sorted('page_index')]
+        if self._get_file_type() == 'pdf':
+            content, confidence = ocr_parallel.merge_pages(pages)
+        elif pages:
+            content, confidence = pages[0]['text'], pages[0]['confidence']
         else:
-            content = self._process_text(file_data)
+            content, confidence = False, 0.0
+        self.write({
+            'content': content,
+            'confidence_score': confidence,
+            'page_count': len(pages),
+            'ocr_page_count': len([page for page in pages if page['method'] != page_classifier.DECISION_TEXT]),
+        })
+    
+    def _get_reusable_pages(self):
+        """Stored pages a new run may keep when their hash did not change
         
-        self.content = content
+        :return: dict of the pages not flagged to reprocess, by zero-based page number
+        """
+        self.ensure_one()
+        return {page.page_index: page for page in self.page_ids if not page.to_reprocess and page.image_hash}
+    
+    def _get_pages(self):
+        """Page metadata with the span of each page text in the content,
+        see ``tender.ocr.cache._page_spans``"""
+        self.ensure_one()
+        if self.page_ids:
+            pages = [page._to_page_dict() for page in self.page_ids.sorted('page_index')]
+            return self.env['tender.ocr.cache']._page_spans(self.content or '', pages)
+        return self.cache_id._get_pages() if self.cache_id else None
+    
+    def _get_engine_label(self, method):
+        """Engine and settings a page read with the given method depends on"""
+        if method == page_classifier.DECISION_TEXT:
+            return 'text layer'
+        ICP = self.env['ir.config_parameter'].sudo()
+        settings = [
+            ICP.get_param('tender_management.ocr_language', ocr_parallel.DEFAULT_LANGUAGE),
+            '%s dpi' % ICP.get_param('tender_management.ocr_dpi', ocr_parallel.DEFAULT_DPI),
+        ]
+        stages = self._get_preprocess_stages()
+        if stages:
+            settings.append('+'.join(stages))
+        label = 'tesseract %s (%s)' % (ocr_parallel.engine_version() or '?', ', '.join(settings))
+        return f'text layer + {label}' if method == page_classifier.DECISION_BOTH else label
+    
+    def _get_file_type(self):
+        """Type of the document file, from its extension: pdf, image or text"""
+        self.ensure_one()
+        file_ext = os.path.splitext(self.document_id.file_name or '')[1].lower()
+        if file_ext == '.pdf':
+            return 'pdf'
+        if file_ext in IMAGE_EXTENSIONS:
+            return 'image'
+        return 'text'
     
-    def _process_pdf(self, file_data):
-        """Process PDF file with OCR"""
-        content = ""
-        confidence = 0
-        pages_processed = 0
+    def _get_ocr_cache_settings(self):
+        """Engine settings the OCR result of the document depends on
         
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(file_data)
-            temp_file_path = temp_file.name
+        They are part of the cache key: changing the language, resolution,
+        image preprocessing or Tesseract version OCRs cached documents again.
+        """
+        self.ensure_one()
+        file_type = self._get_file_type()
+        settings = {'file_type': file_type}
+        if file_type != 'text':
+            ICP = self.env['ir.config_parameter'].sudo()
+            settings.update({
+                'engine': ocr_parallel.engine_version(),
+                'language': ICP.get_param('tender_management.ocr_language', ocr_parallel.DEFAULT_LANGUAGE),
+                'dpi': int(ICP.get_param('tender_management.ocr_dpi', ocr_parallel.DEFAULT_DPI)),
+                'preprocess': ','.join(self._get_preprocess_stages()),
+            })
+        if file_type == 'pdf':
+            settings['classifier'] = page_classifier.CLASSIFIER_VERSION
+        return settings
+    
+    def _lookup_ocr_cache(self, file_hash):
+        """OCR cache entry of the document file, if any"""
+        self.ensure_one()
+        return self.env['tender.ocr.cache']._lookup(file_hash, OCR_PROVIDER, self._get_ocr_cache_settings())
+    
+    def _apply_ocr_cache(self, entry):
+        """Use the OCR result of a cache entry"""
+        self.ensure_one()
+        self.write({
+            'file_hash': entry.file_hash,
+            'cache_id': entry.id,
+            'cache_hit': True,
+        })
+        content = entry.content or ''
+        spans = entry._get_pages()
+        if spans and all(span.get('start') is not None for span in spans):
+            self._store_pages([{
+                'page': span['page'],
+                'text': content[span['start']:span['end']],
+                'confidence': span.get('confidence', 0.0),
+                'method': span.get('method') or page_classifier.DECISION_OCR,
+                'engine': self._get_engine_label(span.get('method')),
+            } for span in spans])
+        else:
+            # Pages of the entry cannot be told apart, keep the document result
+            self.page_ids.unlink()
+            self.write({
+                'content': entry.content,
+                'confidence_score': entry.confidence_score,
+                'page_count': entry.page_count,
+                'ocr_page_count': len([span for span in spans if span.get('method') != 'text']),
+            })
+        _logger.info("OCR of %s served from the cache", self.document_id.name)
+    
+    def _process_pdf(self, path):
+        """Process PDF file with OCR
         
+        Each page is classified to read its embedded text layer, OCR it, or
+        both. The decisions are recorded, a later run on the same file
+        reuses them instead of classifying the pages again. Pages to OCR
+        are processed in parallel by the page engine.
+        
+        Stored pages whose hash did not change are kept as they are, unless
+        flagged to reprocess: a re-run only reads changed and flagged pages.
+        
+        Only empty and unreadable files are user errors, the other errors
+        are left to the queue to retry the job.
+        
+        :param path: path of the PDF file, read in place by PyPDF2 and the page engine
+        :return: list of page results sorted by page, see ``ocr_parallel.ocr_pdf_page``
+        :raise UserError: if the file is empty or not a readable PDF
+        """
+        if not os.path.getsize(path):
+            raise UserError(_("The PDF file is empty."))
         try:
+            recorded = self._get_recorded_page_decisions()
+            reusable = self._get_reusable_pages()
+            reused = {}
+            hashes = {}
+            classified = 0
+            decisions = []
+            texts = {}
             # Open PDF file
-            with open(temp_file_path, 'rb') as file:
+            with open(path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                for page_num in range(total_pages):
-                    page = pdf_reader.pages[page_num]
-                    
-                    # Try to extract text directly from PDF
-                    page_text = page.extract_text()
-                    
-                    # If no text found or text is too short, use OCR
-                    if not page_text or len(page_text) < 100:
-                        # Convert PDF page to image
-                        images = self._pdf_page_to_image(file_data, page_num)
-                        
-                        # Process each image with OCR
-                        page_text = ""
-                        page_confidence = 0
-                        
-                        for img in images:
-                            img_text, img_confidence = self._ocr_image(img)
-                            page_text += img_text + "\n"
-                            page_confidence += img_confidence
-                        
-                        if images:
-                            page_confidence /= len(images)
-                        
-                        confidence += page_confidence
+                for page_num, page in enumerate(pdf_reader.pages):
+                    try:
+                        hashes[page_num] = page_classifier.page_hash(page)
+                    except Exception as e:
+                        _logger.warning("Could not hash page %s: %s", page_num + 1, e)
+                        hashes[page_num] = False
+                    previous = reusable.get(page_num)
+                    if previous and previous.image_hash == hashes[page_num]:
+                        # Unchanged page: keep its result
+                        reused[page_num] = previous._to_page_dict()
+                        decisions.append(previous._get_classification() or {
+                            'page': page_num, 'decision': previous.method,
+                        })
+                        continue
+                    decision = recorded.get(page_num)
+                    if decision is None:
+                        decision, page_text = page_classifier.classify_page(page, page_num)
+                        classified += 1
+                    elif decision['decision'] != page_classifier.DECISION_OCR:
+                        page_text = page.extract_text() or ''
                     else:
-                        # Assume high confidence for embedded text
-                        confidence += 95.0
-                    
-                    content += f"--- Page {page_num + 1} ---\n{page_text}\n\n"
-                    pages_processed += 1
+                        page_text = ''
+                    decisions.append(decision)
+                    texts[page_num] = page_text
             
-            # Calculate average confidence
-            self.confidence_score = confidence / pages_processed if pages_processed > 0 else 0
+            to_ocr = [decision['page'] for decision in decisions
+                      if decision['decision'] != page_classifier.DECISION_TEXT and decision['page'] not in reused]
+            ocr_pages = {page['page']: page for page in self._get_ocr_engine().run(
+                path, to_ocr,
+                progress=lambda done, total: self._report_progress(
+                    10.0 + 80.0 * done / total, _("OCR of page %(done)s of %(total)s") % {'done': done, 'total': total}
+                ),
+            )}
             
-        except Exception as e:
-            _logger.error("Error processing PDF: %s", str(e))
-            raise UserError(_("Error processing PDF: %s") % str(e))
-        finally:
-            # Remove temporary file
-            try:
-                os.unlink(temp_file_path)
-            except:
-                pass
+            pages = []
+            for decision in decisions:
+                page_num = decision['page']
+                if page_num in reused:
+                    pages.append(reused[page_num])
+                    continue
+                if decision['decision'] == page_classifier.DECISION_TEXT:
+                    page = {
+                        'page': page_num,
+                        'text': texts[page_num],
+                        'confidence': page_classifier.TEXT_LAYER_CONFIDENCE,
+                        'method': 'text',
+                    }
+                elif decision['decision'] == page_classifier.DECISION_BOTH:
+                    page = page_classifier.combine_page(page_num, texts[page_num], ocr_pages[page_num])
+                else:
+                    page = ocr_pages[page_num]
+                pages.append(dict(page, engine=self._get_engine_label(page['method']),
+                                  image_hash=hashes[page_num], classification=decision))
+            
+            self.write({'page_decisions_json': json.dumps(decisions)})
+            reports = [page['preprocess'] for page in ocr_pages.values() if page.get('preprocess')]
+            if reports:
+                report = image_preprocess.merge_reports(reports)
+                _logger.info(
+                    "PDF %s: preprocessing of %s pages (%s blank): %s", self.document_id.name, len(reports),
+                    len([page for page in ocr_pages.values() if page.get('blank')]),
+                    image_preprocess.format_timings(report['timings'])
+                )
+            _logger.info(
+                "PDF %s: %s pages kept, %s read from their text layer, %s OCRed (%s classified)",
+                self.document_id.name, len(reused), len(decisions) - len(reused) - len(to_ocr), len(to_ocr), classified
+            )
+            
+        except PdfReadError as e:
+            _logger.error("Could not read PDF %s: %s", self.document_id.name, str(e))
+            raise UserError(_("Could not read the PDF file. The file might be damaged or encrypted: %s") % str(e))
         
-        return content
+        return pages
     
-    def _pdf_page_to_image(self, file_data, page_num):
-        """Convert PDF page to image for OCR processing"""
-        # This is a placeholder - in a real implementation, you would:
-        # 1. Use a library like pdf2image or wand to convert PDF page to image
-        # 2. Return a list of image objects
+    def _get_recorded_page_decisions(self):
+        """Page decisions recorded by an earlier run on the same file
         
-        # For demonstration, we'll just return an empty list
-        # Actual implementation would depend on the specific libraries available
-        return []
+        :return: dict of decisions by zero-based page number, empty when the
+                 file was never classified by the current classifier version
+        """
+        self.ensure_one()
+        if not self.file_hash:
+            return {}
+        previous = self.search([
+            ('file_hash', '=', self.file_hash),
+            ('page_decisions_json', '!=', False),
+        ], order='id desc', limit=1)
+        if not previous:
+            return {}
+        decisions = json.loads(previous.page_decisions_json)
+        if any(decision.get('version') != page_classifier.CLASSIFIER_VERSION for decision in decisions):
+            return {}
+        return {decision['page']: decision for decision in decisions}
     
-    def _process_image(self, file_data):
-        """Process image file with OCR"""
+    @api.model
+    def _get_ocr_engine(self):
+        """Page-parallel OCR engine configured from the system parameters"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        preprocessor = self._get_image_preprocessor()
+        return ocr_parallel.ParallelPageOCR(
+            max_workers=int(ICP.get_param('tender_management.ocr_workers', 0)) or None,
+            memory_budget=int(ICP.get_param('tender_management.ocr_memory_budget_mb', 512)) * 1024 * 1024,
+            dpi=int(ICP.get_param('tender_management.ocr_dpi', ocr_parallel.DEFAULT_DPI)),
+            lang=ICP.get_param('tender_management.ocr_language', ocr_parallel.DEFAULT_LANGUAGE),
+            page_func=functools.partial(ocr_parallel.ocr_pdf_page, preprocess=preprocessor)
+            if preprocessor else ocr_parallel.ocr_pdf_page,
+        )
+    
+    @api.model
+    def _get_preprocess_stages(self):
+        """Image preprocessing stages enabled by the system parameters,
+        see ``image_preprocess.STAGES``. Set the parameter to ``none`` to disable them."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return image_preprocess.parse_stages(
+            ICP.get_param('tender_management.ocr_preprocess_stages', image_preprocess.DEFAULT_STAGES)
+        )
+    
+    @api.model
+    def _get_image_preprocessor(self):
+        """Image preprocessing run before Tesseract, None when disabled"""
+        stages = self._get_preprocess_stages()
+        if not stages:
+            return None
+        ICP = self.env['ir.config_parameter'].sudo()
+        return image_preprocess.ImagePreprocessor(
+            stages, target_dpi=int(ICP.get_param('tender_management.ocr_dpi', ocr_parallel.DEFAULT_DPI)),
+        )
+    
+    def _pdf_page_to_image(self, path, page_num):
+        """Convert PDF page to image for OCR processing"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return ocr_parallel.rasterize_page(
+            path, page_num, int(ICP.get_param('tender_management.ocr_dpi', ocr_parallel.DEFAULT_DPI))
+        )
+    
+    def _process_image(self, path):
+        """Process image file with OCR
+        
+        :raise UserError: if the file is empty or not a supported image
+        """
+        if not os.path.getsize(path):
+            raise UserError(_("The image file is empty."))
         try:
-            # Open image
-            img = Image.open(io.BytesIO(file_data))
-            
+            # Open image, PIL reads the file lazily
+            img = Image.open(path)
+        except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+            _logger.error("Could not read image %s: %s", self.document_id.name, str(e))
+            raise UserError(_("Could not read the image file. The file might be in an unsupported format."))
+        with img:
             # Process with OCR
             text, confidence = self._ocr_image(img)
-            
-            # Update confidence score
-            self.confidence_score = confidence
-            
-            return text
-        except Exception as e:
-            _logger.error("Error processing image: %s", str(e))
-            raise UserError(_("Error processing image: %s") % str(e))
+        
+        # Update confidence score
+        self.confidence_score = confidence
+        
+        return text
     
     def _ocr_image(self, img):
-        """Process image with OCR and return text and confidence score"""
+        """Process image with OCR and return text and confidence score
+        
+        The image is preprocessed first, see ``_get_image_preprocessor``:
+        scaled down to the OCR resolution, converted to grayscale and
+        straightened. Blank images are not OCRed.
+        """
         try:
-            # Process with pytesseract
-            ocr_data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
-            
-            # Extract text
-            text = pytesseract.image_to_string(img)
-            
-            # Calculate confidence
-            if 'conf' in ocr_data and ocr_data['conf']:
-                confidences = [conf for conf in ocr_data['conf'] if conf != -1]
-                confidence = sum(confidences) / len(confidences) if confidences else 0
-            else:
-                confidence = 0
-            
-            return text, confidence
+            preprocessor = self._get_image_preprocessor()
+            if preprocessor:
+                img, report = preprocessor.run(img)
+                _logger.info(
+                    "Preprocessing of %s: %s%s", self.document_id.name,
+                    image_preprocess.format_timings(report['timings']), " (blank)" if report['blank'] else ""
+                )
+                if img is None:
+                    return "", 100.0
+            # Text and confidence come from a single Tesseract run
+            ICP = self.env['ir.config_parameter'].sudo()
+            return ocr_parallel.ocr_image(img, ICP.get_param('tender_management.ocr_language', ocr_parallel.DEFAULT_LANGUAGE))
         except Exception as e:
             _logger.error("OCR processing error: %s", str(e))
             return "", 0
     
-    def _process_text(self, file_data):
-        """Process text file"""
-        try:
-            # Decode file data
-            text = file_data.decode('utf-8')
-            
-            # Set high confidence for text files
-            self.confidence_score = 100.0
-            
-            return text
-        except UnicodeDecodeError:
-            # Try with different encodings
-            for encoding in ['latin-1', 'iso-8859-1', 'windows-1252']:
+    def _process_text(self, path):
+        """Process text file, decoded straight from its memory map"""
+        with ocr_stream.map_file(path) as file_data:
+            for encoding in ['utf-8', 'latin-1', 'iso-8859-1', 'windows-1252']:
                 try:
-                    text = file_data.decode(encoding)
-                    self.confidence_score = 100.0
-                    return text
+                    text = str(file_data, encoding)
                 except UnicodeDecodeError:
+                    # Try with different encodings
                     continue
-            
-            # If all decodings fail, raise error
-            raise UserError(_("Could not decode text file. The file might be in an unsupported format."))
+                # Set high confidence for text files
+                self.confidence_score = 100.0
+                return text
+        
+        # If all decodings fail, raise error
+        raise UserError(_("Could not decode text file. The file might be in an unsupported format."))
     
     def _extract_key_information(self):
-        """Extract key information from OCR content"""
+        """Extract key information from OCR content
+        
+        All the fields are extracted in a single scan of the content, the
+        confidence of each field is weighted by the OCR confidence of the
+        page it was found on.
+        """
         if not self.content:
             return
         
-        # Extract submission deadline
-        self._extract_submission_deadline()
-        
-        # Extract tender value
-        self._extract_tender_value()
-        
-        # Extract tender ID
-        self._extract_tender_id()
-        
-        # Extract issuing authority
-        self._extract_issuing_authority()
+        result = field_extraction.get_engine('tender_ocr').extract(
+            self.content, pages=self._get_pages(), ocr_confidence=self.confidence_score
+        )
+        self.write({
+            'submission_deadline': result.value('submission_deadline', False),
+            'tender_value': result.value('tender_value', 0.0),
+            'tender_id_number': result.value('tender_id', False),
+            'issuing_authority': result.value('issuing_authority', False),
+        })
         
         # Prepare extracted data summary
         extracted_data = []
@@ -316,124 +971,18 @@ class TenderOCR(models.Model):
         self.extracted_data = "\n".join(extracted_data)
         
         # Prepare JSON data
-        self.extracted_data_json = self._prepare_extracted_data_json()
+        self.extracted_data_json = self._prepare_extracted_data_json(result)
     
-    def _extract_submission_deadline(self):
-        """Extract submission deadline from content"""
-        if not self.content:
-            return
-        
-        # Define patterns for date extraction
-        date_patterns = [
-            # Common date formats with day, month, year
-            r'(?:submission|closing|deadline)[^\n]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4})',
-            r'(?:submission|closing|deadline)[^\n]*?(\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',
-            
-            # Dates with time
-            r'(?:submission|closing|deadline)[^\n]*?(\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\s+\d{1,2}:\d{2}(?:\s*[AP]M)?)',
-            r'(?:submission|closing|deadline)[^\n]*?(\d{1,2}(?:st|nd|rd|th)?\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4}\s+\d{1,2}:\d{2}(?:\s*[AP]M)?)',
-        ]
-        
-        for pattern in date_patterns:
-            matches = re.findall(pattern, self.content, re.IGNORECASE)
-            if matches:
-                # Take the first match
-                date_str = matches[0]
-                
-                # Try to parse the date
-                try:
-                    # For demonstration, we use a simple approach
-                    # In a real implementation, you would use a more robust date parser
-                    dt = datetime.strptime(date_str, '%d/%m/%Y')
-                    self.submission_deadline = dt
-                    return
-                except ValueError:
-                    # Try alternative formats
-                    try:
-                        dt = datetime.strptime(date_str, '%d-%m-%Y')
-                        self.submission_deadline = dt
-                        return
-                    except ValueError:
-                        # Continue to next match
-                        continue
-    
-    def _extract_tender_value(self):
-        """Extract tender value from content"""
-        if not self.content:
-            return
-        
-        # Define patterns for value extraction
-        value_patterns = [
-            r'(?:estimated|tender|contract)\s+value\s*(?::|is|of)?\s*(?:[A-Z]{3}|[₹$€£])?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)',
-            r'(?:budget|cost)\s*(?::|is|of)?\s*(?:[A-Z]{3}|[₹$€£])?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)',
-            r'value\s*:\s*(?:[A-Z]{3}|[₹$€£])?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?)'
-        ]
-        
-        for pattern in value_patterns:
-            matches = re.findall(pattern, self.content, re.IGNORECASE)
-            if matches:
-                # Take the first match
-                value_str = matches[0]
-                
-                # Remove commas and convert to float
-                value_str = value_str.replace(',', '')
-                try:
-                    value = float(value_str)
-                    self.tender_value = value
-                    return
-                except ValueError:
-                    # Continue to next match
-                    continue
-    
-    def _extract_tender_id(self):
-        """Extract tender ID from content"""
-        if not self.content:
-            return
-        
-        # Define patterns for tender ID extraction
-        id_patterns = [
-            r'(?:tender|bid|ref(?:erence)?)\s*(?:no|number|id)\.?\s*:?\s*([A-Z0-9-_/]+)',
-            r'(?:tender|bid|ref(?:erence)?)\s*(?:no|number|id)\.?\s*([A-Z0-9-_/]+)',
-        ]
-        
-        for pattern in id_patterns:
-            matches = re.findall(pattern, self.content, re.IGNORECASE)
-            if matches:
-                # Take the first match
-                tender_id = matches[0]
-                self.tender_id_number = tender_id.strip()
-                return
-    
-    def _extract_issuing_authority(self):
-        """Extract issuing authority from content"""
-        if not self.content:
-            return
-        
-        # Define patterns for issuing authority extraction
-        authority_patterns = [
-            r'(?:issuing|procuring)\s+authority\s*:?\s*([^\n]+)',
-            r'(?:issued|procured)\s+by\s*:?\s*([^\n]+)',
-            r'(?:department|ministry|organization)\s*:?\s*([^\n]+)',
-        ]
-        
-        for pattern in authority_patterns:
-            matches = re.findall(pattern, self.content, re.IGNORECASE)
-            if matches:
-                # Take the first match
-                authority = matches[0]
-                self.issuing_authority = authority.strip()
-                return
-    
-    def _prepare_extracted_data_json(self):
-        """Prepare extracted data in JSON format"""
-        import json
-        
+    def _prepare_extracted_data_json(self, result=None):
+        """Prepare extracted data in JSON format, with the position and
+        confidence of each field found"""
         data = {
             'submission_deadline': self.submission_deadline.isoformat() if self.submission_deadline else None,
             'tender_value': self.tender_value,
             'tender_id': self.tender_id_number,
             'issuing_authority': self.issuing_authority,
-            'confidence_score': self.confidence_score
+            'confidence_score': self.confidence_score,
+            'fields': result.to_dict() if result else {},
         }
         
         return json.dumps(data)
@@ -468,12 +1017,23 @@ class TenderOCR(models.Model):
             self.write({
                 'state': 'draft',
                 'content': False,
+                'content_html_data': False,
+                'content_html_index': False,
+                'page_ids': [(5, 0, 0)],
                 'extracted_data': False,
                 'extracted_data_json': False,
                 'error_message': False,
                 'processing_date': False,
+                'heartbeat_date': False,
                 'completion_date': False,
                 'confidence_score': 0.0,
+                'progress': 0.0,
+                'progress_message': False,
+                'attempt_count': 0,
+                'next_attempt_date': False,
+                'cache_id': False,
+                'cache_hit': False,
+                'refresh_cache': False,
                 'submission_deadline': False,
                 'tender_value': 0.0,
                 'tender_id_number': False,
@@ -0,0 +1,203 @@
+# models/ocr_cache.py
+import hashlib
+import json
+import logging
+import psycopg2
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+class TenderOCRCache(models.Model):
+    _name = 'tender.ocr.cache'
+    _description = 'Tender OCR Cache'
+    _order = 'last_hit_date desc, id desc'
+
+    key = fields.Char(string='Cache Key', required=True, readonly=True, index=True)
+    file_hash = fields.Char(string='File SHA-256', required=True, readonly=True, index=True)
+    file_name = fields.Char(string='First File Name', readonly=True)
+    file_size = fields.Integer(string='File Size (bytes)', readonly=True)
+    provider = fields.Char(string='OCR Provider', required=True, readonly=True)
+    engine_settings = fields.Text(string='Engine Settings', readonly=True)
+
+    # Cached Result
+    content = fields.Text(string='OCR Content', readonly=True)
+    confidence_score = fields.Float(string='Confidence Score', readonly=True)
+    pages_json = fields.Text(string='Pages (JSON)', readonly=True,
+                             help="Confidence, extraction method and text span of every page")
+    layout_json = fields.Text(string='Layout (JSON)', readonly=True,
+                              help="Layout returned by the OCR provider")
+    page_count = fields.Integer(string='Pages', readonly=True)
+
+    # Usage
+    hit_count = fields.Integer(string='Hits', readonly=True)
+    last_hit_date = fields.Datetime(string='Last Hit', readonly=True)
+
+    _sql_constraints = [
+        ('key_unique', 'unique(key)', 'An OCR result is already cached for this file and engine settings.'),
+    ]
+
+    @api.depends('file_name', 'provider')
+    def _compute_display_name(self):
+        for entry in self:
+            entry.display_name = f"{entry.file_name or entry.file_hash[:12]} ({entry.provider})"
+
+    @api.model
+    def _is_enabled(self):
+        """Whether OCR results should be cached"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        return str(ICP.get_param('tender_management.ocr_cache_enabled', True)).lower() in ('1', 'true')
+
+    @api.model
+    def _hash_file(self, file_data):
+        """SHA-256 of the content of a file"""
+        return hashlib.sha256(file_data).hexdigest()
+
+    @api.model
+    def _make_key(self, file_hash, provider, settings):
+        """Cache key of a file OCRed by a provider with the given engine settings"""
+        settings = json.dumps(settings or {}, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(f"{file_hash}:{provider}:{settings}".encode()).hexdigest()
+
+    @api.model
+    def _lookup(self, file_hash, provider, settings):
+        """Cached result of a file, counting the hit
+
+        :param file_hash: SHA-256 of the file, see ``_hash_file``
+        :param provider: OCR provider
+        :param settings: dict of the engine settings the result depends on
+        :return: cache entry, empty when the file was never OCRed with these settings
+        """
+        if not self._is_enabled():
+            return self.browse()
+        entry = self.sudo().search([('key', '=', self._make_key(file_hash, provider, settings))], limit=1)
+        if entry:
+            entry._count_hit()
+        return entry
+
+    def _count_hit(self):
+        """Count a hit on the entry, unless another worker is counting one
+        
+        Hits are counted best effort: a concurrent update of the entry is
+        skipped rather than waited for, it would only conflict with this
+        transaction.
+        """
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("""
+                    SELECT id FROM tender_ocr_cache WHERE id = %s FOR NO KEY UPDATE NOWAIT
+                """, (self.id,))
+                self.env.cr.execute("""
+                    UPDATE tender_ocr_cache
+                       SET hit_count = hit_count + 1, last_hit_date = %s
+                     WHERE id = %s
+                """, (fields.Datetime.now(), self.id))
+        except (psycopg2.errors.LockNotAvailable, psycopg2.errors.SerializationFailure):
+            _logger.debug("Skipped counting a hit on OCR cache entry %s", self.id)
+        self.invalidate_recordset(['hit_count', 'last_hit_date'])
+
+    @api.model
+    def _store(self, file_hash, provider, settings, content, confidence, pages=None, layout=None,
+               file_name=None, file_size=0):
+        """Cache an OCR result, replacing the result cached for the same key
+
+        :param file_hash: SHA-256 of the file, see ``_hash_file``
+        :param provider: OCR provider
+        :param settings: dict of the engine settings the result depends on
+        :param content: extracted text
+        :param confidence: confidence score of the document (0-100)
+        :param pages: list of page dicts with ``page``, ``confidence`` and ``method``
+        :param layout: layout returned by the provider, stored as JSON
+        :return: cache entry
+        """
+        if not self._is_enabled():
+            return self.browse()
+        key = self._make_key(file_hash, provider, settings)
+        pages = self._page_spans(content or '', pages or [])
+        vals = {
+            'key': key,
+            'file_hash': file_hash,
+            'file_name': file_name,
+            'file_size': file_size,
+            'provider': provider,
+            'engine_settings': json.dumps(settings or {}, sort_keys=True, default=str),
+            'content': content,
+            'confidence_score': confidence,
+            'pages_json': json.dumps(pages),
+            'layout_json': json.dumps(layout, default=str) if layout else False,
+            'page_count': len(pages),
+            'last_hit_date': fields.Datetime.now(),
+        }
+        entry = self.sudo().search([('key', '=', key)], limit=1)
+        if entry:
+            entry.write(vals)
+            return entry
+        try:
+            with self.env.cr.savepoint():
+                return self.sudo().create(vals)
+        except psycopg2.IntegrityError:
+            # Cached meanwhile by another worker OCRing the same file
+            return self.sudo().search([('key', '=', key)], limit=1)
+
+    @api.model
+    def _page_spans(self, content, pages):
+        """Page metadata with the span of each page text in the document content"""
+        spans = []
+        position = 0
+        for page in pages:
+            text = page.get('text') or ''
+            start = content.find(text, position) if text else -1
+            if start >= 0:
+                position = start + len(text)
+            spans.append({
+                'page': page.get('page', len(spans)),
+                'confidence': page.get('confidence', 0.0),
+                'method': page.get('method'),
+                'start': start if start >= 0 else None,
+                'end': position if start >= 0 else None,
+            })
+        return spans
+
+    def _get_pages(self):
+        """Cached page metadata, see ``_page_spans``"""
+        self.ensure_one()
+        return json.loads(self.pages_json or '[]')
+
+    @api.model
+    def _get_statistics(self):
+        """Usage of the OCR cache
+        
+        Every entry was filled by a miss, so the misses are the number of
+        entries and the hit ratio is the share of lookups served from them.
+        
+        :return: dict with the ``entries``, cached ``bytes``, ``hits``,
+                 ``misses`` and ``hit_ratio`` (0-100) of the cache
+        """
+        self.env.cr.execute("""
+            SELECT count(*), coalesce(sum(hit_count), 0), coalesce(sum(file_size), 0)
+              FROM tender_ocr_cache
+        """)
+        entries, hits, size = self.env.cr.fetchone()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': hits,
+            'misses': entries,
+            'hit_ratio': 100.0 * hits / (hits + entries) if hits + entries else 0.0,
+        }
+
+    @api.model
+    def action_show_statistics(self):
+        """Notification with the hit ratio of the cache"""
+        stats = self._get_statistics()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("OCR Cache"),
+                'message': _("%(hit_ratio).1f%% hit ratio: %(hits)s hits, %(misses)s misses, "
+                             "%(entries)s cached documents.") % stats,
+                'type': 'info',
+                'sticky': False,
+            },
+        }
@@ -0,0 +1,72 @@
+# models/ocr_page.py
+import json
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+class TenderOCRPage(models.Model):
+    _name = 'tender.ocr.page'
+    _description = 'Tender OCR Page'
+    _order = 'ocr_id, page_index'
+
+    ocr_id = fields.Many2one('tender.ocr', string='OCR Processing', required=True, ondelete='cascade', index=True)
+    page_index = fields.Integer(string='Page Index', required=True, readonly=True, help="Zero-based page number")
+    page_number = fields.Integer(string='Page', compute='_compute_page_number')
+
+    # Page Result
+    text = fields.Text(string='Text', readonly=True, prefetch=False)
+    char_count = fields.Integer(string='Characters', readonly=True)
+    confidence = fields.Float(string='Confidence', readonly=True, help="Confidence of the page text (0-100)")
+    method = fields.Selection([
+        ('text', 'Text Layer'),
+        ('ocr', 'OCR'),
+        ('both', 'Text Layer and OCR'),
+    ], string='Method', readonly=True)
+    engine = fields.Char(string='Engine', readonly=True, help="Engine and settings the page was read with")
+    image_hash = fields.Char(string='Page Hash', readonly=True, index=True,
+                             help="SHA-256 of what is drawn on the page, changed pages are read again")
+    classification_json = fields.Text(string='Classification (JSON)', readonly=True,
+                                      help="Measures the reading method of the page was chosen on")
+    duration = fields.Float(string='Duration (s)', readonly=True)
+    processing_date = fields.Datetime(string='Processing Date', readonly=True)
+    to_reprocess = fields.Boolean(string='To Reprocess', copy=False,
+                                  help="Read the page again on the next run of the OCR job")
+
+    _sql_constraints = [
+        ('page_unique', 'unique(ocr_id, page_index)', 'A page can only be stored once per OCR processing.'),
+    ]
+
+    @api.depends('page_index')
+    def _compute_page_number(self):
+        for page in self:
+            page.page_number = page.page_index + 1
+
+    @api.depends('page_index')
+    def _compute_display_name(self):
+        for page in self:
+            page.display_name = _("Page %s") % (page.page_index + 1)
+
+    def _to_page_dict(self):
+        """Page result in the format of ``ocr_parallel.ocr_pdf_page``"""
+        self.ensure_one()
+        return {
+            'page': self.page_index,
+            'text': self.text or '',
+            'confidence': self.confidence,
+            'method': self.method,
+            'engine': self.engine,
+            'image_hash': self.image_hash,
+            'duration': 0.0,
+            'reused': True,
+        }
+
+    def _get_classification(self):
+        """Classification of the page, see ``page_classifier.classify_page``"""
+        self.ensure_one()
+        return json.loads(self.classification_json) if self.classification_json else None
+
+    def action_reprocess(self):
+        """Read the selected pages again, the other pages are kept"""
+        if any(page.ocr_id.state not in ('done', 'failed') for page in self):
+            raise UserError(_("Pages can only be reprocessed once their document is processed"))
+        self.write({'to_reprocess': True})
+        self.ocr_id._queue_reprocess()
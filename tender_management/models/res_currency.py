@@ -0,0 +1,23 @@
+# models/res_currency.py
+from odoo import models, api
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        currencies = super(ResCurrency, self).create(vals_list)
+        # Currencies are indexed in the GeM reference data
+        self.env['gem.portal']._invalidate_gem_reference_data()
+        return currencies
+    
+    def write(self, vals):
+        res = super(ResCurrency, self).write(vals)
+        if {'name', 'active'} & set(vals):
+            self.env['gem.portal']._invalidate_gem_reference_data()
+        return res
+    
+    def unlink(self):
+        res = super(ResCurrency, self).unlink()
+        self.env['gem.portal']._invalidate_gem_reference_data()
+        return res
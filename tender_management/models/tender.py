@@ -1,5 +1,10 @@
 # models/tender.py
+import base64
+import hashlib
 import logging
+import os
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError, ValidationError
@@ -45,8 +50,11 @@ class TenderTender(models.Model):
         ('global', 'Global Tender'),
         ('gem', 'GeM Tender')
     ], string='Tender Type', default='open', required=True, tracking=True)
-    gem_portal_id = fields.Many2one('gem.portal', string='GeM Portal', tracking=True)
-    gem_bid_id = fields.Char(string='GeM Bid Number', tracking=True)
+    gem_portal_id = fields.Many2one('gem.portal', string='GeM Portal', index=True, tracking=True)
+    gem_bid_id = fields.Char(string='GeM Bid Number', index=True, tracking=True)
+    gem_etag = fields.Char(string='GeM ETag', copy=False, readonly=True)
+    gem_last_modified = fields.Char(string='GeM Last Modified', copy=False, readonly=True)
+    gem_payload_hash = fields.Char(string='GeM Payload Fingerprint', copy=False, readonly=True)
     
     # State Management
     state = fields.Selection([
@@ -148,6 +156,26 @@ class TenderTender(models.Model):
             self._create_analytics_record()
         return super(TenderTender, self).write(vals)
     
+    def _get_changed_vals(self, vals):
+        """Return the subset of ``vals`` differing from the cached record values
+        
+        New values are normalized the way the ORM stores them (rounding,
+        HTML sanitizing...) so that an identical value is never written.
+        """
+        self.ensure_one()
+        changed = {}
+        for field_name, value in vals.items():
+            field = self._fields[field_name]
+            new_value = field.convert_to_record(field.convert_to_cache(value, self), self)
+            old_value = self[field_name]
+            if old_value != new_value and (old_value or new_value):
+                changed[field_name] = value
+        return changed
+    
+    def _count_tracked_vals(self, vals):
+        """Number of tracking values generated by writing ``vals``"""
+        return sum(1 for field_name in vals if getattr(self._fields[field_name], 'tracking', False))
+    
     def _create_analytics_record(self):
         """Create analytics record for tracking tender metrics"""
         for tender in self:
@@ -344,6 +372,150 @@ class TenderDocument(models.Model):
     is_public = fields.Boolean(string='Public Document', help="If checked, this document will be visible on the portal")
     user_id = fields.Many2one('res.users', string='Uploaded By', default=lambda self: self.env.user)
     
+    # Content Index
+    content_hash = fields.Char(string='Content Hash', index=True, readonly=True, copy=False,
+                               help="SHA-256 digest of the file content")
+    file_size = fields.Integer(string='File Size', readonly=True, copy=False)
+    
+    # Source Validators
+    source_url = fields.Char(string='Source URL', readonly=True, copy=False)
+    source_etag = fields.Char(string='Source ETag', readonly=True, copy=False)
+    source_last_modified = fields.Char(string='Source Last Modified', readonly=True, copy=False)
+    
+    # GeM Upload
+    gem_bid_id = fields.Many2one('gem.bid', string='GeM Bid', index=True, ondelete='set null')
+    gem_document_id = fields.Char(string='GeM Document ID', readonly=True, copy=False)
+    gem_upload_id = fields.Char(string='GeM Upload Session', readonly=True, copy=False,
+                                help="Resumable upload session of an interrupted upload to GeM")
+    content_ref_count = fields.Integer(string='Shared By', compute='_compute_content_ref_count',
+                                       help="Number of documents sharing this file content")
+    
+    @api.depends('content_hash')
+    def _compute_content_ref_count(self):
+        hashes = [doc.content_hash for doc in self if doc.content_hash]
+        counts = {}
+        if hashes:
+            # Documents the user cannot read still share the file
+            groups = self.sudo().read_group([('content_hash', 'in', hashes)], ['content_hash'], ['content_hash'])
+            counts = {group['content_hash']: group['content_hash_count'] for group in groups}
+        for doc in self:
+            doc.content_ref_count = counts.get(doc.content_hash, 0)
+    
+    @api.model
+    def _compute_file_digest(self, file_value):
+        """Return the SHA-256 digest and size of a base64 encoded file"""
+        raw = base64.b64decode(file_value)
+        return hashlib.sha256(raw).hexdigest(), len(raw)
+    
+    @api.model
+    def _find_file_attachments(self, content_hashes):
+        """Stored file attachments of documents with these contents
+        
+        :return: dict mapping each content hash found to an attachment
+        """
+        documents = self.sudo().search([('content_hash', 'in', list(content_hashes))])
+        if not documents:
+            return {}
+        hashes = dict(zip(documents.ids, documents.mapped('content_hash')))
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', 'in', documents.ids),
+        ])
+        return {hashes[attachment.res_id]: attachment for attachment in attachments}
+    
+    def _get_file_attachment(self):
+        """Return the attachment holding the file of the document"""
+        if not self:
+            return self.env['ir.attachment']
+        self.ensure_one()
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'file'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+    
+    @contextmanager
+    def _file_path(self):
+        """Path of the document file on disk, without reading it in memory
+        
+        Files kept in the filestore are used in place, files stored in the
+        database are spooled to a temporary file for the duration of the
+        context.
+        """
+        attachment = self._get_file_attachment()
+        if not attachment:
+            raise UserError(_("Document %s has no file.") % self.name)
+        if attachment.store_fname:
+            yield attachment._full_path(attachment.store_fname)
+            return
+        fd, path = tempfile.mkstemp(prefix='tender_document_')
+        try:
+            with os.fdopen(fd, 'wb') as spool:
+                spool.write(attachment.raw)
+            yield path
+        finally:
+            os.unlink(path)
+    
+    def _share_file_attachment(self, attachment):
+        """Attach an existing file to this document without reading its data
+        
+        Filestore files are shared by name, as the filestore does for
+        identical content: the file is only garbage collected once no
+        attachment references it anymore.
+        """
+        self.ensure_one()
+        if not attachment.store_fname:
+            attachment.copy({'res_id': self.id})
+            return
+        self.env['ir.attachment'].sudo().create({
+            'name': attachment.name,
+            'res_model': self._name,
+            'res_field': 'file',
+            'res_id': self.id,
+            'type': 'binary',
+            'store_fname': attachment.store_fname,
+            'file_size': attachment.file_size,
+            'checksum': attachment.checksum,
+            'mimetype': attachment.mimetype,
+            'index_content': attachment.index_content,
+        })
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Index the content of the files, and share the file of documents
+        created with only a ``content_hash``
+        
+        Files given in full are stored as usual, the filestore already keeps
+        identical content once. A ``content_hash`` alone reuses the file of
+        an existing document without reading it, e.g. when GeM announces a
+        document already downloaded.
+        
+        :raise UserError: when no document has the content of a ``content_hash``
+        """
+        shared = {}
+        for index, vals in enumerate(vals_list):
+            if vals.get('file'):
+                vals['content_hash'], vals['file_size'] = self._compute_file_digest(vals['file'])
+            elif vals.get('content_hash'):
+                shared[index] = vals['content_hash']
+        attachments = self._find_file_attachments(set(shared.values())) if shared else {}
+        for index, content_hash in shared.items():
+            if content_hash not in attachments:
+                raise UserError(_("No document file has the content hash %s.") % content_hash)
+            vals_list[index].setdefault('file_size', attachments[content_hash].file_size)
+        documents = super(TenderDocument, self).create(vals_list)
+        for index, content_hash in shared.items():
+            documents[index]._share_file_attachment(attachments[content_hash])
+        return documents
+    
+    def write(self, vals):
+        if vals.get('file'):
+            vals['content_hash'], vals['file_size'] = self._compute_file_digest(vals['file'])
+        elif 'file' in vals:
+            vals.update({'content_hash': False, 'file_size': 0})
+        return super(TenderDocument, self).write(vals)
+    
     def action_process_with_ocr(self):
         """Process document with OCR"""
         for doc in self:
@@ -357,7 +529,7 @@ class TenderDocument(models.Model):
                 'state': 'draft'
             })
             
-            # Start OCR processing
+            # Queue OCR processing, it runs on the OCR queue workers
             ocr_result.action_process()
             
             # Update document record
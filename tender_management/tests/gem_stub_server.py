@@ -0,0 +1,332 @@
+"""Local stand-in for the GeM API used by the tests and benchmarks.
+
+The server generates synthetic tenders on the fly, so large portals cost
+no memory, and serves them through the endpoints used by ``gem.portal``
+and ``GemAPIClient``:
+
+* ``POST /auth/token``
+* ``GET /tenders`` and ``/tenders/recent``: pages of tenders following the
+  ``pageSize``/``pageToken`` or ``publishedAfter``/``afterBidId`` cursor
+* ``GET /tenders/<bid>``: tender details
+* ``GET /bids/search`` and ``/bids/<bid>``: client style tenders
+* ``GET /bids/status`` and ``/bids/<bid>/status``: bid statuses
+* ``GET /files/<doc>`` and ``/documents/<doc>/download``: documents
+* ``POST /documents/upload``: streamed multipart document upload
+* ``POST /documents/uploads`` then ``PUT /documents/uploads/<id>``:
+  resumable chunked upload, ``GET /documents/uploads/<id>`` returns the
+  offset reached
+
+Latency, error rate and tender volume are configurable per test.
+"""
+import base64
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BID_PREFIX = 'GEM/2024/B/'
+BASE_DATE = datetime(2024, 1, 1)
+
+
+class _GemStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.stub.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """Consume the request body, returning it only when it is JSON
+        
+        Other bodies are read block by block and only their size is kept,
+        like a real upload endpoint would stream them to storage.
+        """
+        keep = (self.headers.get('Content-Type') or '').startswith('application/json')
+        blocks, size = [], 0
+        if (self.headers.get('Transfer-Encoding') or '').lower() == 'chunked':
+            while True:
+                length = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if not length:
+                    self.rfile.readline()
+                    break
+                block = self.rfile.read(length)
+                self.rfile.readline()
+                size += len(block)
+                if keep:
+                    blocks.append(block)
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining:
+                block = self.rfile.read(min(remaining, 64 * 1024))
+                if not block:
+                    break
+                remaining -= len(block)
+                size += len(block)
+                if keep:
+                    blocks.append(block)
+        body = json.loads(b''.join(blocks)) if keep and blocks else None
+        return body, size
+
+    def _dispatch(self, method):
+        stub = self.server.stub
+        body, size = self._read_body()
+        parts = urlsplit(self.path)
+        path = parts.path[len(stub.prefix):] if parts.path.startswith(stub.prefix) else parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        route, response = stub.route(method, path, query, body=body, size=size, headers=self.headers)
+        stub.count(route)
+
+        if stub.latency:
+            time.sleep(stub.latency)
+        if route != 'auth' and stub.should_fail():
+            stub.count('errors')
+            return self._send(503, {'error': 'Service unavailable'}, headers={'Retry-After': '0'})
+        if response is None:
+            return self._send(404, {'error': 'Not found'})
+        self._send(*response)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+
+class GemStubServer:
+    """Threaded GeM API stand-in listening on localhost.
+
+    Usable as a context manager, ``url`` is the API endpoint to configure
+    on the portal and ``stats`` counts connections, errors and requests by
+    route.
+    """
+
+    def __init__(self, tenders=100, documents_per_tender=0, document_size=1024,
+                 latency=0.0, error_rate=0.0, max_page_size=1000, upload_chunk_size=None, seed=42):
+        self.prefix = '/api'
+        self.stats = Counter()
+        self.uploads = {}
+        self._document_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.configure(tenders=tenders, documents_per_tender=documents_per_tender,
+                       document_size=document_size, latency=latency, error_rate=error_rate,
+                       max_page_size=max_page_size, upload_chunk_size=upload_chunk_size)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _GemStubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{self.prefix}"
+
+    def configure(self, **settings):
+        """Change the volume, latency or error rate of the stand-in"""
+        for key, value in settings.items():
+            setattr(self, key, value)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    @property
+    def requests(self):
+        """Number of requests served since the last reset"""
+        return sum(count for key, count in self.stats.items() if key not in ('connections', 'errors', 'upload_bytes'))
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    # Synthetic data
+
+    def bid_id(self, index):
+        return f"{BID_PREFIX}{index:07d}"
+
+    def bid_index(self, bid_id):
+        if not bid_id or not bid_id.startswith(BID_PREFIX):
+            return None
+        try:
+            index = int(bid_id[len(BID_PREFIX):])
+        except ValueError:
+            return None
+        return index if 0 <= index < self.tenders else None
+
+    def document_content(self, doc_id):
+        header = f"%PDF-1.4 GeM document {doc_id}\n".encode()
+        return header + b'0' * max(self.document_size - len(header), 0)
+
+    def tender(self, index):
+        """GeM payload of the tender at ``index``, as synced by ``gem.portal``"""
+        published = BASE_DATE + timedelta(minutes=index)
+        return {
+            'bidId': self.bid_id(index),
+            'title': f"Supply of equipment lot {index}",
+            'description': f"Synthetic GeM tender {index}",
+            'issuingAuthority': f"Ministry {index % 40}",
+            'publicationDate': published.strftime('%Y-%m-%dT%H:%M:%S'),
+            'submissionDate': (published + timedelta(days=21)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'estimatedValue': float(100000 + index * 10),
+            'emdRequired': index % 3 == 0,
+            'emdAmount': 2000.0 if index % 3 == 0 else 0.0,
+            'documents': [{
+                'name': f"Document {n}",
+                'type': 'TECHNICAL_SPECIFICATION' if n else 'TENDER_NOTICE',
+                'url': f"{self.url}/files/{index}-{n}",
+            } for n in range(self.documents_per_tender)],
+        }
+
+    def client_tender(self, index):
+        """Tender at ``index`` in the format of the bid search API"""
+        tender = self.tender(index)
+        return {
+            'id': tender['bidId'],
+            'bid_number': tender['bidId'],
+            'title': tender['title'],
+            'description': tender['description'],
+            'buyer_name': tender['issuingAuthority'],
+            'start_date': tender['publicationDate'][:10],
+            'end_date': tender['submissionDate'][:10],
+            'estimated_value': tender['estimatedValue'],
+            'currency': 'INR',
+            'status': 'ACTIVE',
+        }
+
+    def status(self, bid_id):
+        return {'bidId': bid_id, 'status': 'UNDER_EVALUATION', 'technicalScore': 75.0}
+
+    def _page(self, query, size_key, token_key):
+        page_size = min(int(query.get(size_key) or 100), self.max_page_size)
+        if query.get(token_key):
+            start = int(query[token_key])
+        else:
+            after = self.bid_index(query.get('afterBidId'))
+            start = after + 1 if after is not None else 0
+        end = min(start + page_size, self.tenders)
+        return range(start, end), (str(end) if end < self.tenders else None)
+
+    def _upload_chunk(self, upload_id, size, headers):
+        """Acknowledge a chunk of a resumable upload"""
+        with self._lock:
+            upload = self.uploads.get(upload_id)
+            if upload is None:
+                return 'upload_chunk', None
+            match = re.match(r'bytes (\d+)-(\d+)/(\d+)', headers.get('Content-Range') or '')
+            if match and int(match.group(1)) == upload['offset']:
+                upload['offset'] += size
+            self.stats['upload_bytes'] += size
+            offset = upload['offset']
+            if offset >= upload['size']:
+                upload['document_id'] = upload.get('document_id') or f"DOC-{upload_id}"
+                return 'upload_chunk', (201, {'documentId': upload['document_id'], 'uploadId': upload_id})
+        return 'upload_chunk', (308, {'offset': offset}, 'application/json',
+                                {'Range': f"bytes=0-{offset - 1}"} if offset else {})
+
+    def route(self, method, path, query, body=None, size=0, headers=None):
+        """Resolve a request to its route name and ``(status, body[, type[, headers]])``"""
+        headers = headers or {}
+        if method == 'POST':
+            if path == '/auth/token':
+                return 'auth', (200, {'access_token': 'stub-token', 'expires_in': 3600})
+            if path == '/documents/upload':
+                with self._lock:
+                    self.stats['upload_bytes'] += size
+                    document_id = f"DOC-{next(self._document_ids)}"
+                return 'upload', (201, {'documentId': document_id, 'size': size})
+            if path == '/documents/uploads':
+                with self._lock:
+                    upload_id = f"U{len(self.uploads) + 1}"
+                    self.uploads[upload_id] = {'size': int((body or {}).get('size') or 0), 'offset': 0}
+                session = {'uploadId': upload_id, 'offset': 0}
+                if self.upload_chunk_size:
+                    session['chunkSize'] = self.upload_chunk_size
+                return 'upload_session', (201, session)
+            return 'unknown', None
+        if method == 'PUT':
+            if path.startswith('/documents/uploads/'):
+                return self._upload_chunk(path[len('/documents/uploads/'):], size, headers)
+            return 'unknown', None
+        if path.startswith('/documents/uploads/'):
+            upload = self.uploads.get(path[len('/documents/uploads/'):])
+            return 'upload_status', None if upload is None else (200, {'offset': upload['offset']})
+
+        if path in ('/tenders', '/tenders/recent'):
+            indexes, next_token = self._page(query, 'pageSize', 'pageToken')
+            return 'tenders', (200, {
+                'items': [self.tender(index) for index in indexes],
+                'nextPageToken': next_token,
+            })
+        if path.startswith('/tenders/'):
+            index = self.bid_index(path[len('/tenders/'):])
+            return 'tender_detail', None if index is None else (200, self.tender(index))
+        if path == '/bids/search':
+            indexes, next_token = self._page(query, 'page_size', 'page_token')
+            return 'bid_search', (200, {
+                'bids': [self.client_tender(index) for index in indexes],
+                'next_page_token': next_token,
+            })
+        if path == '/bids/status':
+            if query.get('bid_ids'):
+                return 'bulk_status', (200, {'statuses': [
+                    self.status(bid_id) for bid_id in query['bid_ids'].split(',')
+                    if self.bid_index(bid_id) is not None
+                ]})
+            return 'status', (200, self.status(query.get('bid_id')))
+        if path.startswith('/bids/') and path.endswith('/status'):
+            bid_id = path[len('/bids/'):-len('/status')]
+            return 'status', None if self.bid_index(bid_id) is None else (200, self.status(bid_id))
+        if path.startswith('/bids/'):
+            index = self.bid_index(path[len('/bids/'):])
+            return 'bid_detail', None if index is None else (200, {'bid': self.client_tender(index)})
+        if path.startswith('/files/'):
+            return 'document', (200, self.document_content(path[len('/files/'):]), 'application/pdf')
+        if path.startswith('/documents/') and path.endswith('/download'):
+            doc_id = path[len('/documents/'):-len('/download')]
+            return 'document', (200, {
+                'document_content': base64.b64encode(self.document_content(doc_id)).decode(),
+            })
+        return 'unknown', None
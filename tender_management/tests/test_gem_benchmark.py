@@ -0,0 +1,191 @@
+from odoo.tests.common import TransactionCase, tagged
+import base64
+import logging
+import os
+import time
+import tracemalloc
+
+from odoo.addons.tender_management.external.gem_api import gem_session
+from odoo.addons.tender_management.external.gem_api.gem_client import GemAPIClient
+from odoo.addons.tender_management.tests.gem_stub_server import GemStubServer
+
+_logger = logging.getLogger(__name__)
+
+# Portal sizes of the sync benchmark, e.g. GEM_BENCHMARK_SIZES=1000,10000
+BENCHMARK_SIZES = [
+    int(size) for size in os.environ.get('GEM_BENCHMARK_SIZES', '1000,10000,50000').split(',') if size
+]
+# Size of the bid document of the upload benchmark, e.g. GEM_BENCHMARK_UPLOAD_MB=200
+UPLOAD_SIZE = int(os.environ.get('GEM_BENCHMARK_UPLOAD_MB', '100')) * 1024 * 1024
+
+
+@tagged('post_install', '-at_install', '-standard', 'gem_benchmark')
+class TestGemBenchmark(TransactionCase):
+    """Throughput of the GeM synchronization against the local stand-in
+
+    Not part of the standard test run, select it with
+    ``--test-tags gem_benchmark``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestGemBenchmark, cls).setUpClass()
+        cls.server = GemStubServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        gem_session.close_sessions()
+        super(TestGemBenchmark, cls).tearDownClass()
+
+    def setUp(self):
+        super(TestGemBenchmark, self).setUp()
+
+        # The sync lock and API statistics use their own transactions
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        self.server.configure(tenders=100, documents_per_tender=0, latency=0.0, error_rate=0.0)
+
+    def _create_portal(self, name):
+        return self.env['gem.portal'].create({
+            'name': name,
+            'api_endpoint': self.server.url,
+            'api_key': 'benchmark-key',
+            'api_secret': 'benchmark-secret',
+        })
+
+    def _measure(self, label, size, func):
+        """Run ``func`` and log its throughput, HTTP calls, SQL queries and peak memory"""
+        self.server.reset_stats()
+        queries = self.cr.sql_log_count
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func()
+            duration = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        metrics = {
+            'result': result,
+            'duration': duration,
+            'per_second': size / duration if duration else 0.0,
+            'http_calls': self.server.requests,
+            'http_errors': self.server.stats['errors'],
+            'queries': self.cr.sql_log_count - queries,
+            'peak_memory': peak,
+        }
+        _logger.info(
+            "GeM benchmark %s (%s tenders): %.1f tenders/s in %.2fs, %s HTTP calls (%s errors), "
+            "%s SQL queries, %.1f MiB peak memory",
+            label, size, metrics['per_second'], metrics['duration'], metrics['http_calls'],
+            metrics['http_errors'], metrics['queries'], metrics['peak_memory'] / 1024 / 1024
+        )
+        return metrics
+
+    def test_sync_throughput(self):
+        """Benchmark full syncs of growing portals"""
+        for size in BENCHMARK_SIZES:
+            with self.subTest(size=size):
+                self.server.configure(tenders=size)
+                portal = self._create_portal(f'Benchmark Portal {size}')
+
+                metrics = self._measure('sync', size, portal._sync_tenders)
+
+                self.assertEqual(metrics['result']['created'], size, "Every tender should be created")
+                self.assertEqual(portal.sync_cursor_bid_id, self.server.bid_id(size - 1),
+                                 "Cursor should point to the last tender")
+
+    def test_resync_throughput(self):
+        """Benchmark a sync of a portal whose tenders are all known"""
+        size = BENCHMARK_SIZES[0]
+        self.server.configure(tenders=size)
+        portal = self._create_portal('Benchmark Resync Portal')
+        portal._sync_tenders()
+        portal.action_reset_sync_cursor()
+
+        metrics = self._measure('resync', size, portal._sync_tenders)
+
+        self.assertEqual(metrics['result']['unchanged'], size, "Known tenders should be left untouched")
+        self.assertEqual(metrics['result']['writes'], 0, "Nothing should be written")
+
+    def test_sync_with_documents(self):
+        """Benchmark a sync downloading the tender documents"""
+        size = BENCHMARK_SIZES[0]
+        self.server.configure(tenders=size, documents_per_tender=2, document_size=64 * 1024)
+        portal = self._create_portal('Benchmark Documents Portal')
+
+        metrics = self._measure('sync with documents', size, portal._sync_tenders)
+
+        self.assertEqual(metrics['result']['created'], size)
+        self.assertEqual(self.server.stats['document'], 2 * size, "Every document should be downloaded once")
+
+    def test_sync_under_latency_and_errors(self):
+        """Benchmark a sync against a slow and flaky portal"""
+        size = BENCHMARK_SIZES[0]
+        self.server.configure(tenders=size, latency=0.05, error_rate=0.05)
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_sync_page_size', 100)
+        portal = self._create_portal('Benchmark Flaky Portal')
+
+        metrics = self._measure('sync under errors', size, portal._sync_tenders)
+
+        self.assertEqual(metrics['result']['created'], size, "Failed calls should be retried")
+
+    def test_client_search_throughput(self):
+        """Benchmark tender searches of the API client"""
+        size = BENCHMARK_SIZES[0]
+        self.server.configure(tenders=size)
+        client = GemAPIClient(self.env, portal=self._create_portal('Benchmark Client Portal'))
+
+        metrics = self._measure('client search', size, lambda: client.search_tenders({'page_size': size}))
+
+        self.assertEqual(len(metrics['result']), size)
+
+    def test_document_download_throughput(self):
+        """Benchmark sequential single document downloads"""
+        size = min(BENCHMARK_SIZES[0], 1000)
+        self.server.configure(tenders=size, document_size=64 * 1024)
+        portal = self._create_portal('Benchmark Download Portal')
+
+        metrics = self._measure('document download', size, lambda: [
+            portal._download_document(f"{self.server.url}/files/{index}-0") for index in range(size)
+        ])
+
+        self.assertTrue(all(metrics['result']), "Every document should be downloaded")
+
+    def test_document_upload_memory(self):
+        """Benchmark the peak memory of bid document uploads"""
+        chunk_size = 4 * 1024 * 1024
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_upload_chunk_size', chunk_size)
+        portal = self._create_portal('Benchmark Upload Portal')
+        portal._create_update_tenders([self.server.tender(0)])
+        tender = self.env['tender.tender'].search([('gem_portal_id', '=', portal.id)])
+        bid = self.env['gem.bid'].create({
+            'name': 'Benchmark Bid',
+            'gem_portal_id': portal.id,
+            'tender_id': tender.id,
+            'bid_id': self.server.bid_id(0),
+        })
+        document = self.env['tender.document'].create({
+            'name': 'Bid Package',
+            'tender_id': tender.id,
+            'gem_bid_id': bid.id,
+            'document_type': 'bid_document',
+            'file': base64.b64encode(b'0' * UPLOAD_SIZE),
+        })
+        document.invalidate_recordset(['file'])
+        token = portal._get_token()
+
+        for resumable in (False, True):
+            with self.subTest(resumable=resumable):
+                portal.chunked_upload_supported = resumable
+                document.write({'gem_document_id': False})
+
+                metrics = self._measure('resumable upload' if resumable else 'streamed upload', 1,
+                                        lambda: bid._upload_documents(token))
+
+                self.assertEqual(metrics['result'], [], "Document should be uploaded")
+                self.assertGreaterEqual(self.server.stats['upload_bytes'], UPLOAD_SIZE)
+                self.assertLess(metrics['peak_memory'], 4 * chunk_size,
+                                "Upload should not load the document in memory")
@@ -0,0 +1,173 @@
+from odoo.tests.common import TransactionCase, tagged
+from unittest.mock import patch
+import base64
+import datetime
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+
+from odoo.addons.tender_management.external.gem_api import gem_downloader
+from odoo.addons.tender_management.external.gem_api.gem_downloader import GemDocumentDownloader
+
+
+class _StubResponse:
+    """Streamed response stand-in sending its chunks ``delay`` seconds apart"""
+
+    def __init__(self, status_code=200, chunks=(b'%PDF-1.4',), delay=0.0, headers=None):
+        self.status_code = status_code
+        self.chunks = chunks
+        self.delay = delay
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+
+class _StubSession:
+    """requests session stand-in recording the peak of requests in flight, per host and overall"""
+
+    def __init__(self, responses, hold=0.0):
+        self.responses = responses
+        self.hold = hold
+        self.lock = threading.Lock()
+        self.in_flight = defaultdict(int)
+        self.peak = defaultdict(int)
+        self.total = 0
+        self.peak_total = 0
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        with self.lock:
+            self.in_flight[host] += 1
+            self.total += 1
+            self.peak[host] = max(self.peak[host], self.in_flight[host])
+            self.peak_total = max(self.peak_total, self.total)
+        try:
+            time.sleep(self.hold)
+            outcome = self.responses.get(url) or _StubResponse()
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        finally:
+            with self.lock:
+                self.in_flight[host] -= 1
+                self.total -= 1
+
+
+@tagged('post_install', '-at_install')
+class TestGemDownloader(TransactionCase):
+
+    def _downloader(self, session, **kwargs):
+        return GemDocumentDownloader(lambda url: session, retry={'max_attempts': 1}, **kwargs)
+
+    def test_downloads_are_limited_per_host(self):
+        """Test that hosts are downloaded from in parallel, each within its limit"""
+        urls = [f"http://{host}.gem.test/documents/{index}" for host in ('a', 'b') for index in range(6)]
+        session = _StubSession({}, hold=0.05)
+
+        results = self._downloader(session, max_workers=8, per_host=2).download_all(urls)
+        self.addCleanup(GemDocumentDownloader.cleanup, results)
+
+        self.assertEqual([result['url'] for result in results], urls, "Results should keep the order of the URLs")
+        self.assertTrue(all(result.get('path') for result in results))
+        self.assertEqual(dict(session.peak), {'a.gem.test': 2, 'b.gem.test': 2}, "Hosts should get 2 downloads at most")
+        self.assertGreater(session.peak_total, 2, "Different hosts should be downloaded from concurrently")
+
+    def test_download_deadline(self):
+        """Test that a download running past its timeout is abandoned and its file removed"""
+        url = 'http://gem.test/documents/slow'
+        session = _StubSession({url: _StubResponse(chunks=[b'0' * 1024] * 10, delay=0.03)})
+        paths = []
+        create_temp_file = tempfile.mkstemp
+
+        def mkstemp(**kwargs):
+            fd, path = create_temp_file(**kwargs)
+            paths.append(path)
+            return fd, path
+
+        start = time.monotonic()
+        with patch.object(gem_downloader.tempfile, 'mkstemp', side_effect=mkstemp):
+            result = self._downloader(session, timeout=0.1).download(url)
+
+        self.assertEqual(result['error'], "Download exceeded 0.1s")
+        self.assertNotIn('path', result)
+        self.assertLess(time.monotonic() - start, 0.25, "Download should stop at its deadline")
+        self.assertFalse(os.path.exists(paths[0]), "Partial file should be removed")
+
+    def test_partial_failure(self):
+        """Test that failed downloads are reported without failing the others"""
+        urls = [f"http://gem.test/documents/{name}" for name in ('first', 'missing', 'broken', 'last')]
+        session = _StubSession({
+            urls[1]: _StubResponse(status_code=404),
+            urls[2]: requests.exceptions.ConnectionError("Connection reset"),
+            urls[3]: _StubResponse(chunks=[b'%PDF', b'-1.4'], headers={'ETag': '"v2"'}),
+        })
+
+        results = self._downloader(session).download_all(urls)
+
+        self.assertEqual([result['url'] for result in results], urls)
+        self.assertEqual(results[1]['error'], "HTTP 404")
+        self.assertIn("Connection reset", results[2]['error'])
+        self.assertEqual((results[3]['size'], results[3]['etag']), (8, '"v2"'))
+        with open(results[3]['path'], 'rb') as document_file:
+            self.assertEqual(document_file.read(), b'%PDF-1.4')
+
+        GemDocumentDownloader.cleanup(results)
+        self.assertFalse(any(os.path.exists(result['path']) for result in results if result.get('path')))
+
+    def test_documents_are_created_in_batches(self):
+        """Test that downloaded documents are created in batches bounded by their size"""
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_document_batch_bytes', 3000)
+        portal = self.env['gem.portal'].create({
+            'name': 'Batch GeM Portal',
+            'api_endpoint': 'http://gem.test/api',
+            'api_key': 'test-key',
+            'api_secret': 'test-secret',
+        })
+        portal._create_update_tenders([{
+            'bidId': 'GEM/BATCH/1',
+            'title': 'Batched Documents',
+            'submissionDate': (datetime.datetime.now() + datetime.timedelta(days=30)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'estimatedValue': 1000.0,
+        }])
+        tender = self.env['tender.tender'].search([('gem_portal_id', '=', portal.id)])
+        documents = [{'name': f'annexure-{index}.pdf', 'url': f'http://gem.test/documents/{index}'}
+                     for index in range(6)]
+        # Each file is 1336 bytes once encoded, the fourth one cannot be fetched
+        session = _StubSession({
+            doc['url']: _StubResponse(chunks=[b'0' * 1000]) for doc in documents
+        })
+        session.responses[documents[3]['url']] = _StubResponse(status_code=404)
+
+        Document = type(self.env['tender.document'])
+        create = Document.create
+        batches = []
+
+        def batched_create(records, vals_list):
+            batches.append(len(vals_list))
+            return create(records, vals_list)
+
+        with patch.object(type(portal), '_get_token', return_value={'access_token': 'token'}), \
+                patch.object(type(portal), '_get_document_downloader', return_value=self._downloader(session)), \
+                patch.object(Document, 'create', batched_create):
+            portal._sync_tender_documents([(tender, {'documents': documents})])
+
+        self.assertEqual(batches, [3, 2], "A batch should be created once it reaches the size limit")
+        self.assertEqual(len(tender.document_ids), 5, "Failed download should be skipped")
+        self.assertEqual(base64.b64decode(tender.document_ids[0].file), b'0' * 1000)
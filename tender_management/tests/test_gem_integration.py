@@ -0,0 +1,455 @@
+from odoo.tests.common import TransactionCase, tagged
+from unittest.mock import MagicMock, patch
+import base64
+import datetime
+import time
+
+from odoo.exceptions import UserError
+
+from odoo.addons.tender_management.external.gem_api import gem_session
+from odoo.addons.tender_management.external.gem_api.gem_status_poller import GemStatusPoller
+from odoo.addons.tender_management.tests.gem_stub_server import GemStubServer
+
+
+@tagged('post_install', '-at_install')
+class TestGemIntegration(TransactionCase):
+
+    def setUp(self):
+        super(TestGemIntegration, self).setUp()
+
+        self.portal = self.env['gem.portal'].create({
+            'name': 'Test GeM Portal',
+            'api_endpoint': 'http://gem.test/api',
+            'api_key': 'test-key',
+            'api_secret': 'test-secret',
+        })
+
+        self.deadline = (datetime.datetime.now() + datetime.timedelta(days=30)).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def _gem_payload(self, bid_id, **values):
+        payload = {
+            'bidId': bid_id,
+            'title': f'GeM Tender {bid_id}',
+            'submissionDate': self.deadline,
+            'estimatedValue': 1000.0,
+        }
+        payload.update(values)
+        return payload
+
+    def _portal_tenders(self):
+        return self.env['tender.tender'].search([('gem_portal_id', '=', self.portal.id)])
+
+    def _enter_test_mode(self):
+        # Token refreshes, API statistics and the sync lock use their own
+        # transactions, which must see the records of the test
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def test_batched_upsert_creates_tenders(self):
+        """Test that new GeM tenders are created in batches"""
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_sync_batch_size', 2)
+        payload = [self._gem_payload(f'GEM/{i}') for i in range(5)]
+        payload.append({'title': 'No bid ID'})
+
+        stats = self.portal._create_update_tenders(payload)
+
+        self.assertEqual(stats['created'], 5, "All new tenders should be created")
+        self.assertEqual(stats['updated'], 0, "No tender should be updated")
+        self.assertEqual(stats['skipped'], 1, "Payloads without bid ID should be skipped")
+        self.assertEqual(len(stats['chunks']), 3, "Payload should be split in chunks of 2")
+        self.assertEqual(len(self._portal_tenders()), 5, "Wrong number of GeM tenders")
+
+    def test_reference_data_is_resolved_in_memory(self):
+        """Test that GeM codes are mapped from the cached reference data"""
+        department = self.env['tender.department'].create({'name': 'Ministry of Railways', 'code': 'MOR'})
+        Portal = self.env['gem.portal']
+        reference_data = Portal._get_gem_reference_data()
+        self.assertEqual(reference_data.department_id('ministry of  railways'), department.id)
+        self.assertEqual(reference_data.currency_id('inr'), self.env.ref('base.INR').id)
+        self.assertEqual(reference_data.document_type('CORRIGENDUM'), 'corrigendum')
+        self.assertEqual(reference_data.gem_document_type('unknown'), 'OTHER')
+
+        with self.assertQueryCount(0):
+            vals = self.portal._prepare_new_tender_vals('GEM/1', self._gem_payload('GEM/1', issuingAuthority='MOR'))
+        self.assertEqual(vals['department_id'], department.id, "Issuing authority should resolve to its department")
+
+        version = Portal._get_gem_reference_version()
+        with patch.object(type(self.registry), 'clear_cache') as clear_cache:
+            department.name = 'Railway Board'
+        self.assertFalse(clear_cache.called, "Only the reference data should be reloaded")
+        self.assertEqual(Portal._get_gem_reference_version()[0], version[0] + 1,
+                         "Renamed department should bump the version of the reference data")
+        self.assertEqual(Portal._get_gem_reference_data().department_id('Railway Board'), department.id,
+                         "Renamed department should invalidate the reference data")
+
+    def test_batched_upsert_updates_existing_tenders(self):
+        """Test that known GeM tenders are updated instead of duplicated"""
+        self.portal._create_update_tenders([self._gem_payload('GEM/1'), self._gem_payload('GEM/2')])
+
+        stats = self.portal._create_update_tenders([
+            self._gem_payload('GEM/1', title='Revised Tender', estimatedValue=2500.0),
+            self._gem_payload('GEM/2', title='Revised Tender', estimatedValue=2500.0),
+            self._gem_payload('GEM/3'),
+        ])
+
+        self.assertEqual(stats['created'], 1, "Only the unknown tender should be created")
+        self.assertEqual(stats['updated'], 2, "Known tenders should be updated")
+        self.assertEqual(stats['chunks'][0]['writes'], 1, "Identical updates should be grouped")
+        tender = self._portal_tenders().filtered(lambda t: t.gem_bid_id == 'GEM/1')
+        self.assertEqual(tender.tender_value, 2500.0, "Tender value not updated from GeM")
+
+    def test_unchanged_payload_is_not_written(self):
+        """Test that resyncing identical GeM data writes nothing"""
+        payload = [self._gem_payload('GEM/1'), self._gem_payload('GEM/2')]
+        self.portal._create_update_tenders(payload)
+
+        stats = self.portal._create_update_tenders(payload)
+        self.assertEqual(stats['unchanged'], 2, "Identical payloads should be skipped")
+        self.assertEqual(stats['writes'], 0, "Nothing should be written")
+
+        # Only the fields that differ are written and tracked
+        stats = self.portal._create_update_tenders([
+            self._gem_payload('GEM/1', description='Added by GeM'),
+            self._gem_payload('GEM/2', estimatedValue=1000.0, extraInfo='Ignored'),
+        ])
+        self.assertEqual(stats['updated'], 2, "Changed payloads should be processed")
+        self.assertEqual(stats['writes'], 1, "Only the changed field should be written")
+        self.assertEqual(stats['tracking_values'], 1, "Only the description should be tracked")
+
+    def test_payload_fingerprints_survive_pending_writes(self):
+        """Test that fingerprints stored by query are not overwritten by the ORM cache"""
+        self.portal._create_update_tenders([self._gem_payload('GEM/1')])
+        tender = self._portal_tenders()
+        tender.write({'gem_payload_hash': 'stale'})
+
+        payload = self._gem_payload('GEM/1', title='Revised Tender')
+        self.portal._create_update_tenders([payload])
+
+        tender.env.flush_all()
+        tender.invalidate_recordset(['gem_payload_hash'])
+        self.assertEqual(tender.gem_payload_hash, self.portal._gem_payload_fingerprint(payload),
+                         "Stored fingerprint should match the last payload")
+
+    def test_sync_cursor_only_moves_forward(self):
+        """Test that the sync cursor follows the latest published tender"""
+        self.portal._advance_sync_cursor([
+            self._gem_payload('GEM/2', publicationDate='2024-05-02T10:00:00'),
+            self._gem_payload('GEM/1', publicationDate='2024-05-01T10:00:00'),
+        ])
+        self.assertEqual(self.portal.sync_cursor_bid_id, 'GEM/2', "Cursor should point to the latest tender")
+
+        self.portal._advance_sync_cursor([
+            self._gem_payload('GEM/0', publicationDate='2024-04-30T10:00:00'),
+        ])
+        self.assertEqual(self.portal.sync_cursor_bid_id, 'GEM/2', "Cursor should never move backwards")
+
+        params = self.portal._prepare_sync_params(100)
+        self.assertEqual(params['publishedAfter'], '2024-05-02T10:00:00', "Sync should start after the cursor")
+        self.assertEqual(params['afterBidId'], 'GEM/2', "Sync should start after the cursor bid")
+
+    def test_sync_stops_when_the_cursor_does_not_move(self):
+        """Test that a full page without publication dates is not requested again"""
+        self._enter_test_mode()
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_sync_page_size', 2)
+        token = {'access_token': 'token-1', 'expires_at': time.time() + 3600}
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200, headers={}, json=lambda: {
+            'items': [self._gem_payload('GEM/1'), self._gem_payload('GEM/2')],
+        })
+        with patch.object(type(self.portal), '_request_token', return_value=token), \
+                patch.object(type(self.portal), '_get_http_session', return_value=session):
+            totals = self.portal._sync_tenders()
+
+        self.assertEqual(session.request.call_count, 1, "Page should be requested once")
+        self.assertEqual(totals['pages'], 1)
+        self.assertEqual(totals['created'], 2, "Tenders of the page should still be synced")
+        self.assertTrue(totals['error'], "Stalled cursor should be reported")
+
+    def test_sync_cursor_orders_bid_ids_naturally(self):
+        """Test that bid numbers published together compare as numbers"""
+        published = '2024-05-02T10:00:00'
+        self.portal._advance_sync_cursor([
+            self._gem_payload('GEM/2024/B/9', publicationDate=published),
+            self._gem_payload('GEM/2024/B/10', publicationDate=published),
+        ])
+        self.assertEqual(self.portal.sync_cursor_bid_id, 'GEM/2024/B/10')
+
+        self.portal._advance_sync_cursor([self._gem_payload('GEM/2024/B/9', publicationDate=published)])
+        self.assertEqual(self.portal.sync_cursor_bid_id, 'GEM/2024/B/10', "Cursor should never move backwards")
+
+    def test_token_is_shared_until_refresh_margin(self):
+        """Test that a cached token is reused and refreshed before expiry"""
+        self._enter_test_mode()
+        token = {'access_token': 'token-1', 'expires_at': time.time() + 3600}
+        with patch.object(type(self.portal), '_request_token', return_value=token) as request_token:
+            self.assertEqual(self.portal._get_token()['access_token'], 'token-1')
+            self.assertEqual(self.portal._get_token()['access_token'], 'token-1')
+            self.assertEqual(request_token.call_count, 1, "Cached token should be reused")
+            self.assertEqual(self.portal.auth_call_count, 1, "Authentication should be counted once")
+
+            # Within the refresh margin the token is renewed proactively
+            health = self.env['gem.portal.health'].sudo().search([('portal_id', '=', self.portal.id)])
+            health.token_expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=60)
+            self.portal.invalidate_recordset()
+            self.portal._get_token()
+            self.assertEqual(request_token.call_count, 2, "Token close to expiry should be refreshed")
+
+    def test_token_is_refreshed_in_its_own_transaction(self):
+        """Test that the refreshed token is committed apart from the portal"""
+        self._enter_test_mode()
+        token = {'access_token': 'token-2', 'expires_at': time.time() + 3600}
+        with patch.object(type(self.portal), '_request_token', return_value=token), \
+                patch.object(type(self.registry), 'cursor', wraps=self.registry.cursor) as cursor:
+            self.assertEqual(self.portal._get_token()['access_token'], 'token-2')
+        self.assertTrue(cursor.called, "Token should be refreshed on a cursor of its own")
+        self.assertEqual(self.portal.auth_call_count, 1, "Caller should read the refreshed token")
+
+        self.portal.write({'connection_status': 'connected'})
+        self.env.flush_all()
+        self.cr.execute("SELECT token, auth_call_count FROM gem_portal_health WHERE portal_id = %s",
+                        (self.portal.id,))
+        self.assertEqual(self.cr.fetchone(), ('token-2', 1))
+
+    def test_token_of_missing_portal(self):
+        """Test that a portal deleted meanwhile gets no token"""
+        self._enter_test_mode()
+        missing = self.env['gem.portal'].browse(self.portal.id + 1000000)
+        with patch.object(type(self.portal), '_request_token', side_effect=AssertionError("Authenticated")):
+            self.assertIsNone(missing._refresh_token())
+
+    def test_identical_documents_share_their_file(self):
+        """Test that documents with the same content reuse one stored file"""
+        self.portal._create_update_tenders([self._gem_payload('GEM/1'), self._gem_payload('GEM/2')])
+        first_tender, second_tender = self._portal_tenders()
+        content = base64.b64encode(b'%PDF-1.4 standard annexure')
+
+        first = self.env['tender.document'].create({
+            'name': 'Annexure', 'tender_id': first_tender.id, 'file': content,
+        })
+        second = self.env['tender.document'].create({
+            'name': 'Annexure', 'tender_id': second_tender.id, 'file': content,
+        })
+
+        self.assertEqual(first.content_hash, second.content_hash, "Identical content should have the same hash")
+        self.assertEqual(second.content_ref_count, 2, "Both documents should reference the content")
+        self.assertEqual(second.file, content, "Document should keep its file")
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'tender.document'),
+            ('res_field', '=', 'file'),
+            ('res_id', 'in', (first + second).ids),
+        ])
+        self.assertEqual(len(set(attachments.mapped('checksum'))), 1, "Documents should share the stored file")
+
+        # Users restricted to their own documents still see every reference
+        user = self.env['res.users'].create({
+            'name': 'Document User',
+            'login': 'document_user@test.com',
+            'groups_id': [(4, self.env.ref('tender_management.group_tender_user').id)],
+        })
+        third = self.env['tender.document'].create({
+            'name': 'Annexure', 'tender_id': second_tender.id, 'file': content, 'create_uid': user.id,
+        })
+        self.assertEqual(third.with_user(user).content_ref_count, 3, "References should not depend on access rights")
+
+        # A known content hash reuses the stored file without its data
+        announced = self.env['tender.document'].create({
+            'name': 'Annexure', 'tender_id': first_tender.id, 'content_hash': first.content_hash,
+        })
+        self.assertEqual(announced.file, content, "Document should get the file of its content hash")
+        self.assertEqual(announced.file_size, first.file_size)
+        with self.assertRaises(UserError):
+            self.env['tender.document'].create({
+                'name': 'Unknown', 'tender_id': first_tender.id, 'content_hash': 'unknown',
+            })
+
+    def test_unchanged_tender_is_not_rewritten(self):
+        """Test that tender details are fetched conditionally"""
+        self._enter_test_mode()
+        self.portal._create_update_tenders([self._gem_payload('GEM/1')])
+        tender = self._portal_tenders()
+        token = {'access_token': 'token-1', 'expires_at': time.time() + 3600}
+        session = MagicMock()
+        session.request.return_value = MagicMock(
+            status_code=200, headers={'ETag': '"v1"'},
+            json=lambda: self._gem_payload('GEM/1', title='Revised Tender'),
+        )
+        with patch.object(type(self.portal), '_request_token', return_value=token), \
+                patch.object(type(self.portal), '_get_http_session', return_value=session):
+            self.portal.fetch_tender_details(tender)
+            self.assertEqual(tender.gem_etag, '"v1"', "ETag of the tender should be stored")
+            self.assertEqual(tender.title, 'Revised Tender', "Tender not updated from GeM")
+
+            session.request.return_value = MagicMock(status_code=304, headers={})
+            tender.title = 'Local Title'
+            self.assertTrue(self.portal.fetch_tender_details(tender))
+            self.assertEqual(
+                session.request.call_args.kwargs['headers']['If-None-Match'], '"v1"',
+                "Stored ETag should be sent as validator"
+            )
+            self.assertEqual(tender.title, 'Local Title', "Unchanged tender should not be rewritten")
+
+    def test_bid_statuses_are_polled_in_bulk(self):
+        """Test that bid statuses are fetched in bulk and written in groups"""
+        self.portal._create_update_tenders([self._gem_payload('GEM/1')])
+        tender = self._portal_tenders()
+        bids = self.env['gem.bid'].create([{
+            'name': f'Bid {i}',
+            'gem_portal_id': self.portal.id,
+            'tender_id': tender.id,
+            'bid_id': f'BID/{i}',
+            'state': 'submitted',
+        } for i in range(3)])
+
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200, json=lambda: {'statuses': [
+            {'bidId': 'BID/0', 'status': 'UNDER_EVALUATION', 'technicalScore': 80.0},
+            {'bidId': 'BID/1', 'status': 'UNDER_EVALUATION', 'technicalScore': 80.0},
+        ]})
+        poller = GemStatusPoller(lambda url: session, self.portal.api_endpoint, bulk_size=50)
+        statuses = poller.poll(bids.mapped('bid_id'))
+
+        self.assertEqual(session.request.call_count, 1, "Statuses should be fetched in a single request")
+        self.assertIn('error', statuses['BID/2'], "Missing status should be reported as error")
+        writes = bids._apply_gem_statuses(statuses)
+        self.assertEqual(writes, 2, "Identical status updates should be grouped")
+        self.assertEqual(bids.mapped('state'), ['under_evaluation', 'under_evaluation', 'submitted'])
+        self.assertTrue(all(bids.mapped('status_checked_at')), "Polled bids should be marked as checked")
+
+    def test_circuit_opens_after_repeated_errors(self):
+        """Test that failing GeM calls are retried, then fail fast"""
+        self._enter_test_mode()
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_circuit_threshold', 3)
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_http_backoff_cap', 0)
+        self.addCleanup(self.portal._get_circuit_breaker().reset)
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=503, headers={'Retry-After': '0'})
+
+        with patch.object(type(self.portal), '_get_http_session', return_value=session):
+            response = self.portal._gem_request('GET', f"{self.portal.api_endpoint}/tenders")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(session.request.call_count, 3, "Idempotent call should be retried")
+
+            with self.assertRaises(gem_session.CircuitOpenError):
+                self.portal._gem_request('GET', f"{self.portal.api_endpoint}/tenders")
+            self.assertEqual(session.request.call_count, 3, "Open circuit should not call GeM")
+
+        self.portal.invalidate_recordset()
+        self.assertEqual(self.portal.circuit_state, 'open', "Open circuit should be visible on the portal")
+        self.assertEqual(self.portal.api_error_count, 3, "Errors should be counted")
+        self.assertEqual(self.portal.api_error_rate, 100.0)
+
+        self.portal.action_reset_circuit()
+        self.assertFalse(self.portal._get_circuit_breaker().is_open(), "Reset should close the circuit")
+
+    def test_import_streams_search_pages(self):
+        """Test that imports follow the search pages and upsert in chunks"""
+        self._enter_test_mode()
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('tender_management.gem_sync_page_size', 3)
+        ICP.set_param('tender_management.gem_sync_batch_size', 2)
+
+        with GemStubServer(tenders=7) as server:
+            self.portal.api_endpoint = server.url
+            result = self.portal._import_tenders(import_all=True, user_id=self.env.user.id)
+
+            self.assertEqual(server.stats['bid_search'], 3, "Every result page should be requested once")
+        self.assertEqual(result['created'], 7, "Every tender should be imported")
+        self.assertEqual(result['errors'], 0, result['error_details'])
+        tenders = self._portal_tenders()
+        self.assertEqual(len(tenders), 7)
+        self.assertEqual(tenders.user_id, self.env.user, "Created tenders should get the responsible")
+
+    def test_each_portal_has_its_own_sync_job(self):
+        """Test that portals are synced by their own scheduled action"""
+        self._enter_test_mode()
+        self.assertTrue(self.portal.sync_cron_id, "A sync job should be created with the portal")
+
+        with GemStubServer(tenders=5) as server:
+            self.portal.api_endpoint = server.url
+            with patch.object(type(self.env['ir.cron']), '_trigger') as trigger:
+                self.env['gem.portal']._cron_sync_gem_tenders()
+            self.assertTrue(trigger.called, "Main cron should queue the portal jobs")
+
+            totals = self.portal._cron_sync_portal()
+
+        self.assertEqual(totals['created'], 5)
+        self.assertEqual(self.portal.last_sync_state, 'done')
+        self.assertTrue(self.portal.last_sync_success, "Successful sync should be recorded")
+
+        self.portal.active = False
+        self.assertFalse(self.portal.sync_cron_id.active, "Archived portal should not be synced")
+
+    def test_journaled_payloads_are_replayed_offline(self):
+        """Test that journaled GeM payloads can be replayed without GeM"""
+        self._enter_test_mode()
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_payload_journal', True)
+        Journal = self.env['gem.payload.journal']
+
+        with GemStubServer(tenders=4) as server:
+            self.portal.api_endpoint = server.url
+            self.portal._sync_tenders()
+        entries = Journal.search([('portal_id', '=', self.portal.id)])
+        self.assertEqual(len(entries), 4, "Created tenders should be journaled")
+        self.assertEqual(entries[0]._get_payload()['bidId'], server.bid_id(0))
+        self.assertLess(entries[0].compressed_size, entries[0].payload_size, "Payloads should be compressed")
+
+        self._portal_tenders().unlink()
+        with patch.object(type(self.portal), '_get_http_session') as get_session:
+            totals = Journal._replay([('portal_id', '=', self.portal.id)], batch_size=3)
+        self.assertFalse(get_session.called, "Replay should not call GeM")
+        self.assertEqual(totals['entries'], 4)
+        self.assertEqual(totals['created'], 4, "Replay should recreate the tenders")
+        self.assertEqual(len(Journal.search([('portal_id', '=', self.portal.id)])), 4,
+                         "Replay should not journal the payloads again")
+
+        with self.assertRaises(UserError):
+            entries[0].write({'gem_bid_id': 'GEM/2024/B/9999999'})
+
+    def test_bid_documents_are_streamed_to_gem(self):
+        """Test that bid documents are uploaded before the submission, resuming interrupted uploads"""
+        self._enter_test_mode()
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.gem_upload_chunk_size', 1024)
+        self.portal._create_update_tenders([self._gem_payload('GEM/U1')])
+        tender = self._portal_tenders()
+        bid = self.env['gem.bid'].create({
+            'name': 'Bid GEM/U1',
+            'gem_portal_id': self.portal.id,
+            'tender_id': tender.id,
+            'bid_id': 'GEM/U1',
+        })
+        content = b'%PDF-1.4 ' + b'0' * 3000
+        Document = self.env['tender.document']
+        technical, financial = Document.create([{
+            'name': name,
+            'tender_id': tender.id,
+            'gem_bid_id': bid.id,
+            'document_type': 'bid_document',
+            'file': base64.b64encode(content),
+        } for name in ('Technical Bid', 'Financial Bid')])
+
+        with GemStubServer() as server:
+            self.portal.write({'api_endpoint': server.url, 'chunked_upload_supported': True})
+            token = self.portal._get_token()
+            # GeM already received the first two chunks of an interrupted upload
+            server.uploads['U1'] = {'size': len(content), 'offset': 2048}
+            technical.write({'gem_upload_id': 'U1'})
+            financial.write({'gem_document_id': 'DOC-9'})
+
+            self.assertEqual(bid._upload_documents(token), [])
+            self.assertEqual(server.stats['upload_session'], 0, "Interrupted upload should be resumed")
+            self.assertEqual(server.stats['upload_chunk'], 1, "Only the missing chunk should be sent")
+            self.assertEqual(server.stats['upload_bytes'], len(content) - 2048)
+            self.assertEqual(technical.gem_document_id, 'DOC-U1')
+            self.assertFalse(technical.gem_upload_id, "Completed upload session should be forgotten")
+
+            self.portal.chunked_upload_supported = False
+            financial.write({'gem_document_id': False})
+            server.reset_stats()
+            self.assertEqual(bid._upload_documents(token), [])
+            self.assertEqual(server.stats['upload'], 1, "Document should be sent as one multipart request")
+            self.assertGreater(server.stats['upload_bytes'], len(content))
+
+        documents = bid._prepare_bid_data()['documents']
+        self.assertEqual(sorted(doc['documentId'] for doc in documents),
+                         sorted([technical.gem_document_id, financial.gem_document_id]))
+        self.assertFalse(any('content' in doc for doc in documents), "Submission should not inline files")
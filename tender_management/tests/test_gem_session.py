@@ -0,0 +1,52 @@
+from odoo.tests.common import TransactionCase, tagged
+import logging
+import time
+
+import requests
+
+from odoo.addons.tender_management.external.gem_api import gem_session
+from odoo.addons.tender_management.tests.gem_stub_server import GemStubServer
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestGemSession(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestGemSession, cls).setUpClass()
+        cls.server = GemStubServer(tenders=10).start()
+        cls.endpoint = cls.server.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        gem_session.close_sessions()
+        super(TestGemSession, cls).tearDownClass()
+
+    def _run_requests(self, get, count=50):
+        self.server.reset_stats()
+        start = time.perf_counter()
+        for _i in range(count):
+            self.assertEqual(get(f"{self.endpoint}/tenders/recent", timeout=5).status_code, 200)
+        return self.server.stats['connections'], time.perf_counter() - start
+
+    def test_session_is_shared_per_endpoint(self):
+        """Test that calls to the same host reuse one session"""
+        first = gem_session.session_for(self.env, f"{self.endpoint}/auth/token")
+        second = gem_session.session_for(self.env, f"{self.endpoint}/tenders/42")
+        self.assertIs(first, second, "Same host should share its connection pool")
+
+    def test_pooled_session_reuses_connections(self):
+        """Benchmark handshakes and latency of pooled vs bare requests"""
+        bare_connections, bare_duration = self._run_requests(requests.get)
+        session = gem_session.session_for(self.env, self.endpoint)
+        pooled_connections, pooled_duration = self._run_requests(session.get)
+
+        _logger.info(
+            "GeM HTTP benchmark: bare %s connections in %.3fs, pooled %s connections in %.3fs",
+            bare_connections, bare_duration, pooled_connections, pooled_duration
+        )
+        self.assertEqual(bare_connections, 50, "Bare requests should open one connection per call")
+        self.assertEqual(pooled_connections, 1, "Pooled session should keep its connection alive")
@@ -1,6 +1,47 @@
 from odoo.tests.common import TransactionCase, tagged
+from concurrent.futures.process import BrokenProcessPool
 from unittest.mock import patch, MagicMock
 import base64
+import datetime
+import json
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from odoo.exceptions import UserError
+
+from odoo.addons.tender_management.external.ocr_service import content_html, field_extraction, image_preprocess, ocr_parallel, page_classifier
+from odoo.addons.tender_management.external.ocr_service.ocr_processor import OCRProcessor
+
+
+def _fake_ocr_page(path, page_index, dpi, lang, config):
+    """Page OCR stand-in whose later pages finish first"""
+    time.sleep(0.01 * (4 - page_index % 4))
+    if page_index == 5:
+        raise ValueError("Unreadable page")
+    return {
+        'page': page_index,
+        'text': f"Text of page {page_index + 1}",
+        'confidence': 50.0 + page_index,
+        'method': 'ocr',
+        'duration': 0.0,
+    }
+
+
+def _page_image(lines=40, size=(1240, 1754), angle=0.0, dpi=None):
+    """Scanned notice stand-in: lines of text on off-white paper, A4 at 150 DPI"""
+    paper = (248, 246, 240)
+    image = Image.new('RGB', size, paper)
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        draw.text((100, 100 + line * 36), "Bid Submission Closing Date 15/03/2024, Tender ID GEM/2024/B/%04d" % line,
+                  fill=(20, 20, 20))
+    if angle:
+        image = image.rotate(angle, fillcolor=paper)
+    if dpi:
+        image.info['dpi'] = (dpi, dpi)
+    return image
 
 
 @tagged('post_install', '-at_install', 'external')
@@ -108,3 +149,690 @@ class TestOCR(TransactionCase):
         
         with self.assertRaises(Exception):
             wizard.action_process_document()
+
+
+@tagged('post_install', '-at_install')
+class TestOCRParallel(TransactionCase):
+
+    def test_pages_are_returned_in_order(self):
+        """Test that pages OCRed in parallel keep their order and confidence"""
+        engine = ocr_parallel.ParallelPageOCR(max_workers=3, memory_budget=0, page_func=_fake_ocr_page)
+        progress = []
+
+        pages = engine.run('/tmp/unused.pdf', [0, 1, 2, 3, 4, 5, 6], progress=lambda done, total: progress.append(done))
+
+        self.assertEqual([page['page'] for page in pages], list(range(7)), "Pages should be in order")
+        self.assertEqual(pages[3]['text'], "Text of page 4")
+        self.assertEqual(pages[3]['confidence'], 53.0)
+        self.assertEqual(pages[5]['confidence'], 0.0, "Failed page should have no confidence")
+        self.assertIn('error', pages[5])
+        self.assertEqual(progress[-1], 7, "Progress should reach the page count")
+
+    def test_memory_budget_limits_pages_in_flight(self):
+        """Test that the memory budget bounds the number of rasterized pages"""
+        raster = ocr_parallel.page_raster_bytes(300)
+        engine = ocr_parallel.ParallelPageOCR(max_workers=8, memory_budget=2 * raster, dpi=300)
+        self.assertEqual(engine.max_in_flight, 2)
+        engine.memory_budget = raster // 2
+        self.assertEqual(engine.max_in_flight, 1, "At least one page should be processed")
+
+        engine.page_func = _fake_ocr_page
+        pages = engine.run('/tmp/unused.pdf', [2, 0, 1])
+        self.assertEqual([page['page'] for page in pages], [0, 1, 2])
+
+    def test_pages_are_merged(self):
+        """Test that page results merge into the document text and confidence"""
+        content, confidence = ocr_parallel.merge_pages([
+            {'page': 0, 'text': 'First', 'confidence': 95.0},
+            {'page': 1, 'text': 'Second', 'confidence': 65.0},
+        ])
+        self.assertEqual(content, "--- Page 1 ---\nFirst\n\n--- Page 2 ---\nSecond\n\n")
+        self.assertEqual(confidence, 80.0)
+
+    def test_text_is_rebuilt_from_tesseract_data(self):
+        """Test that the page text is rebuilt from a single Tesseract run"""
+        data = {
+            'text': ['', 'Tender', 'Notice', '', 'Value:', '100', 'Closing'],
+            'block_num': [1, 1, 1, 1, 1, 1, 2],
+            'par_num': [1, 1, 1, 1, 1, 1, 1],
+            'line_num': [1, 1, 1, 2, 2, 2, 1],
+        }
+        self.assertEqual(ocr_parallel.text_from_data(data), "Tender Notice\nValue: 100\n\nClosing")
+
+
+class OCRJobCase(TransactionCase):
+    """Base of the OCR job tests, the queue workers are never woken up"""
+
+    def setUp(self):
+        super(OCRJobCase, self).setUp()
+        patcher = patch.object(type(self.env['ir.cron']), '_trigger')
+        self.cron_trigger = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_ocr(self, tender, data=b'Tender ID: OCR/2024/1\nEstimated value: 1,000', file_name='notice.txt', **vals):
+        document = self.env['tender.document'].create({
+            'name': f'{file_name} of {tender.title}',
+            'tender_id': tender.id,
+            'file': base64.b64encode(data),
+            'file_name': file_name,
+        })
+        return self.env['tender.ocr'].create(dict(vals, document_id=document.id, tender_id=tender.id))
+
+
+@tagged('post_install', '-at_install')
+class TestOCRQueue(OCRJobCase):
+
+    def setUp(self):
+        super(TestOCRQueue, self).setUp()
+        now = datetime.datetime.now()
+        self.late_tender, self.early_tender = self.env['tender.tender'].create([{
+            'name': name,
+            'title': name,
+            'submission_date': now + datetime.timedelta(days=days),
+        } for name, days in (('OCR Queue Late Tender', 30), ('OCR Queue Early Tender', 3))])
+
+    def test_jobs_run_in_the_background_by_deadline(self):
+        """Test that queued OCR jobs run on the workers, earliest deadline first"""
+        late, early = self._create_ocr(self.late_tender), self._create_ocr(self.early_tender)
+        (late | early).action_process()
+        self.assertEqual(set((late | early).mapped('state')), {'queued'}, "Processing should be deferred")
+        self.assertTrue(self.cron_trigger.called, "Queue workers should be woken up")
+
+        self.assertEqual(self.env['tender.ocr']._claim_ocr_job(), early, "Closest deadline should run first")
+        late.priority = '1'
+        self.assertEqual(self.env['tender.ocr']._claim_ocr_job(), late, "Urgent jobs should run first")
+
+        self.env['tender.ocr']._cron_process_ocr_queue()
+        self.assertEqual(set((late | early).mapped('state')), {'done'})
+        self.assertEqual(early.progress, 100.0)
+        self.assertEqual(early.tender_id_number, 'OCR/2024/1')
+
+    def test_failed_jobs_are_retried_with_backoff(self):
+        """Test that failing OCR jobs are retried later, then fail"""
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_max_attempts', 2)
+        job = self._create_ocr(self.early_tender)
+        job.write({'state': 'queued'})
+        TenderOCR = type(self.env['tender.ocr'])
+
+        with patch.object(TenderOCR, '_process_document', side_effect=RuntimeError("Tesseract crashed")):
+            self.env['tender.ocr']._cron_process_ocr_queue()
+            self.assertEqual(job.state, 'queued', "Failed job should be queued again")
+            self.assertEqual(job.attempt_count, 1)
+            self.assertGreater(job.next_attempt_date, datetime.datetime.now(), "Retry should be delayed")
+            self.assertFalse(self.env['tender.ocr']._claim_ocr_job(), "Delayed job should not run yet")
+
+            job.next_attempt_date = datetime.datetime.now() - datetime.timedelta(seconds=1)
+            self.env['tender.ocr']._cron_process_ocr_queue()
+        self.assertEqual(job.state, 'failed', "Job should fail after the last attempt")
+        self.assertEqual(job.error_message, "Tesseract crashed")
+
+        other = self._create_ocr(self.late_tender)
+        other.write({'state': 'queued'})
+        with patch.object(TenderOCR, '_process_document', side_effect=UserError("Unsupported file")):
+            self.env['tender.ocr']._cron_process_ocr_queue()
+        self.assertEqual(other.state, 'failed', "User errors should not be retried")
+        self.assertEqual(other.attempt_count, 1)
+
+    def test_stuck_jobs_are_claimed_by_heartbeat(self):
+        """Test that processing jobs are claimed again once their worker stops reporting progress"""
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_heartbeat_timeout', 600)
+        now = datetime.datetime.now()
+        running, stuck = self._create_ocr(self.early_tender), self._create_ocr(self.late_tender)
+        (running | stuck).write({'state': 'processing', 'processing_date': now - datetime.timedelta(hours=2)})
+        running.heartbeat_date = now - datetime.timedelta(minutes=1)
+        stuck.heartbeat_date = now - datetime.timedelta(minutes=15)
+
+        self.assertEqual(self.env['tender.ocr']._claim_ocr_job(), stuck, "Silent job should be claimed again")
+        stuck._report_progress(50.0)
+        self.assertFalse(self.env['tender.ocr']._claim_ocr_job(), "Long jobs reporting progress should be left alone")
+
+    def test_worker_count_is_configurable(self):
+        """Test that the number of queue workers follows the configuration"""
+        TenderOCR = self.env['tender.ocr']
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_queue_workers', 3)
+        self.assertEqual(len(TenderOCR._ensure_queue_workers()), 3)
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_queue_workers', 1)
+        workers = TenderOCR._ensure_queue_workers()
+        self.assertEqual(len(workers), 1)
+        self.assertEqual(len(TenderOCR._get_queue_worker_crons().filtered('active')), 1,
+                         "Extra workers should be archived")
+
+
+@tagged('post_install', '-at_install')
+class TestOCRCache(OCRJobCase):
+
+    def setUp(self):
+        super(TestOCRCache, self).setUp()
+        self.tenders = self.env['tender.tender'].create([{
+            'name': f'OCR Cache Tender {index}',
+            'title': f'OCR Cache Tender {index}',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=10),
+        } for index in range(4)])
+        self.env['tender.ocr.cache'].search([]).unlink()
+
+    def test_known_document_is_served_from_cache(self):
+        """Test that a document attached to several tenders is OCRed once"""
+        annexure = b'Standard annexure\nTender ID: STD/ANX/7'
+        first = self._create_ocr(self.tenders[0], annexure, 'annexure.txt')
+        first.action_process()
+        self.assertEqual(first.state, 'queued', "Unknown document should be queued")
+        self.env['tender.ocr']._cron_process_ocr_queue()
+        self.assertEqual(first.state, 'done')
+        self.assertFalse(first.cache_hit)
+        self.assertTrue(first.cache_id, "Result should be cached")
+
+        second = self._create_ocr(self.tenders[1], annexure, 'copy-of-annexure.txt')
+        second.action_process()
+        self.assertEqual(second.state, 'done', "Known document should be completed at once")
+        self.assertTrue(second.cache_hit)
+        self.assertEqual(second.cache_id, first.cache_id)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.tender_id_number, 'STD/ANX/7', "Key information should be extracted")
+
+        other = self._create_ocr(self.tenders[2], b'Another annexure', 'annexure.txt')
+        other.action_process()
+        self.assertEqual(other.state, 'queued', "Cache should be keyed by content, not by name")
+
+        stats = self.env['tender.ocr.cache']._get_statistics()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 50.0)
+
+    def test_cache_key_includes_engine_settings(self):
+        """Test that changing the engine settings OCRs cached documents again"""
+        pages = [
+            {'page': 0, 'text': 'Scanned notice', 'confidence': 70.0, 'method': 'ocr'},
+            {'page': 1, 'text': 'Embedded terms', 'confidence': 95.0, 'method': 'text'},
+        ]
+        TenderOCR = type(self.env['tender.ocr'])
+        scan = b'%PDF-1.4 scanned notice'
+        with patch.object(ocr_parallel, 'engine_version', return_value='5.3.0'), \
+                patch.object(TenderOCR, '_process_pdf', return_value=pages) as process_pdf:
+            first = self._create_ocr(self.tenders[0], scan, 'notice.pdf')
+            first.action_process()
+            self.env['tender.ocr']._cron_process_ocr_queue()
+            self.assertEqual(process_pdf.call_count, 1)
+            self.assertEqual(first.confidence_score, 82.5)
+            cached_pages = first.cache_id._get_pages()
+            self.assertEqual([page['confidence'] for page in cached_pages], [70.0, 95.0])
+            self.assertEqual(first.content[cached_pages[1]['start']:cached_pages[1]['end']], 'Embedded terms',
+                             "Page spans should locate the page text")
+
+            second = self._create_ocr(self.tenders[1], scan, 'notice.pdf')
+            second.action_process()
+            self.assertTrue(second.cache_hit)
+            self.assertEqual(second.confidence_score, 82.5)
+
+            self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_dpi', 400)
+            third = self._create_ocr(self.tenders[2], scan, 'notice.pdf')
+            third.action_process()
+            self.assertEqual(third.state, 'queued', "Other settings should miss the cache")
+
+            forced = self._create_ocr(self.tenders[3], scan, 'notice.pdf')
+            forced.write({'skip_cache': True})
+            forced.action_process()
+            self.env['tender.ocr']._cron_process_ocr_queue()
+            self.assertEqual(process_pdf.call_count, 3, "Bypassing the cache should OCR again")
+            self.assertFalse(forced.cache_hit)
+            self.assertEqual(forced.cache_id, third.cache_id, "Refreshed result should replace the cached one")
+
+
+class _FakePage:
+    """PyPDF2 page stand-in of an A4 page"""
+
+    def __init__(self, text, coverage=0.0):
+        self.text = text
+        self.coverage = coverage
+        self.mediabox = MagicMock(width=595, height=842)
+        self.extracted = 0
+
+    def extract_text(self):
+        self.extracted += 1
+        return self.text
+
+
+@tagged('post_install', '-at_install')
+class TestOCRPageClassifier(TransactionCase):
+
+    BORN_DIGITAL = "Notice inviting tender for the supply of laboratory equipment. " * 20
+
+    def test_pages_are_classified(self):
+        """Test that pages use their text layer, OCR or both"""
+        with patch.object(page_classifier, 'image_coverage', side_effect=lambda page: page.coverage):
+            cases = [
+                (_FakePage(self.BORN_DIGITAL), 'text'),
+                (_FakePage(''), 'ocr'),
+                (_FakePage('12'), 'ocr'),
+                (_FakePage('(cid:12)(cid:7)(cid:44)(cid:3) ' * 30), 'ocr'),
+                (_FakePage('��#$%&*@!~^ ' * 30), 'ocr'),
+                (_FakePage('Office of the Executive Engineer, PWD', coverage=0.9), 'both'),
+                (_FakePage(self.BORN_DIGITAL * 3, coverage=1.0), 'text'),
+            ]
+            for index, (page, expected) in enumerate(cases):
+                decision, _text = page_classifier.classify_page(page, index)
+                self.assertEqual(decision['decision'], expected, f"Page {index}: {decision}")
+
+    def test_glyph_sanity(self):
+        """Test that garbage text layers score low"""
+        self.assertGreater(page_classifier.glyph_sanity("Tender value: Rs. 1,20,000"), 0.9)
+        self.assertGreater(page_classifier.glyph_sanity("निविदा सूचना दिनांक"), 0.9, "Indic scripts are readable")
+        self.assertLess(page_classifier.glyph_sanity("(cid:3)(cid:4)(cid:5) ab"), 0.5)
+        self.assertLess(page_classifier.glyph_sanity("#$%& *@!~ ^|{}"), 0.5)
+
+    def test_decisions_are_recorded_and_reused(self):
+        """Test that a re-run on the same file skips the classification"""
+        tender = self.env['tender.tender'].create({
+            'name': 'Classifier Tender',
+            'title': 'Classifier Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        document = self.env['tender.document'].create({
+            'name': 'Mixed Notice',
+            'tender_id': tender.id,
+            'file': base64.b64encode(b'%PDF-1.4 mixed notice'),
+            'file_name': 'mixed.pdf',
+        })
+        ocr = self.env['tender.ocr'].create({'document_id': document.id, 'tender_id': tender.id,
+                                            'skip_cache': True})
+        pages = [_FakePage(self.BORN_DIGITAL), _FakePage(''), _FakePage('Typed header of a scanned notice', coverage=0.8)]
+        engine = ocr_parallel.ParallelPageOCR(max_workers=1, memory_budget=0, page_func=_fake_ocr_page)
+        TenderOCR = type(self.env['tender.ocr'])
+
+        with patch('odoo.addons.tender_management.models.ocr.PyPDF2.PdfReader', return_value=MagicMock(pages=pages)), \
+                patch.object(TenderOCR, '_get_ocr_engine', return_value=engine), \
+                patch.object(page_classifier, 'image_coverage', side_effect=lambda page: page.coverage), \
+                patch.object(page_classifier, 'classify_page', wraps=page_classifier.classify_page) as classify:
+            ocr._process_document()
+            self.assertEqual(classify.call_count, 3)
+            decisions = json.loads(ocr.page_decisions_json)
+            self.assertEqual([decision['decision'] for decision in decisions], ['text', 'ocr', 'both'])
+            self.assertEqual((ocr.page_count, ocr.ocr_page_count), (3, 2), "Born-digital page should not be OCRed")
+            self.assertIn("Typed header of a scanned notice\nText of page 3", ocr.content, "Both texts should be kept")
+
+            pages[1].extracted = 0
+            ocr._process_document()
+            self.assertEqual(classify.call_count, 3, "Recorded decisions should be reused")
+            self.assertEqual(pages[1].extracted, 0, "Text layer of OCRed pages should not be read")
+            self.assertEqual(ocr.ocr_page_count, 2)
+
+
+@tagged('post_install', '-at_install')
+class TestOCRFieldExtraction(TransactionCase):
+
+    NOTICE = (
+        "NOTICE INVITING TENDER\n"
+        "Budget: 5,000\n"
+        "Tender ID: GEM/2024/B/4567\n"
+        "Issued by: Public Works Department\n"
+        "Bid Submission Closing Date: 15th Mar 2024 03:00 PM\n"
+        "Estimated value: Rs. 1,20,000.50\n"
+        "Contact tender.cell@pwd.gov.in, Phone: +91 98765 43210\n"
+    )
+
+    def test_fields_are_extracted_in_one_scan(self):
+        """Test that fields come with their position and confidence"""
+        result = field_extraction.get_engine('tender_ocr').extract(self.NOTICE)
+
+        self.assertEqual(result.value('tender_id'), 'GEM/2024/B/4567')
+        self.assertEqual(result.value('tender_value'), 120000.5, "Specific patterns should win over loose ones")
+        self.assertEqual(result.value('submission_deadline'), datetime.datetime(2024, 3, 15, 15, 0))
+        self.assertEqual(result.value('issuing_authority'), 'Public Works Department')
+        for field, match in result.to_dict().items():
+            self.assertEqual(self.NOTICE[match['start']:match['end']], match['raw'], f"Position of {field}")
+        self.assertEqual(result.to_dict()['tender_id']['confidence'], 0.9)
+
+        generic = field_extraction.get_engine('generic').extract(self.NOTICE)
+        self.assertEqual(generic.values('email'), ['tender.cell@pwd.gov.in'])
+        self.assertEqual(generic.values('phone_number'), ['+91 98765 43210'])
+        phone = generic.to_dict()['phone_number']
+        self.assertEqual(self.NOTICE[phone['start']:phone['end']], phone['raw'], "Span should exclude trailing whitespace")
+        self.assertIn(120000.5, generic.values('monetary_value'))
+
+    def test_confidence_follows_page_ocr_confidence(self):
+        """Test that fields found on poorly OCRed pages are less trusted"""
+        split = self.NOTICE.index('Estimated')
+        pages = [
+            {'page': 0, 'start': 0, 'end': split, 'confidence': 100.0},
+            {'page': 1, 'start': split, 'end': len(self.NOTICE), 'confidence': 50.0},
+        ]
+        fields = field_extraction.get_engine('tender_ocr').extract(self.NOTICE, pages=pages).to_dict()
+        self.assertEqual(fields['tender_id']['confidence'], 0.9)
+        self.assertEqual(fields['tender_value']['confidence'], 0.45)
+
+    def test_processor_profiles(self):
+        """Test the extraction of the OCR processor document types"""
+        processor = OCRProcessor(self.env)
+        corrigendum = processor.extract_key_information({'success': True, 'text': (
+            "Corrigendum No: 2\nBid Number: GEM/2024/B/4567\nRevised Date: 20/03/2024\n"
+            "Amendment 1: Closing date extended\n\nAmendment 2: EMD waived\n\n"
+        )}, 'corrigendum')
+        self.assertEqual(corrigendum['corrigendum_no'], 2)
+        self.assertEqual(corrigendum['tender_id'], 'GEM/2024/B/4567')
+        self.assertEqual(corrigendum['revised_date'], '20/03/2024')
+        self.assertEqual(corrigendum['changes'], ['Closing date extended', 'EMD waived'])
+
+    def test_key_information_is_stored_with_positions(self):
+        """Test that OCR jobs keep the position and confidence of the fields"""
+        tender = self.env['tender.tender'].create({
+            'name': 'Extraction Tender',
+            'title': 'Extraction Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        document = self.env['tender.document'].create({
+            'name': 'Notice',
+            'tender_id': tender.id,
+            'file': base64.b64encode(self.NOTICE.encode()),
+            'file_name': 'notice.txt',
+        })
+        ocr = self.env['tender.ocr'].create({'document_id': document.id, 'tender_id': tender.id})
+        ocr.content = self.NOTICE
+        ocr.confidence_score = 100.0
+        ocr._extract_key_information()
+
+        self.assertEqual(ocr.tender_id_number, 'GEM/2024/B/4567')
+        self.assertEqual(ocr.tender_value, 120000.5)
+        fields = json.loads(ocr.extracted_data_json)['fields']
+        self.assertEqual(fields['tender_id']['start'], self.NOTICE.index('GEM/2024/B/4567'))
+
+
+@tagged('post_install', '-at_install')
+class TestOCRContentHtml(TransactionCase):
+
+    def setUp(self):
+        super(TestOCRContentHtml, self).setUp()
+        tender = self.env['tender.tender'].create({
+            'name': 'Rendered Tender',
+            'title': 'Rendered Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        document = self.env['tender.document'].create({
+            'name': 'Scanned Notice',
+            'tender_id': tender.id,
+            'file': base64.b64encode(b'%PDF-1.4'),
+            'file_name': 'notice.pdf',
+        })
+        self.ocr = self.env['tender.ocr'].create({'document_id': document.id, 'tender_id': tender.id})
+
+    def test_page_is_rendered_with_highlights(self):
+        """Test that the key information is highlighted in a single pass"""
+        html = content_html.render_page("Tender ID <b>7</b>\nClosing Date and Budget of the Ministry")
+        self.assertIn('<span style="background-color: #AAAAFF;">Tender ID</span>', html)
+        self.assertIn('<span style="background-color: #FFFF00;">Closing Date</span>', html)
+        self.assertIn('<span style="background-color: #AAFFAA;">Budget</span>', html)
+        self.assertIn('<span style="background-color: #FFAAAA;">Ministry</span>', html)
+        self.assertIn('&lt;b&gt;7&lt;/b&gt;<br/>', html, "OCR text should be escaped")
+
+    def test_content_is_rendered_once_and_paginated(self):
+        """Test that the form reads a single stored page of the content"""
+        pages = [{'page': index, 'text': f"Page {index + 1} text, tender value {index}", 'confidence': 90.0}
+                 for index in range(300)]
+        content, _confidence = ocr_parallel.merge_pages(pages)
+        self.ocr.write({'content': content, 'confidence_score': 90.0})
+        self.ocr._complete()
+
+        self.assertEqual(self.ocr.state, 'done')
+        self.assertTrue(self.ocr.content_html_data, "Rendered pages should be stored")
+        self.assertEqual(self.ocr.content_page_count, 300)
+        self.assertIn('Page 1 text', self.ocr.content_html)
+        self.assertNotIn('Page 2 text', self.ocr.content_html)
+
+        with self.assertQueryCount(0):
+            ocr = self.ocr.with_context(**self.ocr.action_content_next_page()['context'])
+        self.assertEqual(ocr.content_page, 2)
+        self.assertIn('Page 2 text', ocr.content_html)
+        ocr = ocr.with_context(**ocr.action_content_previous_page()['context'])
+        ocr = ocr.with_context(**ocr.action_content_previous_page()['context'])
+        self.assertEqual(ocr.content_page, 1, "Previous page should stop at the first page")
+        self.assertEqual(self.ocr.with_context(content_page=500).content_page, 300, "Page should be clamped")
+
+        with patch.object(content_html, 'render_page', side_effect=AssertionError("Page rendered again")):
+            page = self.ocr._get_content_html_page(300)
+        self.assertEqual(page['page'], 300)
+        self.assertIn('<span style="background-color: #AAFFAA;">tender value</span> 299', page['html'])
+
+    def test_long_text_is_split_into_pages(self):
+        """Test that documents without pages are displayed in bounded pages"""
+        line = 'Bid Submission Closing Date is mentioned on every line of this long annexure\n'
+        self.ocr.write({'content': line * (content_html.MAX_PAGE_CHARS // len(line) * 3), 'confidence_score': 100.0})
+        self.ocr._render_content_html()
+
+        self.assertGreaterEqual(self.ocr.content_page_count, 3)
+        self.assertLessEqual(len(self.ocr.content_html), 3 * content_html.MAX_PAGE_CHARS)
+
+
+@tagged('post_install', '-at_install')
+class TestOCRPages(OCRJobCase):
+
+    BORN_DIGITAL = TestOCRPageClassifier.BORN_DIGITAL
+
+    def setUp(self):
+        super(TestOCRPages, self).setUp()
+        self.tender = self.env['tender.tender'].create({
+            'name': 'Paged Tender',
+            'title': 'Paged Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        self.env['ir.config_parameter'].sudo().set_param('tender_management.ocr_page_min_confidence', 60)
+
+    def _run(self, ocr, pages, confidences):
+        """Process the PDF of fake pages, return the pages OCRed and classified"""
+        ocred = []
+
+        def ocr_page(path, page_index, dpi, lang, config):
+            ocred.append(page_index)
+            return dict(_fake_ocr_page(path, page_index, dpi, lang, config), confidence=confidences[page_index])
+
+        engine = ocr_parallel.ParallelPageOCR(max_workers=1, memory_budget=0, page_func=ocr_page)
+        with patch('odoo.addons.tender_management.models.ocr.PyPDF2.PdfReader', return_value=MagicMock(pages=pages)), \
+                patch.object(type(ocr), '_get_ocr_engine', return_value=engine), \
+                patch.object(page_classifier, 'page_hash', side_effect=lambda page: page.digest), \
+                patch.object(page_classifier, 'image_coverage', side_effect=lambda page: page.coverage), \
+                patch.object(page_classifier, 'classify_page', wraps=page_classifier.classify_page) as classify:
+            ocr._process_document()
+        return ocred, [call.args[1] for call in classify.call_args_list]
+
+    def test_pages_are_stored_and_aggregated(self):
+        """Test that the document content and confidence come from its pages"""
+        ocr = self._create_ocr(self.tender, b'%PDF-1.4 paged notice', 'paged.pdf', skip_cache=True)
+        pages = [_FakePage(self.BORN_DIGITAL), _FakePage(''), _FakePage('')]
+        for index, page in enumerate(pages):
+            page.digest = f'page-{index}'
+
+        ocred, _classified = self._run(ocr, pages, {1: 50.0, 2: 90.0})
+
+        self.assertEqual(ocred, [1, 2])
+        self.assertEqual(ocr.page_ids.mapped('page_index'), [0, 1, 2])
+        self.assertEqual(ocr.page_ids.mapped('method'), ['text', 'ocr', 'ocr'])
+        self.assertEqual(ocr.page_ids.mapped('image_hash'), ['page-0', 'page-1', 'page-2'])
+        self.assertTrue(ocr.page_ids[1].engine.startswith('tesseract'))
+        self.assertEqual((ocr.page_count, ocr.ocr_page_count), (3, 2))
+        self.assertAlmostEqual(ocr.confidence_score, (page_classifier.TEXT_LAYER_CONFIDENCE + 50.0 + 90.0) / 3)
+        self.assertIn("--- Page 3 ---\nText of page 3", ocr.content)
+
+    def test_only_flagged_and_changed_pages_are_read_again(self):
+        """Test that a re-run keeps the unchanged pages"""
+        ocr = self._create_ocr(self.tender, b'%PDF-1.4 partly scanned notice', 'partly-scanned.pdf', skip_cache=True)
+        pages = [_FakePage(self.BORN_DIGITAL), _FakePage(''), _FakePage('')]
+        for index, page in enumerate(pages):
+            page.digest = f'page-{index}'
+        self._run(ocr, pages, {1: 50.0, 2: 90.0})
+        ocr.state = 'done'
+
+        ocr.action_reprocess_low_confidence()
+        self.assertEqual(ocr.state, 'queued')
+        self.assertEqual(ocr.page_ids.filtered('to_reprocess').mapped('page_index'), [1])
+        ocred, classified = self._run(ocr, pages, {1: 85.0})
+        self.assertEqual(ocred, [1], "Only the low confidence page should be OCRed")
+        self.assertEqual(classified, [], "Kept and recorded pages should not be classified again")
+        self.assertFalse(ocr.page_ids.filtered('to_reprocess'))
+        self.assertEqual(ocr.page_ids.mapped('confidence'), [page_classifier.TEXT_LAYER_CONFIDENCE, 85.0, 90.0])
+        self.assertAlmostEqual(ocr.confidence_score, (page_classifier.TEXT_LAYER_CONFIDENCE + 85.0 + 90.0) / 3)
+
+        ocr.state = 'done'
+        pages[0] = _FakePage(self.BORN_DIGITAL + " Amended.")
+        pages[0].digest = 'page-0-amended'
+        ocr.action_reprocess()
+        ocred, classified = self._run(ocr, pages, {})
+        self.assertEqual(ocred, [], "Changed text page should not need OCR")
+        self.assertEqual(classified, [], "Decisions recorded for the file should be reused")
+        self.assertIn("Amended.", ocr.page_ids[0].text)
+        self.assertIn("Amended.", ocr.content)
+        self.assertEqual(ocr.page_ids[2].image_hash, 'page-2')
+
+        with self.assertRaises(UserError):
+            ocr.page_ids[0].action_reprocess()
+
+    def test_engine_errors_are_retried(self):
+        """Test that OCR engine crashes are retried, unreadable files fail at once"""
+        damaged = self._create_ocr(self.tender, b'%PDF-1.4 truncated notice', 'damaged.pdf', skip_cache=True)
+        damaged._run_ocr_job()
+        self.assertEqual(damaged.state, 'failed', "Unreadable PDF should not be retried")
+        self.assertEqual(damaged.attempt_count, 1)
+
+        crashed = self._create_ocr(self.tender, b'%PDF-1.4 scanned notice', 'scanned.pdf', skip_cache=True)
+        page = _FakePage('')
+        page.digest = 'page-0'
+        engine = MagicMock()
+        engine.run.side_effect = BrokenProcessPool("A page worker died")
+        with patch('odoo.addons.tender_management.models.ocr.PyPDF2.PdfReader', return_value=MagicMock(pages=[page])), \
+                patch.object(type(crashed), '_get_ocr_engine', return_value=engine), \
+                patch.object(page_classifier, 'page_hash', side_effect=lambda page: page.digest), \
+                patch.object(page_classifier, 'image_coverage', side_effect=lambda page: page.coverage):
+            crashed._run_ocr_job()
+        self.assertEqual(crashed.state, 'queued', "Engine crash should be retried")
+        self.assertTrue(crashed.next_attempt_date)
+        self.assertIn("A page worker died", crashed.error_message)
+
+    def test_reprocessing_bypasses_the_cache_once(self):
+        """Test that a reprocessed document is OCRed again, then uses the cache as before"""
+        ocr = self._create_ocr(self.tender, b'Tender ID: PAGE/2', 'reprocessed.txt')
+        ocr.action_process()
+        self.env['tender.ocr']._cron_process_ocr_queue()
+
+        ocr.action_reprocess()
+        self.assertTrue(ocr.refresh_cache)
+        self.assertFalse(ocr.skip_cache, "Reprocessing should not change the cache setting")
+        self.assertFalse(ocr._process_from_cache(), "Reprocessed document should be OCRed again")
+        self.env['tender.ocr']._cron_process_ocr_queue()
+        self.assertEqual(ocr.state, 'done')
+        self.assertFalse(ocr.cache_hit)
+        self.assertFalse(ocr.refresh_cache, "Cache should only be bypassed once")
+
+    def test_cached_result_is_split_into_pages(self):
+        """Test that documents served from the OCR cache get their pages"""
+        self.env['tender.ocr.cache'].search([]).unlink()
+        first = self._create_ocr(self.tender, b'Tender ID: PAGE/1', 'annexure.txt')
+        first.action_process()
+        self.env['tender.ocr']._cron_process_ocr_queue()
+        second = self._create_ocr(self.tender, b'Tender ID: PAGE/1', 'annexure-copy.txt')
+        second.action_process()
+
+        self.assertTrue(second.cache_hit)
+        for ocr in first | second:
+            self.assertEqual(len(ocr.page_ids), 1)
+            self.assertEqual(ocr.page_ids.text, 'Tender ID: PAGE/1')
+            self.assertEqual(ocr.content, 'Tender ID: PAGE/1')
+
+
+@tagged('post_install', '-at_install')
+class TestOCRPreprocess(TransactionCase):
+
+    def setUp(self):
+        super(TestOCRPreprocess, self).setUp()
+        tender = self.env['tender.tender'].create({
+            'name': 'Scanned Tender',
+            'title': 'Scanned Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        document = self.env['tender.document'].create({
+            'name': 'Scanned Notice',
+            'tender_id': tender.id,
+            'file': base64.b64encode(b'scan'),
+            'file_name': 'notice.png',
+        })
+        self.ocr = self.env['tender.ocr'].create({'document_id': document.id, 'tender_id': tender.id})
+        self.ICP = self.env['ir.config_parameter'].sudo()
+
+    def test_images_are_scaled_down_to_the_ocr_resolution(self):
+        """Test that large scans are scaled down and small ones kept"""
+        image, scale = image_preprocess.normalize(_page_image(dpi=600))
+        self.assertEqual((image.size, scale), ((620, 877), 0.5), "600 DPI scan should be scaled to 300 DPI")
+
+        image, scale = image_preprocess.normalize(_page_image(size=(4000, 6000)))
+        self.assertEqual(image.size[1], image_preprocess.DEFAULT_MAX_SIDE, "Photo should fit an A4 page")
+
+        page = _page_image()
+        image, scale = image_preprocess.normalize(page)
+        self.assertIs(image, page, "Images should never be scaled up")
+        self.assertEqual(scale, 1.0)
+
+    def test_blank_pages_are_skipped(self):
+        """Test that blank pages are detected and not returned for OCR"""
+        image, report = image_preprocess.ImagePreprocessor().run(_page_image(lines=0))
+        self.assertIsNone(image)
+        self.assertTrue(report['blank'])
+
+        image, report = image_preprocess.ImagePreprocessor().run(_page_image())
+        self.assertIsNotNone(image)
+        self.assertFalse(report['blank'])
+        self.assertGreater(report['ink_ratio'], image_preprocess.BLANK_INK_RATIO)
+
+    def test_skewed_pages_are_straightened(self):
+        """Test that the skew is measured and corrected"""
+        for angle in (3.0, -2.0):
+            with self.subTest(angle=angle):
+                image, report = image_preprocess.ImagePreprocessor(stages=('grayscale', 'deskew')).run(
+                    _page_image(angle=angle)
+                )
+                self.assertAlmostEqual(report['skew'], angle, delta=image_preprocess.SKEW_STEP)
+                self.assertAlmostEqual(image_preprocess.estimate_skew(np.asarray(image)), 0.0,
+                                       delta=image_preprocess.SKEW_STEP)
+
+    def test_binarization_follows_uneven_lighting(self):
+        """Test that the adaptive threshold keeps the text of a shaded page and its paper white"""
+        gray = image_preprocess.to_grayscale(_page_image()).astype(np.float32)
+        # Lighting fading to half across the page
+        gray = (gray * np.linspace(1.0, 0.45, gray.shape[1])[None, :]).astype(np.uint8)
+
+        binary = image_preprocess.binarize(gray)
+
+        self.assertEqual(set(np.unique(binary)), {0, 255})
+        self.assertEqual(binary[100:115, 100:1200].min(), 0, "Text should be ink on both sides")
+        self.assertEqual(binary[1600:1700, 1100:1200].min(), 255, "Shaded paper should stay white")
+
+    def test_stage_timings_are_reported(self):
+        """Test that every enabled stage is timed"""
+        stages = image_preprocess.parse_stages('normalize, grayscale,deskew,unknown')
+        self.assertEqual(stages, ('normalize', 'grayscale', 'deskew'))
+
+        image, report = image_preprocess.ImagePreprocessor(stages).run(_page_image(dpi=600))
+        self.assertEqual(image.mode, 'L')
+        self.assertEqual(list(report['timings']), list(stages))
+        self.assertEqual(report['scale'], 0.5)
+        merged = image_preprocess.merge_reports([report, report])
+        self.assertAlmostEqual(merged['timings']['deskew'], 2 * report['timings']['deskew'])
+
+    def test_stages_are_configurable(self):
+        """Test that the stages come from the system parameters and key the OCR cache"""
+        self.ICP.set_param('tender_management.ocr_preprocess_stages', 'normalize,grayscale')
+        self.assertEqual(self.ocr._get_image_preprocessor().stages, ('normalize', 'grayscale'))
+        settings = self.ocr._get_ocr_cache_settings()
+        self.assertEqual(settings['preprocess'], 'normalize,grayscale')
+        self.assertIn('normalize+grayscale', self.ocr._get_engine_label('ocr'))
+
+        self.ICP.set_param('tender_management.ocr_preprocess_stages', 'none')
+        self.assertIsNone(self.ocr._get_image_preprocessor())
+        self.assertNotEqual(self.ocr._get_ocr_cache_settings(), settings, "Cached results should not be reused")
+        page = _page_image()
+        with patch.object(ocr_parallel, 'ocr_image', return_value=("Text", 90.0)) as ocr_image:
+            self.ocr._ocr_image(page)
+        self.assertIs(ocr_image.call_args.args[0], page, "Disabled preprocessing should OCR the image as it is")
+
+    def test_blank_images_are_not_ocred(self):
+        """Test that Tesseract is not run on blank images and pages"""
+        with patch.object(ocr_parallel, 'ocr_image', side_effect=AssertionError("Blank page OCRed")):
+            self.assertEqual(self.ocr._ocr_image(_page_image(lines=0)), ("", 100.0))
+            with patch.object(ocr_parallel, 'rasterize_page', return_value=[_page_image(lines=0)]):
+                page = ocr_parallel.ocr_pdf_page('/tmp/unused.pdf', 0, preprocess=self.ocr._get_image_preprocessor())
+        self.assertTrue(page['blank'])
+        self.assertEqual((page['text'], page['confidence']), ('', 100.0))
+        self.assertIn('blank', page['preprocess']['timings'])
@@ -0,0 +1,278 @@
+from odoo.tests.common import TransactionCase, tagged
+import base64
+import datetime
+import difflib
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from odoo.addons.tender_management.external.ocr_service import field_extraction, image_preprocess, ocr_parallel, ocr_stream
+
+_logger = logging.getLogger(__name__)
+
+# Sizes of the OCR text of the extraction benchmark, e.g. OCR_BENCHMARK_MB=1,16
+BENCHMARK_SIZES = [
+    int(size) for size in os.environ.get('OCR_BENCHMARK_MB', '1,4').split(',') if size
+]
+# Size of the scanned document of the memory benchmark, e.g. OCR_BENCHMARK_DOCUMENT_MB=200
+DOCUMENT_SIZE = int(os.environ.get('OCR_BENCHMARK_DOCUMENT_MB', '50')) * 1024 * 1024
+# Scan defects of the preprocessing fixture corpus, one page each
+SCAN_VARIANTS = ('clean', 'skewed', 'shaded', 'noisy', 'blank')
+# Stage sets compared by the preprocessing benchmark
+PREPROCESS_PROFILES = {
+    'none': (),
+    'default': image_preprocess.parse_stages(image_preprocess.DEFAULT_STAGES),
+    'all': image_preprocess.STAGES,
+}
+
+NOTICE_TEMPLATE = (
+    "--- Page {page} ---\n"
+    "NOTICE INVITING TENDER\n"
+    "Tender ID: GEM/2024/B/{number}\n"
+    "Issued by: Public Works Department Division {division}\n"
+    "Bid Submission Closing Date: {day:02d}/03/2024 03:00 PM\n"
+    "Estimated value: Rs. {lakhs},{thousands:02d},000.00\n"
+    "Contact tender.cell{division}@pwd.gov.in, Phone: +91 98765 {number:05d}\n"
+    "The bidder shall submit the technical and financial bids online before the due date. "
+    "Bids received after the closing date will not be considered under any circumstances.\n\n"
+)
+
+
+def synthetic_notices(size):
+    """OCR text of about ``size`` bytes made of tender notices"""
+    rng = random.Random(size)
+    parts, length, page = [], 0, 0
+    while length < size:
+        page += 1
+        part = NOTICE_TEMPLATE.format(
+            page=page, number=rng.randrange(100000), division=rng.randrange(1, 40),
+            day=rng.randrange(1, 29), lakhs=rng.randrange(1, 99), thousands=rng.randrange(100),
+        )
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)
+
+
+def extract_per_rule(text, rules):
+    """Matches of every field, scanning the whole text once per rule
+
+    The way fields were extracted before the single pass engine, kept as
+    the reference of the benchmark.
+
+    :return: tuple of the number of matches and the best value of each field
+    """
+    best = {}
+    count = 0
+    for rule in rules:
+        group = 1 if rule.regex.groups else 0
+        for match in rule.regex.finditer(text):
+            raw = match.group(group)
+            value = rule.convert(raw) if raw is not None else None
+            if value in (None, ''):
+                continue
+            count += 1
+            key = (rule.priority, match.start(group))
+            if rule.field not in best or key < best[rule.field][0]:
+                best[rule.field] = (key, value)
+    return count, {field: value for field, (_key, value) in best.items()}
+
+
+def scanned_page(variant, seed=0):
+    """Scan of a tender notice page with a known text: A4 at 600 DPI,
+    with the defect of ``variant``, see ``SCAN_VARIANTS``
+
+    :return: PIL image and the text it shows
+    """
+    rng = random.Random(seed)
+    lines = []
+    for page in range(8):
+        lines.extend(NOTICE_TEMPLATE.format(
+            page=page + 1, number=rng.randint(1000, 9999), division=rng.randint(1, 9), day=rng.randint(1, 28),
+            lakhs=rng.randint(1, 99), thousands=rng.randint(0, 99),
+        ).splitlines()[1:5])
+    # The bitmap font is drawn at 75 DPI and enlarged, it is the only font
+    # available everywhere
+    small = Image.new('L', (620, 877), 255)
+    if variant != 'blank':
+        draw = ImageDraw.Draw(small)
+        for index, line in enumerate(lines):
+            draw.text((40, 30 + index * 20), line, fill=0)
+    page = small.resize((4960, 7016), Image.NEAREST)
+    if variant == 'skewed':
+        page = page.rotate(2.5, resample=Image.BILINEAR, fillcolor=255)
+    gray = np.asarray(page, dtype=np.float32)
+    if variant == 'shaded':
+        gray = gray * np.linspace(1.0, 0.5, gray.shape[1], dtype=np.float32)[None, :]
+    elif variant == 'noisy':
+        gray = gray + np.random.default_rng(seed).normal(0, 25, gray.shape).astype(np.float32)
+    page = Image.fromarray(gray.clip(0, 255).astype(np.uint8)).convert('RGB')
+    page.info['dpi'] = (600, 600)
+    return page, '' if variant == 'blank' else '\n'.join(lines)
+
+
+def text_accuracy(expected, text):
+    """Similarity of the OCR text to the expected one, whitespace aside (0-1)"""
+    expected, text = ' '.join(expected.split()), ' '.join(text.split())
+    if not expected:
+        return 1.0 if not text else 0.0
+    return difflib.SequenceMatcher(None, expected, text, autojunk=False).ratio()
+
+
+@tagged('post_install', '-at_install', '-standard', 'ocr_benchmark')
+class TestOCRBenchmark(TransactionCase):
+    """Throughput of the OCR field extraction
+
+    Not part of the standard test run, select it with
+    ``--test-tags ocr_benchmark``.
+    """
+
+    def _time(self, func):
+        start = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start
+
+    def test_field_extraction_throughput(self):
+        """Benchmark the single pass extraction against one scan per rule"""
+        for profile in ('tender_ocr', 'generic'):
+            engine = field_extraction.get_engine(profile)
+            for size in BENCHMARK_SIZES:
+                with self.subTest(profile=profile, size=size):
+                    text = synthetic_notices(size * 1024 * 1024)
+
+                    result, duration = self._time(lambda: engine.extract(text))
+                    (count, reference), reference_duration = self._time(lambda: extract_per_rule(text, engine.rules))
+
+                    _logger.info(
+                        "OCR extraction benchmark %s (%s MiB): single pass %.3fs (%.1f MiB/s), "
+                        "per rule %.3fs (%.1f MiB/s), %s matches",
+                        profile, size, duration, size / duration if duration else 0.0,
+                        reference_duration, size / reference_duration if reference_duration else 0.0,
+                        sum(len(matches) for matches in result.matches.values())
+                    )
+                    self.assertEqual({field: result.value(field) for field in reference}, reference,
+                                     "Both extractions should find the same first values")
+
+    def _measure_memory(self, label, func):
+        """Run ``func`` and log its peak traced and resident memory"""
+        exact = ocr_stream.reset_peak_rss()
+        tracemalloc.start()
+        try:
+            result = func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        rss = ocr_stream.peak_rss()
+        _logger.info(
+            "OCR memory benchmark %s (%.0f MiB document): %.1f MiB peak memory, %.1f MiB peak RSS%s",
+            label, DOCUMENT_SIZE / 1024 / 1024, peak / 1024 / 1024, rss / 1024 / 1024,
+            "" if exact else " (since start)"
+        )
+        return result, peak
+
+    def test_document_read_memory(self):
+        """Benchmark reading a scanned document from base64 against the filestore"""
+        tender = self.env['tender.tender'].create({
+            'name': 'Memory Benchmark Tender',
+            'title': 'Memory Benchmark Tender',
+            'submission_date': datetime.datetime.now() + datetime.timedelta(days=5),
+        })
+        data = os.urandom(DOCUMENT_SIZE)
+        document = self.env['tender.document'].create({
+            'name': 'Large Scan',
+            'tender_id': tender.id,
+            'file': base64.b64encode(data),
+            'file_name': 'large-scan.pdf',
+        })
+        ocr = self.env['tender.ocr'].create({'document_id': document.id, 'tender_id': tender.id})
+        expected_hash = hashlib.sha256(data).hexdigest()
+        del data
+        document.invalidate_recordset(['file'])
+
+        def read_base64():
+            # Former pipeline: decode the field, hash it, spool it for PyPDF2
+            file_data = base64.b64decode(document.file)
+            file_hash = hashlib.sha256(file_data).hexdigest()
+            with tempfile.NamedTemporaryFile(suffix='.pdf') as temp_file:
+                temp_file.write(file_data)
+                encoded = json.dumps({'image': {'content': base64.b64encode(file_data).decode()}})
+            return file_hash, len(encoded)
+
+        def read_filestore():
+            file_hash = ocr._get_file_hash()
+            with document._file_path() as path:
+                # Hash of documents that did not record theirs
+                self.assertEqual(ocr_stream.hash_file(path), file_hash)
+                stream = ocr_stream.Base64JSONStream({'image': {'content': ocr_stream.PAYLOAD_PLACEHOLDER}}, path)
+                sent = sum(len(block) for block in stream)
+            return file_hash, sent
+
+        (legacy_hash, legacy_sent), legacy_peak = self._measure_memory('base64', read_base64)
+        document.invalidate_recordset(['file'])
+        (file_hash, sent), peak = self._measure_memory('filestore', read_filestore)
+
+        self.assertEqual(file_hash, expected_hash)
+        self.assertEqual(legacy_hash, expected_hash)
+        self.assertEqual(sent, legacy_sent, "Streamed payload should have the size of the encoded one")
+        self.assertGreater(legacy_peak, 3 * DOCUMENT_SIZE)
+        self.assertLess(peak, 4 * ocr_stream.DEFAULT_READ_SIZE, "Document should not be read in memory")
+
+    def test_image_preprocessing_throughput(self):
+        """Benchmark the time of every preprocessing stage on the fixture corpus"""
+        preprocessor = image_preprocess.ImagePreprocessor(image_preprocess.STAGES)
+        reports = []
+        for variant in SCAN_VARIANTS:
+            page, _text = scanned_page(variant)
+            (image, report), duration = self._time(lambda: preprocessor.run(page))
+            reports.append(report)
+            megapixels = page.size[0] * page.size[1] / 1e6
+            _logger.info(
+                "OCR preprocessing benchmark %s (%.1f MP): %.3fs (%.1f MP/s), skew %.2f, %s",
+                variant, megapixels, duration, megapixels / duration if duration else 0.0, report['skew'],
+                image_preprocess.format_timings(report['timings'])
+            )
+            self.assertEqual(image is None, variant == 'blank', "Only the blank page should be skipped")
+            if variant == 'skewed':
+                self.assertAlmostEqual(report['skew'], 2.5, delta=image_preprocess.SKEW_STEP)
+            if image is not None:
+                self.assertEqual(image.size, (2480, 3508), "Scan should be scaled down to 300 DPI")
+        _logger.info(
+            "OCR preprocessing benchmark total: %s",
+            image_preprocess.format_timings(image_preprocess.merge_reports(reports)['timings'])
+        )
+
+    def test_image_preprocessing_tradeoff(self):
+        """Benchmark the OCR time and accuracy of the fixture corpus with and
+        without preprocessing"""
+        if not ocr_parallel.engine_version():
+            self.skipTest("Tesseract is not installed")
+        corpus = [scanned_page(variant) for variant in SCAN_VARIANTS]
+        results = {}
+        for profile, stages in PREPROCESS_PROFILES.items():
+            preprocessor = image_preprocess.ImagePreprocessor(stages)
+            total, accuracies = 0.0, []
+            for variant, (page, expected) in zip(SCAN_VARIANTS, corpus):
+                start = time.perf_counter()
+                image, report = preprocessor.run(page)
+                preprocessed = time.perf_counter() - start
+                text, confidence = ocr_parallel.ocr_image(image) if image is not None else ('', 100.0)
+                duration = time.perf_counter() - start
+                total += duration
+                accuracies.append(text_accuracy(expected, text))
+                _logger.info(
+                    "OCR preprocessing tradeoff %s/%s: %.3fs (%.3fs preprocessing), accuracy %.3f, confidence %.1f",
+                    profile, variant, duration, preprocessed, accuracies[-1], confidence
+                )
+            results[profile] = (total, sum(accuracies) / len(accuracies))
+            _logger.info(
+                "OCR preprocessing tradeoff %s: %.3fs, %.2f pages/s, mean accuracy %.3f",
+                profile, total, len(corpus) / total if total else 0.0, results[profile][1]
+            )
+        self.assertLess(results['default'][0], results['none'][0], "Preprocessing should cut the OCR time")
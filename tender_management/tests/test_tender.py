@@ -2,3 +2,7 @@ from . import test_tender
 from . import test_gem_integration
 from . import test_ocr
 from . import test_analytics
+from . import test_gem_session
+from . import test_gem_benchmark
+from . import test_gem_downloader
+from . import test_ocr_benchmark